@@ -1,48 +1,78 @@
 """
 Servidor HTTP simple para servir datos de telemetría y POIs como JSON.
 Permite actualizaciones incrementales del mapa sin recargar la página.
+El servidor es nativo de asyncio y se ejecuta en el runtime de la aplicación.
 """
+import asyncio
 import json
 import threading
-from typing import Dict, Any, Optional, List
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional, List, Callable, Set, Tuple
+from http import HTTPStatus
 from urllib.parse import urlparse, parse_qs
 import logging
+from backend.schemas import TelemetrySchema
+from backend.fleet_state import FleetStateStore
+from common.dead_reckoning import DeadReckoningTracker
+from common.runtime import AsyncRuntime
 
 logger = logging.getLogger(__name__)
 
+# Tamaño máximo aceptado para el cuerpo de una petición (eventos del mapa)
+MAX_BODY_BYTES = 1024 * 1024
+# Segundos que una conexión keep-alive puede esperar la siguiente petición
+KEEP_ALIVE_TIMEOUT = 15.0
 
-class TelemetryDataHandler(BaseHTTPRequestHandler):
-    """Manejador HTTP para servir datos de telemetría."""
+
+class TelemetryDataHandler:
+    """Enrutador de la API JSON (independiente del transporte)."""
     
-    def __init__(self, *args, data_store=None, **kwargs):
+    def __init__(self, data_store=None):
         self.data_store = data_store
-        super().__init__(*args, **kwargs)
     
-    def do_GET(self):
+    def handle(self, method: str, target: str, body: bytes = b"") -> Tuple[int, Dict[str, Any]]:
+        """
+        Atiende una petición.
+        
+        Args:
+            method: Método HTTP
+            target: Ruta con query string (ej., "/api/mode?mode=zone")
+            body: Cuerpo de la petición
+        
+        Returns:
+            Tupla (código de estado, respuesta JSON)
+        """
+        if method == 'GET':
+            return self.do_GET(target)
+        if method == 'POST':
+            return self.do_POST(target, body)
+        return 405, {'error': "Method Not Allowed"}
+    
+    def do_GET(self, target: str) -> Tuple[int, Dict[str, Any]]:
         """Maneja peticiones GET."""
-        parsed_path = urlparse(self.path)
+        parsed_path = urlparse(target)
         path = parsed_path.path
         
         if path == '/api/telemetry':
             # Servir todos los datos de telemetría
-            self._send_json_response(self.data_store.get_all_telemetry() if self.data_store else {})
+            return 200, self.data_store.get_all_telemetry() if self.data_store else {}
+        elif path == '/api/predicted':
+            # Posiciones extrapoladas (dead reckoning) para consumidores que refrescan más rápido que la telemetría
+            return 200, self.data_store.get_predicted_positions() if self.data_store else {}
         elif path == '/api/pois':
             # Servir todos los POIs
-            self._send_json_response(self.data_store.get_all_pois() if self.data_store else {})
+            return 200, self.data_store.get_all_pois() if self.data_store else {}
         elif path == '/api/data':
             # Servir telemetría y POIs juntos
-            data = {
+            return 200, {
                 'drones': self.data_store.get_all_telemetry() if self.data_store else {},
                 'pois': self.data_store.get_all_pois() if self.data_store else {},
-                'zones': self.data_store.get_all_zones() if self.data_store else {}
+                'zones': self.data_store.get_all_zones() if self.data_store else {},
+                'stale_count': self.data_store.get_stale_count() if self.data_store else 0
             }
-            self._send_json_response(data)
         elif path == '/api/events':
-            # Leer eventos del mapa (desde localStorage del navegador)
-            # El JavaScript guarda eventos aquí y Python los lee
+            # Eventos del mapa pendientes (solo si nadie los consume al llegar)
             events = self.data_store.get_map_events() if self.data_store else []
-            self._send_json_response({'events': events})
+            return 200, {'events': events}
         elif path == '/api/mode':
             # Obtener o establecer modo del mapa
             query_params = parse_qs(parsed_path.query)
@@ -51,104 +81,65 @@ class TelemetryDataHandler(BaseHTTPRequestHandler):
                 mode = query_params['mode'][0]
                 if self.data_store:
                     self.data_store.set_map_mode(mode)
-                self._send_json_response({'mode': mode, 'status': 'ok'})
-            else:
-                # Obtener modo
-                mode = self.data_store.get_map_mode() if self.data_store else 'click'
-                self._send_json_response({'mode': mode})
-        else:
-            self._send_error(404, "Not Found")
+                return 200, {'mode': mode, 'status': 'ok'}
+            # Obtener modo
+            mode = self.data_store.get_map_mode() if self.data_store else 'click'
+            return 200, {'mode': mode}
+        return 404, {'error': "Not Found"}
     
-    def do_POST(self):
+    def do_POST(self, target: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
         """Maneja peticiones POST."""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
+        path = urlparse(target).path
         
         if path == '/api/events':
             # Recibir evento del mapa desde JavaScript
             try:
-                content_length = int(self.headers.get('Content-Length', 0))
-                post_data = self.rfile.read(content_length)
-                event = json.loads(post_data.decode('utf-8'))
-                
+                event = json.loads(body.decode('utf-8'))
                 if self.data_store:
                     self.data_store.add_map_event(event)
-                
-                self._send_json_response({'status': 'ok'})
+                return 200, {'status': 'ok'}
             except Exception as e:
                 logger.error(f"Error procesando evento: {e}")
-                self._send_error(400, str(e))
+                return 400, {'error': str(e)}
         elif path == '/api/mode':
             # Recibir cambio de modo del mapa desde JavaScript
             try:
-                content_length = int(self.headers.get('Content-Length', 0))
-                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
-                
+                data = json.loads(body.decode('utf-8'))
                 if self.data_store and 'mode' in data:
                     self.data_store.set_map_mode(data['mode'])
-                
-                self._send_json_response({'status': 'ok', 'mode': data.get('mode', 'click')})
+                return 200, {'status': 'ok', 'mode': data.get('mode', 'click')}
             except Exception as e:
                 logger.error(f"Error procesando modo: {e}")
-                self._send_error(400, str(e))
-        else:
-            self._send_error(404, "Not Found")
-    
-    def _send_json_response(self, data: Dict[str, Any]):
-        """Envía una respuesta JSON."""
-        try:
-            json_data = json.dumps(data, default=str)
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')  # CORS
-            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.end_headers()
-            self.wfile.write(json_data.encode('utf-8'))
-        except Exception as e:
-            logger.error(f"Error enviando respuesta JSON: {e}")
-            self._send_error(500, str(e))
-    
-    def _send_error(self, code: int, message: str):
-        """Envía una respuesta de error."""
-        self.send_response(code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        error_data = json.dumps({'error': message})
-        self.wfile.write(error_data.encode('utf-8'))
-    
-    def do_OPTIONS(self):
-        """Maneja peticiones OPTIONS para CORS."""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-    
-    def log_message(self, format, *args):
-        """Suprime los logs del servidor HTTP."""
-        pass  # No mostrar logs del servidor HTTP
+                return 400, {'error': str(e)}
+        return 404, {'error': "Not Found"}
 
 
 class TelemetryDataStore:
     """Almacén de datos de telemetría y POIs."""
     
-    def __init__(self):
-        self.telemetry: Dict[str, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        fleet_state: Optional[FleetStateStore] = None,
+        dead_reckoning: Optional[DeadReckoningTracker] = None,
+        on_map_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        # La telemetría vive en el almacén columnar compartido con la UI
+        self.fleet_state = fleet_state if fleet_state is not None else FleetStateStore()
+        self.dead_reckoning = dead_reckoning if dead_reckoning is not None else DeadReckoningTracker()
+        self._prediction_lock = threading.Lock()
         self.pois: Dict[str, Dict[str, Any]] = {}
         self.zones: Dict[str, Dict[str, Any]] = {}
+        self.stale_ids: Set[str] = set()  # Drones sin telemetría reciente
         self.map_events: List[Dict[str, Any]] = []  # Eventos del mapa (clic, zonas, etc.)
         self.map_mode: str = "click"  # Modo de interacción del mapa
+        # Consumidor de eventos del mapa; sin él, los eventos se acumulan para get_map_events()
+        self.on_map_event = on_map_event
         self.lock = threading.Lock()
     
-    def update_telemetry(self, telemetry: Dict[str, Any]):
+    def update_telemetry(self, telemetry: TelemetrySchema):
         """Actualiza telemetría de un dron."""
-        drone_id = telemetry.get('drone_id')
-        if drone_id:
-            with self.lock:
-                self.telemetry[drone_id] = telemetry.copy()
+        if telemetry.drone_id:
+            self.fleet_state.update(telemetry)
     
     def update_poi(self, poi: Dict[str, Any]):
         """Actualiza o agrega un POI."""
@@ -157,16 +148,47 @@ class TelemetryDataStore:
             with self.lock:
                 self.pois[poi_id] = poi.copy()
     
+    def update_pois(self, pois: List[Dict[str, Any]]):
+        """Actualiza o agrega varios POIs (una sola toma del lock)."""
+        with self.lock:
+            for poi in pois:
+                poi_id = poi.get('id')
+                if poi_id:
+                    self.pois[poi_id] = poi.copy()
+    
     def remove_poi(self, poi_id: str):
         """Elimina un POI."""
         with self.lock:
             if poi_id in self.pois:
                 del self.pois[poi_id]
     
+    def set_stale(self, drone_id: str, stale: bool):
+        """Marca un dron como obsoleto (sin telemetría reciente) o activo."""
+        with self.lock:
+            if stale:
+                self.stale_ids.add(drone_id)
+            else:
+                self.stale_ids.discard(drone_id)
+    
+    def get_stale_count(self) -> int:
+        """Obtiene el número de drones obsoletos."""
+        with self.lock:
+            return len(self.stale_ids)
+    
     def get_all_telemetry(self) -> Dict[str, Dict[str, Any]]:
-        """Obtiene todos los datos de telemetría."""
+        """Obtiene todos los datos de telemetría (como diccionarios para JSON)."""
+        telemetry = self.fleet_state.to_dicts()
         with self.lock:
-            return {k: v.copy() for k, v in self.telemetry.items()}
+            for drone_id in self.stale_ids:
+                if drone_id in telemetry:
+                    telemetry[drone_id]['stale'] = True
+        return telemetry
+    
+    def get_predicted_positions(self) -> Dict[str, Dict[str, float]]:
+        """Obtiene la posición extrapolada actual de cada dron."""
+        # El predictor guarda estado de corrección: serializar las consultas concurrentes
+        with self._prediction_lock:
+            return self.dead_reckoning.predict(self.fleet_state)
     
     def get_all_pois(self) -> Dict[str, Dict[str, Any]]:
         """Obtiene todos los POIs."""
@@ -192,9 +214,16 @@ class TelemetryDataStore:
             return {k: v.copy() for k, v in self.zones.items()}
     
     def add_map_event(self, event: Dict[str, Any]):
-        """Agrega un evento del mapa."""
+        """Agrega un evento del mapa (o lo entrega al consumidor en el acto)."""
         import logging
         logger = logging.getLogger(__name__)
+        if self.on_map_event:
+            logger.info(f"Entregando evento del mapa: {event.get('type', 'unknown')}")
+            try:
+                self.on_map_event(event)
+            except Exception as e:
+                logger.error(f"Error en consumidor de eventos del mapa: {e}", exc_info=True)
+            return
         with self.lock:
             logger.info(f"Agregando evento al almacén: {event.get('type', 'unknown')}")
             self.map_events.append(event)
@@ -221,61 +250,170 @@ class TelemetryDataStore:
 
 
 class TelemetryServer:
-    """Servidor HTTP para servir datos de telemetría."""
-    
-    def __init__(self, port: int = 8765):
+    """
+    Servidor HTTP para servir datos de telemetría.
+    
+    Atiende las conexiones con asyncio (keep-alive incluido) en el runtime
+    indicado; sin runtime crea uno propio.
+    """
+    
+    def __init__(
+        self,
+        port: int = 8765,
+        fleet_state: Optional[FleetStateStore] = None,
+        dead_reckoning: Optional[DeadReckoningTracker] = None,
+        runtime: Optional[AsyncRuntime] = None,
+        on_map_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
         self.port = port
-        self.data_store = TelemetryDataStore()
-        self.server: Optional[HTTPServer] = None
-        self.server_thread: Optional[threading.Thread] = None
+        self.data_store = TelemetryDataStore(fleet_state, dead_reckoning, on_map_event)
+        self.handler = TelemetryDataHandler(self.data_store)
+        self.runtime = runtime
+        self._owns_runtime = False
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()  # Escritores de las conexiones abiertas
         self.running = False
     
     def start(self):
-        """Inicia el servidor en un hilo separado."""
+        """Inicia el servidor en el runtime (espera a que el puerto esté abierto)."""
         if self.running:
             return
         
-        def handler_factory(*args, **kwargs):
-            return TelemetryDataHandler(*args, data_store=self.data_store, **kwargs)
-        
         try:
-            self.server = HTTPServer(('localhost', self.port), handler_factory)
-            self.running = True
-            
-            def run_server():
-                logger.info(f"Servidor de telemetría iniciado en http://localhost:{self.port}")
-                try:
-                    self.server.serve_forever()
-                except Exception as e:
-                    if self.running:
-                        logger.error(f"Error en servidor de telemetría: {e}")
-            
-            self.server_thread = threading.Thread(target=run_server, daemon=True)
-            self.server_thread.start()
-            logger.info(f"Servidor de telemetría iniciado en puerto {self.port}")
+            if self.runtime is None:
+                self.runtime = AsyncRuntime(name="telemetry-server", lag_interval=0)
+                self._owns_runtime = True
+            self.runtime.start()
+            self.runtime.run(self.start_async(), timeout=5.0)
         except Exception as e:
             logger.error(f"Error iniciando servidor de telemetría: {e}")
             self.running = False
     
+    async def start_async(self):
+        """Abre el puerto en el loop actual."""
+        if self.running:
+            return
+        self.server = await asyncio.start_server(self._handle_connection, 'localhost', self.port)
+        self.running = True
+        logger.info(f"Servidor de telemetría iniciado en http://localhost:{self.port}")
+    
     def stop(self):
         """Detiene el servidor."""
-        self.running = False
-        if self.server:
+        if self.running and self.runtime and self.runtime.running:
             try:
-                self.server.shutdown()
-                self.server.server_close()
-            except:
+                self.runtime.run(self.stop_async(), timeout=5.0)
+            except Exception:
                 pass
+        self.running = False
+        if self._owns_runtime and self.runtime:
+            self.runtime.stop()
         logger.info("Servidor de telemetría detenido")
     
-    def update_telemetry(self, telemetry: Dict[str, Any]):
+    async def stop_async(self):
+        """Cierra el puerto en el loop actual."""
+        self.running = False
+        if self.server:
+            self.server.close()
+            # Cerrar las conexiones keep-alive en espera (wait_closed las espera)
+            for writer in list(self._connections):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atiende las peticiones de una conexión hasta que el cliente la cierre."""
+        self._connections.add(writer)
+        try:
+            while True:
+                request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_TIMEOUT)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                
+                if method == 'OPTIONS':
+                    status, payload = 200, None
+                else:
+                    try:
+                        status, payload = self.handler.handle(method, target, body)
+                    except Exception as e:
+                        logger.error(f"Error atendiendo {method} {target}: {e}", exc_info=True)
+                        status, payload = 500, {'error': str(e)}
+                
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(self._build_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # Conexión inactiva, cerrada por el cliente o servidor deteniéndose
+        except ValueError as e:
+            # Petición mal formada
+            writer.write(self._build_response(400, {'error': str(e)}, False))
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+    
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """
+        Lee una petición HTTP/1.1.
+        
+        Returns:
+            Tupla (método, ruta, cabeceras, cuerpo) o None si el cliente cerró
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise ValueError("Línea de petición inválida")
+        method, target, _version = parts
+        
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        length = int(headers.get('content-length', 0) or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Cuerpo de la petición demasiado grande")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+    
+    @staticmethod
+    def _build_response(status: int, payload: Optional[Dict[str, Any]], keep_alive: bool) -> bytes:
+        """Construye una respuesta JSON con cabeceras CORS."""
+        body = json.dumps(payload, default=str).encode('utf-8') if payload is not None else b''
+        reason = HTTPStatus(status).phrase
+        headers = [
+            f"HTTP/1.1 {status} {reason}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Access-Control-Allow-Origin: *",  # CORS
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        return ("\r\n".join(headers) + "\r\n\r\n").encode('latin-1') + body
+    
+    def update_telemetry(self, telemetry: TelemetrySchema):
         """Actualiza telemetría en el almacén."""
         self.data_store.update_telemetry(telemetry)
     
+    def set_drone_stale(self, drone_id: str, stale: bool):
+        """Marca un dron como obsoleto o activo en el almacén."""
+        self.data_store.set_stale(drone_id, stale)
+    
     def update_poi(self, poi: Dict[str, Any]):
         """Actualiza POI en el almacén."""
         self.data_store.update_poi(poi)
     
+    def update_pois(self, pois: List[Dict[str, Any]]):
+        """Actualiza varios POIs en el almacén (ej., carga inicial)."""
+        self.data_store.update_pois(pois)
+    
     def remove_poi(self, poi_id: str):
         """Elimina POI del almacén."""
         self.data_store.remove_poi(poi_id)
@@ -0,0 +1,467 @@
+"""
+Almacén columnar del estado de la flota.
+Guarda la última telemetría de cada dron en columnas NumPy para que las
+consultas sobre toda la flota (filtros, agregados, bounding boxes) sean
+vectorizadas en lugar de recorrer diccionarios.
+"""
+import threading
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+import numpy as np
+from common.constants import DroneStatus
+from backend.schemas import TelemetrySchema
+
+
+class FleetStateStore:
+    """
+    Estado de la flota en columnas NumPy con un mapa drone_id -> fila.
+    
+    Es la única fuente de verdad de la telemetría actual: la UI, el mapa y el
+    servidor HTTP leen de aquí. Las filas se mantienen densas (al eliminar un
+    dron, la última fila ocupa su lugar), de modo que las columnas activas son
+    siempre el prefijo [:len(store)].
+    
+    Los campos opcionales ausentes se guardan como NaN (numéricos) o -1 (rtk_fix).
+    """
+    
+    # Columnas float64 (en el orden de TelemetrySchema)
+    FLOAT_FIELDS = (
+        "latitude",
+        "longitude",
+        "altitude",
+        "heading",
+        "velocity",
+        "battery",
+        "timestamp",
+        "vertical_speed",
+        "max_speed",
+        "max_altitude",
+        "flight_time_remaining",
+    )
+    OPTIONAL_FIELDS = ("vertical_speed", "max_speed", "max_altitude", "flight_time_remaining")
+    
+    def __init__(self, capacity: int = 10):
+        """
+        Inicializa el almacén.
+        
+        Args:
+            capacity: Número de filas reservadas inicialmente (ej., Config.max_drones).
+                El almacén crece automáticamente si la flota lo supera.
+        """
+        self._capacity = max(1, int(capacity))
+        self._size = 0
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        # Rango de cada fila en el orden por ID y los IDs en minúsculas (NumPy);
+        # se recalculan solo cuando cambia el conjunto de IDs
+        self._id_order: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        
+        self._columns: Dict[str, np.ndarray] = {
+            field: np.zeros(self._capacity, dtype=np.float64) for field in self.FLOAT_FIELDS
+        }
+        # Estado como código entero (índice en _status_names)
+        self._status_names: List[str] = [status.value for status in DroneStatus]
+        self._status_codes: Dict[str, int] = {name: i for i, name in enumerate(self._status_names)}
+        self._status = np.zeros(self._capacity, dtype=np.int16)
+        # rtk_fix: -1 desconocido, 0 False, 1 True
+        self._rtk_fix = np.full(self._capacity, -1, dtype=np.int8)
+        
+        self.lock = threading.Lock()
+    
+    def update(self, telemetry: TelemetrySchema) -> int:
+        """
+        Inserta o actualiza la fila de un dron.
+        
+        Args:
+            telemetry: Registro de telemetría
+        
+        Returns:
+            Índice de fila del dron
+        """
+        drone_id = telemetry.drone_id
+        with self.lock:
+            row = self._index.get(drone_id)
+            if row is None:
+                row = self._append_row(drone_id)
+            
+            columns = self._columns
+            columns["latitude"][row] = telemetry.latitude
+            columns["longitude"][row] = telemetry.longitude
+            columns["altitude"][row] = telemetry.altitude
+            columns["heading"][row] = telemetry.heading
+            columns["velocity"][row] = telemetry.velocity
+            columns["battery"][row] = telemetry.battery
+            columns["timestamp"][row] = telemetry.timestamp
+            for field in self.OPTIONAL_FIELDS:
+                value = getattr(telemetry, field)
+                columns[field][row] = np.nan if value is None else value
+            
+            self._status[row] = self._status_code(telemetry.status)
+            rtk_fix = telemetry.rtk_fix
+            self._rtk_fix[row] = -1 if rtk_fix is None else int(bool(rtk_fix))
+            return row
+    
+    def remove(self, drone_id: str) -> bool:
+        """
+        Elimina un dron del almacén en O(1) moviendo la última fila a su lugar.
+        
+        Args:
+            drone_id: ID del dron a eliminar
+        
+        Returns:
+            True si el dron existía
+        """
+        with self.lock:
+            row = self._index.pop(drone_id, None)
+            if row is None:
+                return False
+            
+            last = self._size - 1
+            if row != last:
+                for column in self._columns.values():
+                    column[row] = column[last]
+                self._status[row] = self._status[last]
+                self._rtk_fix[row] = self._rtk_fix[last]
+                moved_id = self._ids[last]
+                self._ids[row] = moved_id
+                self._index[moved_id] = row
+            
+            self._ids.pop()
+            self._size = last
+            self._id_order = None
+            return True
+    
+    def clear(self):
+        """Elimina todos los drones."""
+        with self.lock:
+            self._index.clear()
+            self._ids.clear()
+            self._size = 0
+            self._id_order = None
+    
+    def _append_row(self, drone_id: str) -> int:
+        """Reserva una fila nueva (llamar con el lock tomado)."""
+        if self._size == self._capacity:
+            self._grow(self._capacity * 2)
+        row = self._size
+        self._size += 1
+        self._index[drone_id] = row
+        self._ids.append(drone_id)
+        self._id_order = None
+        return row
+    
+    def _grow(self, new_capacity: int):
+        """Amplía todas las columnas conservando los datos."""
+        for field, column in self._columns.items():
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[field] = grown
+        status = np.zeros(new_capacity, dtype=self._status.dtype)
+        status[:self._size] = self._status[:self._size]
+        self._status = status
+        rtk_fix = np.full(new_capacity, -1, dtype=self._rtk_fix.dtype)
+        rtk_fix[:self._size] = self._rtk_fix[:self._size]
+        self._rtk_fix = rtk_fix
+        self._capacity = new_capacity
+    
+    def _status_code(self, status: str) -> int:
+        """Obtiene (o registra) el código entero de un estado."""
+        code = self._status_codes.get(status)
+        if code is None:
+            code = len(self._status_names)
+            self._status_names.append(status)
+            self._status_codes[status] = code
+        return code
+    
+    def __len__(self) -> int:
+        """Número de drones en el almacén."""
+        return self._size
+    
+    def __contains__(self, drone_id: str) -> bool:
+        """Indica si el dron está en el almacén."""
+        return drone_id in self._index
+    
+    @property
+    def capacity(self) -> int:
+        """Número de filas reservadas."""
+        return self._capacity
+    
+    def ids(self) -> List[str]:
+        """Obtiene los IDs de drones en orden de fila."""
+        with self.lock:
+            return list(self._ids)
+    
+    def get(self, drone_id: str) -> Optional[TelemetrySchema]:
+        """
+        Obtiene la telemetría actual de un dron.
+        
+        Args:
+            drone_id: ID del dron
+        
+        Returns:
+            Registro de telemetría o None si el dron no existe
+        """
+        with self.lock:
+            row = self._index.get(drone_id)
+            if row is None:
+                return None
+            values = [self._columns[field][row].item() for field in self.FLOAT_FIELDS]
+            status = self._status_names[self._status[row]]
+            rtk_fix = int(self._rtk_fix[row])
+        return self._build_record(drone_id, values, status, rtk_fix)
+    
+    def records(self) -> Dict[str, TelemetrySchema]:
+        """Obtiene la telemetría actual de toda la flota (drone_id -> registro)."""
+        with self.lock:
+            n = self._size
+            ids = list(self._ids)
+            columns = [self._columns[field][:n].tolist() for field in self.FLOAT_FIELDS]
+            statuses = [self._status_names[code] for code in self._status[:n].tolist()]
+            rtk_fixes = self._rtk_fix[:n].tolist()
+        return {
+            drone_id: self._build_record(drone_id, values, statuses[i], rtk_fixes[i])
+            for i, (drone_id, values) in enumerate(zip(ids, zip(*columns)))
+        }
+    
+    def to_dicts(self) -> Dict[str, Dict[str, Any]]:
+        """Obtiene la telemetría de toda la flota como diccionarios (para JSON)."""
+        return {drone_id: record.to_dict() for drone_id, record in self.records().items()}
+    
+    @staticmethod
+    def _build_record(drone_id: str, values, status: str, rtk_fix: int) -> TelemetrySchema:
+        """Construye un registro a partir de los valores de una fila."""
+        (latitude, longitude, altitude, heading, velocity, battery, timestamp,
+         vertical_speed, max_speed, max_altitude, flight_time_remaining) = values
+        return TelemetrySchema(
+            drone_id,
+            latitude,
+            longitude,
+            altitude,
+            heading,
+            velocity,
+            battery,
+            status,
+            timestamp,
+            None if vertical_speed != vertical_speed else vertical_speed,  # NaN -> None
+            None if rtk_fix < 0 else bool(rtk_fix),
+            None if max_speed != max_speed else max_speed,
+            None if max_altitude != max_altitude else max_altitude,
+            None if flight_time_remaining != flight_time_remaining else flight_time_remaining,
+        )
+    
+    def column(self, field: str) -> np.ndarray:
+        """
+        Obtiene una copia de la columna activa de un campo.
+        
+        Args:
+            field: Nombre del campo numérico (ej., "battery")
+        
+        Returns:
+            Array con un valor por dron, en orden de fila (ver ids())
+        """
+        with self.lock:
+            return self._columns[field][:self._size].copy()
+    
+    def snapshot(self, fields: Iterable[str]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """
+        Obtiene de forma atómica los IDs y copias de varias columnas.
+        
+        Args:
+            fields: Nombres de campos numéricos
+        
+        Returns:
+            Tupla (ids en orden de fila, campo -> array)
+        """
+        with self.lock:
+            size = self._size
+            return list(self._ids[:size]), {
+                field: self._columns[field][:size].copy() for field in fields
+            }
+    
+    def filter(
+        self,
+        min_battery: Optional[float] = None,
+        max_battery: Optional[float] = None,
+        statuses: Optional[Iterable[str]] = None,
+        exclude_statuses: Optional[Iterable[str]] = None,
+        require_rtk: bool = False,
+    ) -> List[str]:
+        """
+        Filtra drones con una máscara vectorizada.
+        
+        Args:
+            min_battery: Batería mínima (inclusive)
+            max_battery: Batería máxima (exclusiva)
+            statuses: Solo drones en alguno de estos estados
+            exclude_statuses: Excluir drones en estos estados
+            require_rtk: Excluir drones que reportan rtk_fix=False (los que no
+                reportan RTK se consideran válidos)
+        
+        Returns:
+            Lista de IDs de drones que cumplen todas las condiciones
+        """
+        with self.lock:
+            mask = self._filter_mask(min_battery, max_battery, statuses, exclude_statuses, require_rtk)
+            ids = self._ids
+            return [ids[row] for row in np.flatnonzero(mask).tolist()]
+    
+    def ordered_ids(
+        self,
+        sort_by: str = "drone_id",
+        descending: bool = False,
+        min_battery: Optional[float] = None,
+        max_battery: Optional[float] = None,
+        statuses: Optional[Iterable[str]] = None,
+        id_contains: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Filtra y ordena los drones (ej., para listas de la UI).
+        
+        Args:
+            sort_by: "drone_id", "status" o un campo numérico (ej., "battery")
+            descending: Orden descendente
+            min_battery: Batería mínima (inclusive)
+            max_battery: Batería máxima (exclusiva)
+            statuses: Solo drones en alguno de estos estados
+            id_contains: Solo drones cuyo ID contiene este texto (sin distinguir mayúsculas)
+        
+        Returns:
+            Lista de IDs en orden; los empates se ordenan por ID (descending
+            invierte el orden completo)
+        """
+        with self.lock:
+            n = self._size
+            mask = self._filter_mask(min_battery, max_battery, statuses)
+            rank, lower_ids = self._id_order_arrays()
+            if id_contains:
+                mask &= np.char.find(lower_ids, id_contains.lower()) >= 0
+            rows = np.flatnonzero(mask)
+            
+            # Clave principal y, como desempate, el rango por ID
+            # (los estados siguen el orden del ciclo de vuelo de DroneStatus)
+            if sort_by == "drone_id":
+                rows = rows[np.argsort(rank[rows])]
+            elif sort_by == "status":
+                rows = rows[np.lexsort((rank[rows], self._status[:n][rows]))]
+            else:
+                rows = rows[np.lexsort((rank[rows], self._columns[sort_by][:n][rows]))]
+            if descending:
+                rows = rows[::-1]
+            ids = self._ids
+            return [ids[row] for row in rows.tolist()]
+    
+    def _id_order_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rango de cada fila en el orden por ID e IDs en minúsculas (llamar con el lock tomado).
+        
+        Se calculan con NumPy la primera vez tras un cambio en el conjunto de IDs
+        y se reutilizan mientras solo cambie la telemetría.
+        """
+        if self._id_order is None:
+            names = np.array(self._ids, dtype=str) if self._ids else np.zeros(0, dtype="<U1")
+            rank = np.empty(len(names), dtype=np.intp)
+            rank[np.argsort(names, kind="stable")] = np.arange(len(names))
+            self._id_order = (rank, np.char.lower(names))
+        return self._id_order
+    
+    def within_bounds(self, south: float, west: float, north: float, east: float) -> List[str]:
+        """
+        Obtiene los drones dentro de un rectángulo geográfico.
+        
+        Args:
+            south: Latitud mínima
+            west: Longitud mínima
+            north: Latitud máxima
+            east: Longitud máxima
+        
+        Returns:
+            Lista de IDs de drones dentro de los límites
+        """
+        with self.lock:
+            n = self._size
+            lat = self._columns["latitude"][:n]
+            lon = self._columns["longitude"][:n]
+            mask = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+            ids = self._ids
+            return [ids[row] for row in np.flatnonzero(mask).tolist()]
+    
+    def bounding_box(self) -> Optional[Dict[str, float]]:
+        """
+        Calcula el rectángulo que contiene a toda la flota.
+        
+        Returns:
+            Diccionario con north/south/east/west (mismo formato que los bounds
+            de las zonas) o None si no hay drones
+        """
+        with self.lock:
+            n = self._size
+            if n == 0:
+                return None
+            lat = self._columns["latitude"][:n]
+            lon = self._columns["longitude"][:n]
+            return {
+                "north": float(lat.max()),
+                "south": float(lat.min()),
+                "east": float(lon.max()),
+                "west": float(lon.min()),
+            }
+    
+    def aggregate(self, field: str) -> Dict[str, float]:
+        """
+        Calcula agregados de un campo numérico para toda la flota.
+        
+        Args:
+            field: Nombre del campo (ej., "battery", "altitude")
+        
+        Returns:
+            Diccionario con count, min, max y mean (ignora valores ausentes)
+        """
+        with self.lock:
+            values = self._columns[field][:self._size]
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+                return {"count": 0, "min": 0.0, "max": 0.0, "mean": 0.0}
+            return {
+                "count": int(values.size),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "mean": float(values.mean()),
+            }
+    
+    def count_by_status(self) -> Dict[str, int]:
+        """Cuenta los drones en cada estado."""
+        with self.lock:
+            counts = np.bincount(self._status[:self._size], minlength=len(self._status_names))
+            return {
+                name: int(count)
+                for name, count in zip(self._status_names, counts.tolist())
+                if count
+            }
+    
+    def _filter_mask(
+        self,
+        min_battery: Optional[float] = None,
+        max_battery: Optional[float] = None,
+        statuses: Optional[Iterable[str]] = None,
+        exclude_statuses: Optional[Iterable[str]] = None,
+        require_rtk: bool = False,
+    ) -> np.ndarray:
+        """Máscara de filas que cumplen las condiciones (llamar con el lock tomado)."""
+        n = self._size
+        mask = np.ones(n, dtype=bool)
+        battery = self._columns["battery"][:n]
+        if min_battery is not None:
+            mask &= battery >= min_battery
+        if max_battery is not None:
+            mask &= battery < max_battery
+        status = self._status[:n]
+        if statuses is not None:
+            mask &= np.isin(status, self._codes_for(statuses))
+        if exclude_statuses is not None:
+            mask &= ~np.isin(status, self._codes_for(exclude_statuses))
+        if require_rtk:
+            mask &= self._rtk_fix[:n] != 0
+        return mask
+    
+    def _codes_for(self, statuses: Iterable[str]) -> List[int]:
+        """Convierte nombres de estado a códigos conocidos (llamar con el lock tomado)."""
+        return [self._status_codes[s] for s in statuses if s in self._status_codes]
@@ -0,0 +1,558 @@
+"""
+Grabador de vuelo binario.
+Guarda la telemetría en segmentos de solo anexado con registros de ancho fijo
+y un índice temporal periódico, y los lee mediante mmap sin copias.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Iterable, Set, Tuple
+import numpy as np
+from common.constants import DroneStatus
+from backend.schemas import TelemetrySchema
+
+
+SEGMENT_MAGIC = b"FREC"
+SEGMENT_VERSION = 1
+SEGMENT_EXTENSION = ".seg"
+INDEX_EXTENSION = ".idx"
+
+# Cabecera del segmento: magic, versión, tamaño de registro, hora de creación
+HEADER = struct.Struct("<4sHHd16x")
+
+# Campos del registro (nombre, formato struct, dtype NumPy)
+# Los opcionales ausentes se guardan como NaN (float) o -1 (rtk_fix)
+RECORD_FIELDS = (
+    ("timestamp", "d", "<f8"),
+    ("drone_id", "16s", "S16"),
+    ("latitude", "d", "<f8"),
+    ("longitude", "d", "<f8"),
+    ("altitude", "f", "<f4"),
+    ("heading", "f", "<f4"),
+    ("velocity", "f", "<f4"),
+    ("battery", "f", "<f4"),
+    ("vertical_speed", "f", "<f4"),
+    ("max_speed", "f", "<f4"),
+    ("max_altitude", "f", "<f4"),
+    ("flight_time_remaining", "f", "<f4"),
+    ("rtk_fix", "b", "i1"),
+    ("status", "B", "u1"),
+)
+RECORD = struct.Struct("<" + "".join(fmt for _, fmt, _ in RECORD_FIELDS) + "6x")
+RECORD_DTYPE = np.dtype({
+    "names": [name for name, _, _ in RECORD_FIELDS],
+    "formats": [dtype for _, _, dtype in RECORD_FIELDS],
+    "offsets": [struct.calcsize("<" + "".join(fmt for _, fmt, _ in RECORD_FIELDS[:i])) for i in range(len(RECORD_FIELDS))],
+    "itemsize": RECORD.size,
+})
+
+# Entrada del índice: primer registro del bloque, cantidad, timestamp mínimo y máximo
+INDEX_ENTRY = struct.Struct("<QQdd")
+INDEX_DTYPE = np.dtype([("first", "<u8"), ("count", "<u8"), ("min_ts", "<f8"), ("max_ts", "<f8")])
+
+# Longitud máxima del drone_id codificado en UTF-8 (campo 16s)
+DRONE_ID_BYTES = 16
+
+# Códigos de estado (posición en DroneStatus; 255 = desconocido)
+STATUS_NAMES = tuple(status.value for status in DroneStatus)
+STATUS_CODES = {name: i for i, name in enumerate(STATUS_NAMES)}
+UNKNOWN_STATUS = 255
+
+_NAN = float("nan")
+
+
+def _optional(value: Optional[float]) -> float:
+    """Convierte un opcional a float (NaN si no está presente)."""
+    return _NAN if value is None else value
+
+
+def record_values(t: TelemetrySchema) -> tuple:
+    """
+    Obtiene los valores de un registro en el orden de RECORD.
+    
+    Args:
+        t: Registro de telemetría
+    
+    Returns:
+        Tupla lista para RECORD.pack / pack_into
+    
+    Raises:
+        ValueError: Si el drone_id no cabe en DRONE_ID_BYTES (no se trunca)
+    """
+    drone_id = t.drone_id.encode("utf-8")
+    if len(drone_id) > DRONE_ID_BYTES:
+        raise ValueError(f"drone_id de más de {DRONE_ID_BYTES} bytes: {t.drone_id!r}")
+    return (
+        t.timestamp,
+        drone_id,
+        t.latitude,
+        t.longitude,
+        t.altitude,
+        t.heading,
+        t.velocity,
+        t.battery,
+        _optional(t.vertical_speed),
+        _optional(t.max_speed),
+        _optional(t.max_altitude),
+        _optional(t.flight_time_remaining),
+        -1 if t.rtk_fix is None else int(bool(t.rtk_fix)),
+        STATUS_CODES.get(t.status, UNKNOWN_STATUS),
+    )
+
+
+def pack_record(t: TelemetrySchema) -> bytes:
+    """Empaqueta un registro de telemetría en el formato binario de ancho fijo."""
+    return RECORD.pack(*record_values(t))
+
+
+def unpack_record(values: tuple) -> TelemetrySchema:
+    """
+    Crea un registro de telemetría desde una tupla de RECORD.unpack / iter_unpack.
+    
+    Args:
+        values: Valores en el orden de RECORD_FIELDS
+    
+    Returns:
+        Registro de telemetría
+    """
+    (timestamp, drone_id, latitude, longitude, altitude, heading, velocity, battery,
+     vertical_speed, max_speed, max_altitude, flight_time_remaining, rtk_fix, status) = values
+    return TelemetrySchema(
+        drone_id.rstrip(b"\x00").decode("utf-8"),
+        latitude,
+        longitude,
+        altitude,
+        heading,
+        velocity,
+        battery,
+        STATUS_NAMES[status] if status < len(STATUS_NAMES) else DroneStatus.IDLE.value,
+        timestamp,
+        None if vertical_speed != vertical_speed else vertical_speed,  # NaN -> None
+        None if rtk_fix < 0 else bool(rtk_fix),
+        None if max_speed != max_speed else max_speed,
+        None if max_altitude != max_altitude else max_altitude,
+        None if flight_time_remaining != flight_time_remaining else flight_time_remaining,
+    )
+
+
+class FlightRecorder:
+    """
+    Grabador de telemetría en segmentos binarios de solo anexado.
+    
+    record() solo agrega el registro a una cola en memoria (O(1)), por lo que
+    puede llamarse desde el loop de eventos sin afectar a la UI. Un hilo
+    escritor empaqueta los registros pendientes en lotes, los escribe con E/S
+    bufferizada y cada index_interval segundos cierra un bloque del índice
+    temporal. Cuando un segmento alcanza segment_max_records se abre otro.
+    """
+    
+    def __init__(
+        self,
+        directory: str = "recordings",
+        segment_max_records: int = 1_000_000,
+        index_interval: float = 1.0,
+        flush_interval: float = 0.25,
+        max_pending: int = 500_000
+    ):
+        """
+        Inicializa el grabador.
+        
+        Args:
+            directory: Carpeta donde se crean los segmentos
+            segment_max_records: Registros por segmento antes de rotar
+            index_interval: Segundos que abarca cada bloque del índice temporal
+            flush_interval: Segundos entre escrituras del hilo escritor
+            max_pending: Registros pendientes máximos (los excedentes se descartan)
+        """
+        self.directory = directory
+        self.segment_max_records = segment_max_records
+        self.index_interval = index_interval
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        
+        self._pending: deque = deque()
+        self._valid_ids: Set[str] = set()
+        self._rejected_ids: Set[str] = set()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._session = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        # Estado del segmento actual (solo lo toca el hilo escritor)
+        self._segment_number = 0
+        self._data_file = None
+        self._index_file = None
+        self._segment_records = 0
+        self._block_first = 0
+        self._block_started = 0.0
+        self._block_min = _NAN
+        self._block_max = _NAN
+        
+        # Contadores de estadísticas
+        self.recorded_count = 0
+        self.written_count = 0
+        self.dropped_count = 0
+        self.rejected_count = 0
+        self.segment_paths: List[str] = []
+    
+    def start(self):
+        """Crea la carpeta e inicia el hilo escritor."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if self._thread and self._thread.is_alive():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FlightRecorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Grabador de vuelo iniciado en {self.directory}")
+    
+    def stop(self):
+        """Escribe los registros pendientes, cierra el segmento y detiene el hilo."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def record(self, telemetry: TelemetrySchema):
+        """
+        Encola un registro de telemetría para escribirlo.
+        
+        Args:
+            telemetry: Registro a grabar
+        """
+        drone_id = telemetry.drone_id
+        if drone_id not in self._valid_ids and not self._check_drone_id(drone_id):
+            self.rejected_count += 1
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped_count += 1
+            return
+        self._pending.append(telemetry)
+        self.recorded_count += 1
+    
+    def _check_drone_id(self, drone_id: str) -> bool:
+        """Comprueba (una vez por ID) que el drone_id cabe en el registro sin truncarse."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if drone_id and len(drone_id.encode("utf-8")) <= DRONE_ID_BYTES:
+            self._valid_ids.add(drone_id)
+            return True
+        if drone_id not in self._rejected_ids:
+            self._rejected_ids.add(drone_id)
+            logger.warning(
+                f"Grabador de vuelo: drone_id {drone_id!r} no cabe en {DRONE_ID_BYTES} bytes; "
+                "su telemetría no se grabará"
+            )
+        return False
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Obtiene las estadísticas del grabador."""
+        return {
+            "recorded": self.recorded_count,
+            "written": self.written_count,
+            "dropped": self.dropped_count,
+            "rejected": self.rejected_count,
+            "pending": len(self._pending),
+            "segments": len(self.segment_paths),
+        }
+    
+    def _run(self):
+        """Bucle del hilo escritor."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        try:
+            while not self._stop_event.wait(self.flush_interval):
+                self._flush()
+            self._flush()
+        except Exception as e:
+            logger.error(f"Error en el grabador de vuelo: {e}", exc_info=True)
+        finally:
+            self._close_segment()
+    
+    def _flush(self):
+        """Empaqueta y escribe los registros pendientes."""
+        pending = self._pending
+        count = len(pending)
+        if count:
+            # popleft es seguro frente a append concurrentes desde el loop
+            batch = [pending.popleft() for _ in range(count)]
+            offset = 0
+            while offset < count:
+                if self._data_file is None or self._segment_records >= self.segment_max_records:
+                    self._open_segment()
+                chunk = batch[offset:offset + self.segment_max_records - self._segment_records]
+                self._write_chunk(chunk)
+                offset += len(chunk)
+        
+        if self._data_file is not None:
+            if time.monotonic() - self._block_started >= self.index_interval:
+                self._close_block()
+            self._data_file.flush()
+            self._index_file.flush()
+    
+    def _write_chunk(self, chunk: List[TelemetrySchema]):
+        """Escribe un lote de registros en el segmento actual."""
+        size = RECORD.size
+        buffer = bytearray(size * len(chunk))
+        pack_into = RECORD.pack_into
+        block_min = self._block_min
+        block_max = self._block_max
+        
+        for i, t in enumerate(chunk):
+            timestamp = t.timestamp
+            pack_into(buffer, i * size, *record_values(t))
+            # Comparaciones falsas con NaN: el primer registro inicializa el bloque
+            if not timestamp >= block_min:
+                block_min = timestamp
+            if not timestamp <= block_max:
+                block_max = timestamp
+        
+        self._data_file.write(buffer)
+        self._block_min = block_min
+        self._block_max = block_max
+        self._segment_records += len(chunk)
+        self.written_count += len(chunk)
+    
+    def _close_block(self):
+        """Agrega al índice el bloque de registros escritos desde el último cierre."""
+        count = self._segment_records - self._block_first
+        if count:
+            self._index_file.write(INDEX_ENTRY.pack(
+                self._block_first, count, self._block_min, self._block_max
+            ))
+        self._block_first = self._segment_records
+        self._block_started = time.monotonic()
+        self._block_min = _NAN
+        self._block_max = _NAN
+    
+    def _open_segment(self):
+        """Cierra el segmento actual (si hay) y abre el siguiente."""
+        self._close_segment()
+        self._segment_number += 1
+        base = os.path.join(self.directory, f"flight_{self._session}_{self._segment_number:04d}")
+        path = base + SEGMENT_EXTENSION
+        
+        self._data_file = open(path, "wb", buffering=1 << 20)
+        self._data_file.write(HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, RECORD.size, time.time()))
+        self._index_file = open(base + INDEX_EXTENSION, "wb")
+        self._segment_records = 0
+        self._block_first = 0
+        self._block_started = time.monotonic()
+        self._block_min = _NAN
+        self._block_max = _NAN
+        self.segment_paths.append(path)
+    
+    def _close_segment(self):
+        """Cierra el bloque pendiente y los archivos del segmento actual."""
+        if self._data_file is None:
+            return
+        self._close_block()
+        self._data_file.close()
+        self._index_file.close()
+        self._data_file = None
+        self._index_file = None
+
+
+class FlightLogSegment:
+    """Segmento de grabación mapeado en memoria."""
+    
+    def __init__(self, path: str):
+        """
+        Abre un segmento en modo solo lectura.
+        
+        Args:
+            path: Ruta del archivo .seg
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"Segmento incompleto: {path}")
+        
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.created = HEADER.unpack_from(self._mmap, 0)
+        if magic != SEGMENT_MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"Formato de segmento no soportado: {path} (versión {version})")
+        
+        # Vista sin copia de los registros completos
+        count = (size - HEADER.size) // RECORD.size
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+        self.blocks = self._load_index(os.path.splitext(path)[0] + INDEX_EXTENSION, count)
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def select(self, start: Optional[float] = None, end: Optional[float] = None) -> List[np.ndarray]:
+        """
+        Obtiene las vistas de los bloques que pueden contener el rango [start, end].
+        
+        Returns:
+            Lista de vistas (sin copia) sobre los registros
+        """
+        records = self.records
+        blocks = self.blocks
+        mask = np.ones(len(blocks), dtype=bool)
+        if start is not None:
+            mask &= blocks["max_ts"] >= start
+        if end is not None:
+            mask &= blocks["min_ts"] <= end
+        return [records[int(b["first"]):int(b["first"] + b["count"])] for b in blocks[mask]]
+    
+    def close(self):
+        """Libera el mapeo y el archivo."""
+        self.records = None
+        self.blocks = None
+        try:
+            self._mmap.close()
+        except (BufferError, AttributeError):
+            pass  # Aún hay vistas vivas; se libera al recolectarlas
+        self._file.close()
+    
+    @staticmethod
+    def _load_index(path: str, count: int) -> np.ndarray:
+        """Carga el índice y agrega como bloque la cola no indexada."""
+        blocks = np.zeros(0, dtype=INDEX_DTYPE)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            blocks = np.frombuffer(data[:usable], dtype=INDEX_DTYPE)
+            blocks = blocks[blocks["first"] + blocks["count"] <= count]
+        
+        indexed = int(blocks["first"][-1] + blocks["count"][-1]) if len(blocks) else 0
+        if indexed < count:
+            # Registros sin bloque (grabación en curso o interrumpida): siempre se revisan
+            tail = np.array([(indexed, count - indexed, -np.inf, np.inf)], dtype=INDEX_DTYPE)
+            blocks = np.concatenate([blocks, tail])
+        return blocks
+
+
+class FlightLogReader:
+    """
+    Lector de grabaciones de vuelo.
+    
+    Mapea los segmentos en memoria y usa el índice temporal para revisar solo
+    los bloques que se solapan con el rango pedido. Los filtros por tiempo y
+    dron son vectorizados sobre arrays estructurados de NumPy.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Abre una grabación.
+        
+        Args:
+            path: Archivo .seg o carpeta con segmentos (se leen en orden de nombre)
+        """
+        if os.path.isdir(path):
+            paths = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith(SEGMENT_EXTENSION)
+            )
+        else:
+            paths = [path]
+        self.segments = [FlightLogSegment(p) for p in paths]
+    
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """Cierra todos los segmentos."""
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+    
+    def time_range(self) -> Optional[Tuple[float, float]]:
+        """Obtiene el timestamp mínimo y máximo grabados (None si está vacía)."""
+        bounds = [
+            (float(s.records["timestamp"].min()), float(s.records["timestamp"].max()))
+            for s in self.segments if len(s)
+        ]
+        if not bounds:
+            return None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
+    
+    def drone_ids(self) -> List[str]:
+        """Obtiene los drones presentes en la grabación."""
+        ids = set()
+        for segment in self.segments:
+            if len(segment):
+                ids.update(np.unique(segment.records["drone_id"]).tolist())
+        return sorted(i.decode("utf-8") for i in ids)
+    
+    def read(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        drone_ids: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """
+        Lee los registros de un rango de tiempo y, opcionalmente, de ciertos drones.
+        
+        Args:
+            start: Timestamp mínimo (incluido)
+            end: Timestamp máximo (incluido)
+            drone_ids: Drones a incluir (todos si es None)
+        
+        Returns:
+            Array estructurado (RECORD_DTYPE) en orden de grabación
+        """
+        wanted = None
+        if drone_ids is not None:
+            wanted = np.array([d.encode("utf-8") for d in drone_ids], dtype="S16")
+        
+        parts = []
+        for segment in self.segments:
+            for view in segment.select(start, end):
+                mask = None
+                if start is not None:
+                    mask = view["timestamp"] >= start
+                if end is not None:
+                    upper = view["timestamp"] <= end
+                    mask = upper if mask is None else mask & upper
+                if wanted is not None:
+                    ids = np.isin(view["drone_id"], wanted)
+                    mask = ids if mask is None else mask & ids
+                parts.append(view if mask is None else view[mask])
+        
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+    
+    def iter_telemetry(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        drone_ids: Optional[Iterable[str]] = None
+    ) -> Iterator[TelemetrySchema]:
+        """Itera los registros del rango como TelemetrySchema."""
+        for row in self.read(start, end, drone_ids):
+            yield to_telemetry(row)
+
+
+def to_telemetry(row) -> TelemetrySchema:
+    """
+    Convierte un registro grabado en TelemetrySchema (mismo camino que unpack_record).
+    
+    Args:
+        row: Elemento de un array con RECORD_DTYPE
+    
+    Returns:
+        Registro de telemetría
+    """
+    return unpack_record(row.item())
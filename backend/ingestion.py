@@ -0,0 +1,405 @@
+"""
+Ingesta de telemetría externa por UDP y TCP.
+Acepta NDJSON o registros binarios empaquetados (formato del grabador de
+vuelo) desde estaciones de tierra y los entrega en lotes al mismo camino que
+la telemetría de los drones locales.
+"""
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from common.constants import DroneStatus, TELEMETRY_FIELDS
+from backend.schemas import TelemetrySchema
+from backend.flight_recorder import RECORD, STATUS_NAMES, unpack_record
+
+
+REQUIRED_FIELDS = frozenset(TELEMETRY_FIELDS)
+# Campos numéricos obligatorios y opcionales (deben ser números finitos)
+REQUIRED_NUMERIC_FIELDS = tuple(
+    name for name in TELEMETRY_FIELDS if name not in ("drone_id", "status")
+)
+OPTIONAL_NUMERIC_FIELDS = ("vertical_speed", "max_speed", "max_altitude", "flight_time_remaining")
+VALID_STATUSES = frozenset(status.value for status in DroneStatus)
+# Longitud máxima de una línea NDJSON pendiente en TCP (una conexión sin saltos
+# de línea no puede hacer crecer el buffer sin límite)
+MAX_LINE_BYTES = 64 * 1024
+# Segundos sin mensajes tras los que se olvidan las estadísticas de una fuente
+SOURCE_IDLE_TIMEOUT = 300.0
+_JSON_START = ord("{")
+_WHITESPACE = b" \t\r\n"
+
+
+@dataclass(slots=True)
+class SourceStats:
+    """Estadísticas de una fuente de ingesta."""
+    source: str
+    messages: int = 0
+    rejected: int = 0
+    bytes: int = 0
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+    rate: float = 0.0  # mensajes/s en la última ventana
+    _window_start: float = 0.0
+    _window_count: int = 0
+    
+    def add(self, accepted: int, rejected: int, size: int, now: float):
+        """Acumula un datagrama o fragmento procesado."""
+        if not self.first_seen:
+            self.first_seen = self._window_start = now
+        self.messages += accepted
+        self.rejected += rejected
+        self.bytes += size
+        self.last_seen = now
+        self._window_count += accepted
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.rate = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+    
+    def to_dict(self) -> Dict:
+        """Convierte a diccionario."""
+        return {
+            "source": self.source,
+            "messages": self.messages,
+            "rejected": self.rejected,
+            "bytes": self.bytes,
+            "rate": round(self.rate, 1),
+            "last_seen": self.last_seen,
+        }
+
+
+def _is_finite_number(value) -> bool:
+    """Indica si un valor JSON es un número finito (bool no cuenta como número)."""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+def is_valid_telemetry(item: Dict) -> bool:
+    """
+    Valida un objeto de telemetría externo antes de aceptarlo.
+    
+    Exige todos los campos de TELEMETRY_FIELDS, un drone_id str no vacío,
+    un status que sea un valor de DroneStatus y números finitos en los
+    campos numéricos (los opcionales pueden faltar o ser null).
+    
+    Args:
+        item: Objeto JSON decodificado
+    
+    Returns:
+        True si el registro puede entrar al estado de la flota
+    """
+    if not (isinstance(item, dict) and item.keys() >= REQUIRED_FIELDS):
+        return False
+    drone_id = item["drone_id"]
+    if not (isinstance(drone_id, str) and drone_id):
+        return False
+    status = item["status"]
+    if not (isinstance(status, str) and status in VALID_STATUSES):
+        return False
+    if not all(_is_finite_number(item[name]) for name in REQUIRED_NUMERIC_FIELDS):
+        return False
+    for name in OPTIONAL_NUMERIC_FIELDS:
+        value = item.get(name)
+        if value is not None and not _is_finite_number(value):
+            return False
+    return True
+
+
+def decode_json_lines(data: bytes, records: List[TelemetrySchema]) -> int:
+    """
+    Decodifica NDJSON completo y valida cada objeto (ver is_valid_telemetry).
+    
+    Args:
+        data: Una o más líneas JSON
+        records: Lista donde se agregan los registros válidos
+    
+    Returns:
+        Número de líneas rechazadas
+    """
+    rejected = 0
+    loads = json.loads
+    from_dict = TelemetrySchema.from_dict
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = loads(line)
+            if not is_valid_telemetry(item):
+                rejected += 1
+                continue
+            records.append(from_dict(item))
+        except (ValueError, TypeError):
+            rejected += 1
+    return rejected
+
+
+def decode_packed(data: bytes, records: List[TelemetrySchema]) -> int:
+    """
+    Decodifica registros binarios de ancho fijo (RECORD del grabador de vuelo).
+    
+    Se rechazan los registros con drone_id vacío o no UTF-8, código de estado
+    desconocido o algún campo numérico no finito.
+    
+    Args:
+        data: Bytes con un múltiplo de RECORD.size
+        records: Lista donde se agregan los registros válidos
+    
+    Returns:
+        Número de registros rechazados
+    """
+    rejected = 0
+    isfinite = math.isfinite
+    status_count = len(STATUS_NAMES)
+    for values in RECORD.iter_unpack(data):
+        try:
+            if not 0 <= values[-1] < status_count:
+                rejected += 1
+                continue
+            t = unpack_record(values)
+        except Exception:
+            rejected += 1
+            continue
+        if not (
+            t.drone_id
+            and isfinite(t.latitude) and isfinite(t.longitude) and isfinite(t.altitude)
+            and isfinite(t.heading) and isfinite(t.velocity) and isfinite(t.battery)
+            and isfinite(t.timestamp)
+            and all(v is None or isfinite(v) for v in (
+                t.vertical_speed, t.max_speed, t.max_altitude, t.flight_time_remaining
+            ))
+        ):
+            rejected += 1
+            continue
+        records.append(t)
+    return rejected
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    """Cada datagrama es NDJSON completo o un múltiplo de RECORD.size."""
+    
+    def __init__(self, server: "TelemetryIngestionServer"):
+        self.server = server
+    
+    def datagram_received(self, data: bytes, addr):
+        server = self.server
+        records: List[TelemetrySchema] = []
+        stripped = data.lstrip(_WHITESPACE)
+        if stripped[:1] and stripped[0] == _JSON_START:
+            rejected = decode_json_lines(data, records)
+        elif data and len(data) % RECORD.size == 0:
+            rejected = decode_packed(data, records)
+        else:
+            rejected = 1
+        server.submit(records, rejected, len(data), ("udp", addr))
+
+
+class _TCPProtocol(asyncio.Protocol):
+    """
+    Flujo TCP: el primer byte decide el formato de la conexión
+    ('{' = NDJSON separado por saltos de línea; otro = registros binarios).
+    """
+    
+    def __init__(self, server: "TelemetryIngestionServer"):
+        self.server = server
+        self.buffer = bytearray()
+        self.packed: Optional[bool] = None
+        self.peer = None
+        self.transport = None
+    
+    def connection_made(self, transport):
+        self.transport = transport
+        self.peer = transport.get_extra_info("peername")
+    
+    def data_received(self, data: bytes):
+        buffer = self.buffer
+        buffer.extend(data)
+        
+        if self.packed is None:
+            stripped = buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                buffer.clear()
+                return
+            self.packed = stripped[0] != _JSON_START
+        
+        if self.packed:
+            complete = len(buffer) - len(buffer) % RECORD.size
+        else:
+            complete = buffer.rfind(b"\n") + 1
+        
+        if complete:
+            chunk = bytes(buffer[:complete])
+            del buffer[:complete]
+            records: List[TelemetrySchema] = []
+            if self.packed:
+                rejected = decode_packed(chunk, records)
+            else:
+                rejected = decode_json_lines(chunk, records)
+            self.server.submit(records, rejected, len(chunk), ("tcp", self.peer))
+        
+        if not self.packed and len(buffer) > MAX_LINE_BYTES:
+            # Línea demasiado larga: se rechaza y se cierra la conexión
+            self.server.submit([], 1, len(buffer), ("tcp", self.peer))
+            buffer.clear()
+            if self.transport:
+                self.transport.close()
+
+
+class TelemetryIngestionServer:
+    """
+    Servidor de ingesta de telemetría (UDP y TCP en el loop de asyncio).
+    
+    Los registros decodificados se acumulan en un lote que se entrega al
+    callback en la siguiente iteración del loop (o antes, al llegar a
+    batch_size), de modo que una ráfaga de datagramas se procesa de una vez.
+    Se llevan estadísticas de mensajes, rechazos y tasa por host de origen;
+    las de hosts inactivos más de SOURCE_IDLE_TIMEOUT se descartan.
+    """
+    
+    def __init__(
+        self,
+        callback: Optional[Callable[[TelemetrySchema], None]] = None,
+        host: str = "0.0.0.0",
+        udp_port: Optional[int] = 14600,
+        tcp_port: Optional[int] = 14601,
+        batch_size: int = 5000
+    ):
+        """
+        Inicializa el servidor.
+        
+        Args:
+            callback: Función a llamar con cada registro válido
+            host: Interfaz de escucha
+            udp_port: Puerto UDP (None = desactivado)
+            tcp_port: Puerto TCP (None = desactivado)
+            batch_size: Registros máximos por lote antes de entregarlo
+        """
+        self.callback = callback
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.batch_size = batch_size
+        
+        self.sources: Dict[str, SourceStats] = {}
+        self._batch: List[TelemetrySchema] = []
+        self._flush_scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._udp_transport = None
+        self._tcp_server = None
+        
+        # Contadores de estadísticas
+        self.accepted_count = 0
+        self.rejected_count = 0
+        self.batch_count = 0
+    
+    async def start(self):
+        """Abre los sockets configurados."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        self._loop = asyncio.get_running_loop()
+        if self.udp_port is not None:
+            self._udp_transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _UDPProtocol(self),
+                local_addr=(self.host, self.udp_port)
+            )
+            self.udp_port = self._udp_transport.get_extra_info("sockname")[1]
+            logger.info(f"Ingesta de telemetría UDP en {self.host}:{self.udp_port}")
+        if self.tcp_port is not None:
+            self._tcp_server = await self._loop.create_server(
+                lambda: _TCPProtocol(self), self.host, self.tcp_port
+            )
+            self.tcp_port = self._tcp_server.sockets[0].getsockname()[1]
+            logger.info(f"Ingesta de telemetría TCP en {self.host}:{self.tcp_port}")
+    
+    async def stop(self):
+        """Cierra los sockets y entrega el lote pendiente."""
+        if self._udp_transport:
+            self._udp_transport.close()
+            self._udp_transport = None
+        if self._tcp_server:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+            self._tcp_server = None
+        self.flush()
+    
+    def submit(
+        self,
+        records: List[TelemetrySchema],
+        rejected: int,
+        size: int,
+        origin: Tuple[str, Optional[Tuple]]
+    ):
+        """
+        Agrega registros decodificados al lote y actualiza las estadísticas.
+        
+        Args:
+            records: Registros válidos
+            rejected: Número de mensajes rechazados
+            size: Bytes procesados
+            origin: (protocolo, dirección) de la fuente
+        """
+        # Por host: cada reconexión o puerto efímero crearía una entrada nueva
+        protocol, addr = origin
+        source = f"{protocol}://{addr[0]}" if addr else protocol
+        now = time.monotonic()
+        stats = self.sources.get(source)
+        if stats is None:
+            self._prune_sources(now)
+            stats = self.sources[source] = SourceStats(source)
+        stats.add(len(records), rejected, size, now)
+        self.accepted_count += len(records)
+        self.rejected_count += rejected
+        
+        if not records:
+            return
+        self._batch.extend(records)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+        elif not self._flush_scheduled and self._loop:
+            self._flush_scheduled = True
+            self._loop.call_soon(self.flush)
+    
+    def _prune_sources(self, now: float):
+        """Descarta las estadísticas de las fuentes inactivas (al aparecer una nueva)."""
+        idle = [
+            source for source, stats in self.sources.items()
+            if now - stats.last_seen > SOURCE_IDLE_TIMEOUT
+        ]
+        for source in idle:
+            del self.sources[source]
+    
+    def flush(self):
+        """Entrega el lote acumulado al callback."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        self._flush_scheduled = False
+        batch = self._batch
+        if not batch:
+            return
+        self._batch = []
+        self.batch_count += 1
+        
+        callback = self.callback
+        if callback is None:
+            return
+        for telemetry in batch:
+            try:
+                callback(telemetry)
+            except Exception as e:
+                logger.error(f"Error en callback de ingesta: {e}", exc_info=True)
+    
+    def get_stats(self) -> Dict:
+        """Obtiene las estadísticas globales y por fuente."""
+        return {
+            "accepted": self.accepted_count,
+            "rejected": self.rejected_count,
+            "batches": self.batch_count,
+            "sources": [stats.to_dict() for stats in self.sources.values()],
+        }
@@ -1,32 +1,108 @@
 """
-Esquemas de datos para telemetría y POIs.
+Esquemas de datos para telemetría, POIs y comandos.
 """
-from typing import Dict, Any
-from dataclasses import dataclass, asdict
-from common.constants import POIType, DroneStatus
+import json
+import time
+from typing import Dict, Any, Optional
+from dataclasses import dataclass, asdict, field
+from common.constants import POIType, DroneStatus, CommandStatus
 
 
-@dataclass
+@dataclass(slots=True)
 class TelemetrySchema:
-    """Esquema para telemetría de drones."""
+    """
+    Registro de telemetría de drones.
+    
+    Es el tipo canónico en memoria de todo el pipeline (generadores, gestor de
+    drones, almacenes y UI). Usa __slots__ para evitar el diccionario por
+    instancia; la conversión a diccionario/JSON solo se hace en los bordes
+    (servidor HTTP, pub/sub, archivos).
+    
+    Los campos opcionales específicos de Matrice 300 RTK valen None cuando
+    la fuente no los reporta.
+    """
     drone_id: str
-    latitude: float
-    longitude: float
-    altitude: float
-    heading: float
-    velocity: float
-    battery: float
-    status: str
-    timestamp: float
+    latitude: float = 0.0
+    longitude: float = 0.0
+    altitude: float = 0.0
+    heading: float = 0.0
+    velocity: float = 0.0
+    battery: float = 100.0
+    status: str = DroneStatus.IDLE.value
+    timestamp: float = 0.0
+    vertical_speed: Optional[float] = None
+    rtk_fix: Optional[bool] = None
+    max_speed: Optional[float] = None
+    max_altitude: Optional[float] = None
+    flight_time_remaining: Optional[float] = None
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convierte a diccionario."""
-        return asdict(self)
+        """Convierte a diccionario (omite los campos opcionales ausentes)."""
+        data = {
+            "drone_id": self.drone_id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "altitude": self.altitude,
+            "heading": self.heading,
+            "velocity": self.velocity,
+            "battery": self.battery,
+            "status": self.status,
+            "timestamp": self.timestamp,
+        }
+        if self.vertical_speed is not None:
+            data["vertical_speed"] = self.vertical_speed
+        if self.rtk_fix is not None:
+            data["rtk_fix"] = self.rtk_fix
+        if self.max_speed is not None:
+            data["max_speed"] = self.max_speed
+        if self.max_altitude is not None:
+            data["max_altitude"] = self.max_altitude
+        if self.flight_time_remaining is not None:
+            data["flight_time_remaining"] = self.flight_time_remaining
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "TelemetrySchema":
-        """Crea desde un diccionario."""
-        return cls(**data)
+        """
+        Crea desde un diccionario, normalizando tipos y valores por defecto.
+        
+        Args:
+            data: Telemetría cruda (MAVSDK, JSON externo, pub/sub)
+        
+        Returns:
+            Registro de telemetría
+        """
+        get = data.get
+        vertical_speed = get("vertical_speed")
+        rtk_fix = get("rtk_fix")
+        max_speed = get("max_speed")
+        max_altitude = get("max_altitude")
+        flight_time_remaining = get("flight_time_remaining")
+        return cls(
+            get("drone_id", "UNKNOWN"),
+            float(get("latitude", 0.0)),
+            float(get("longitude", 0.0)),
+            float(get("altitude", 0.0)),
+            float(get("heading", 0.0)),
+            float(get("velocity", 0.0)),
+            float(get("battery", 100.0)),
+            get("status", DroneStatus.IDLE.value),
+            float(get("timestamp") or time.time()),
+            float(vertical_speed) if vertical_speed is not None else None,
+            bool(rtk_fix) if rtk_fix is not None else None,
+            float(max_speed) if max_speed is not None else None,
+            float(max_altitude) if max_altitude is not None else None,
+            float(flight_time_remaining) if flight_time_remaining is not None else None,
+        )
+    
+    def to_json(self) -> str:
+        """Serializa a JSON."""
+        return json.dumps(self.to_dict())
+    
+    @classmethod
+    def from_json(cls, payload: str) -> "TelemetrySchema":
+        """Crea desde una cadena JSON."""
+        return cls.from_dict(json.loads(payload))
 
 
 @dataclass
@@ -48,3 +124,30 @@ class POISchema:
     def from_dict(cls, data: Dict[str, Any]) -> "POISchema":
         """Crea desde un diccionario."""
         return cls(**data)
+
+
+@dataclass(slots=True)
+class DroneCommand:
+    """Comando dirigido a un dron (ej., "set_target" con latitude, longitude, altitude)."""
+    drone_id: str
+    command: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class CommandAck:
+    """Acuse del envío de un comando a un dron."""
+    drone_id: str
+    command: str
+    status: str  # Valor de CommandStatus
+    latency: float  # Segundos desde el envío hasta el acuse (o el fallo)
+    error: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        """Indica si el dron aceptó el comando."""
+        return self.status == CommandStatus.OK.value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario."""
+        return asdict(self)
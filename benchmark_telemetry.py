@@ -0,0 +1,152 @@
+"""
+Benchmark del pipeline de telemetría a escala de flota.
+Compara el camino anterior basado en diccionarios con el registro TelemetrySchema:
+- Asignación de memoria por muestra
+- Tiempo de CPU de generación + almacenamiento + lectura
+- Costo de grabación (FlightRecorder) en el loop y rendimiento del escritor
+"""
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from common.utils import normalize_telemetry
+from backend.schemas import TelemetrySchema
+from backend.flight_recorder import FlightRecorder, FlightLogReader
+
+
+FLEET_SIZE = 1000
+SAMPLES_PER_DRONE = 50
+
+
+def _legacy_sample(drone_id: str, i: int):
+    """Camino anterior: normalize_telemetry + campos extra + copia en el almacén."""
+    telemetry = normalize_telemetry({
+        "drone_id": drone_id,
+        "latitude": 20.9674 + i * 1e-6,
+        "longitude": -89.5926 + i * 1e-6,
+        "altitude": 50.0,
+        "heading": 90.0,
+        "velocity": 12.0,
+        "battery": 80.0,
+        "status": "flying",
+        "timestamp": time.time(),
+    })
+    telemetry["vertical_speed"] = 0.0
+    telemetry["rtk_fix"] = True
+    telemetry["max_speed"] = 23.0
+    telemetry["max_altitude"] = 5000.0
+    telemetry["flight_time_remaining"] = 1200.0
+    return telemetry
+
+
+def _record_sample(drone_id: str, i: int):
+    """Camino nuevo: un único registro con __slots__."""
+    return TelemetrySchema(
+        drone_id=drone_id,
+        latitude=20.9674 + i * 1e-6,
+        longitude=-89.5926 + i * 1e-6,
+        altitude=50.0,
+        heading=90.0,
+        velocity=12.0,
+        battery=80.0,
+        status="flying",
+        timestamp=time.time(),
+        vertical_speed=0.0,
+        rtk_fix=True,
+        max_speed=23.0,
+        max_altitude=5000.0,
+        flight_time_remaining=1200.0,
+    )
+
+
+def run_legacy(drone_ids):
+    """Genera, almacena (copia) y lee (copia) con diccionarios."""
+    store = {}
+    for i in range(SAMPLES_PER_DRONE):
+        for drone_id in drone_ids:
+            telemetry = _legacy_sample(drone_id, i)
+            store[drone_id] = telemetry.copy()  # TelemetryDataStore.update_telemetry
+            _ = store[drone_id].copy()  # Lectura de consumidor
+    return store
+
+
+def run_record(drone_ids):
+    """Genera, almacena (referencia) y lee (atributos) con registros."""
+    store = {}
+    for i in range(SAMPLES_PER_DRONE):
+        for drone_id in drone_ids:
+            record = _record_sample(drone_id, i)
+            store[drone_id] = record
+            _ = store[drone_id].battery  # Lectura de consumidor
+    return store
+
+
+def measure(name, func, drone_ids):
+    """Mide tiempo de CPU y memoria asignada para un escenario."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = func(drone_ids)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    samples = len(drone_ids) * SAMPLES_PER_DRONE
+    sample = next(iter(store.values()))
+    sample_size = sys.getsizeof(sample)
+    print(f"{name}:")
+    print(f"  - Muestras: {samples}")
+    print(f"  - Tiempo total: {elapsed * 1000:.1f} ms ({elapsed / samples * 1e6:.2f} us/muestra)")
+    print(f"  - Tamaño de una muestra retenida: {sample_size} bytes")
+    print(f"  - Pico de memoria del almacén: {peak / 1024:.1f} KiB")
+    return elapsed, sample_size, peak
+
+
+def measure_recorder(drone_ids):
+    """Mide el costo de record() en el hilo llamador y el tiempo total hasta disco."""
+    directory = tempfile.mkdtemp(prefix="flight_bench_")
+    records = [_record_sample(drone_id, i) for i in range(SAMPLES_PER_DRONE) for drone_id in drone_ids]
+    
+    recorder = FlightRecorder(directory)
+    recorder.start()
+    start = time.perf_counter()
+    for record in records:
+        recorder.record(record)
+    enqueue = time.perf_counter() - start
+    recorder.stop()
+    total = time.perf_counter() - start
+    
+    with FlightLogReader(directory) as reader:
+        query_start = time.perf_counter()
+        selected = reader.read(drone_ids=drone_ids[:1])
+        query = time.perf_counter() - query_start
+        stored = len(reader)
+    shutil.rmtree(directory, ignore_errors=True)
+    
+    samples = len(records)
+    print("FlightRecorder:")
+    print(f"  - Costo en el loop: {enqueue / samples * 1e6:.2f} us/muestra")
+    print(f"  - Rendimiento hasta disco: {samples / total:,.0f} muestras/s")
+    print(f"  - Registros leídos: {stored} (consulta de un dron: {len(selected)} en {query * 1000:.1f} ms)")
+
+
+def main():
+    """Ejecuta el benchmark."""
+    print("=" * 60)
+    print(f"BENCHMARK DE TELEMETRÍA ({FLEET_SIZE} drones x {SAMPLES_PER_DRONE} muestras)")
+    print("=" * 60)
+    
+    drone_ids = [f"DRONE_{i:03d}" for i in range(FLEET_SIZE)]
+    legacy = measure("Diccionarios (anterior)", run_legacy, drone_ids)
+    record = measure("TelemetrySchema (slots)", run_record, drone_ids)
+    
+    print("-" * 60)
+    print(f"Aceleración de CPU: {legacy[0] / record[0]:.2f}x")
+    print(f"Reducción de tamaño por muestra: {legacy[1] / record[1]:.2f}x")
+    print(f"Reducción de pico de memoria: {legacy[2] / record[2]:.2f}x")
+    print("-" * 60)
+    measure_recorder(drone_ids)
+
+
+if __name__ == '__main__':
+    main()
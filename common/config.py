@@ -1,8 +1,8 @@
 """
 Configuración para el sistema de coordinación multi-dron.
 """
-from dataclasses import dataclass
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, List
 import json
 import os
 
@@ -18,19 +18,82 @@ class Config:
     # Configuración de drones
     max_drones: int = 10
     telemetry_update_interval: float = 0.5  # segundos
+    ui_refresh_interval: float = 0.2  # segundos entre drenados del buffer de telemetría
+    ui_max_fps: float = 10.0  # frames (page.update()) por segundo como máximo del despachador de UI
+    # Cola acotada entre drones y UI: "conflate" (última muestra por dron),
+    # "drop_oldest" o "block" (el productor espera hasta telemetry_queue_block_timeout)
+    telemetry_queue_policy: str = "conflate"
+    telemetry_queue_size: int = 10000
+    telemetry_queue_block_timeout: float = 0.1  # segundos
+    command_timeout: float = 5.0  # segundos máximos de espera por el acuse de cada comando
+    drone_stale_timeout: float = 15.0  # segundos sin telemetría para marcar un dron obsoleto (0 = no vigilar)
+    drone_evict_timeout: float = 60.0  # segundos sin telemetría para retirarlo (0 = nunca)
     
     # Configuración de simulación
     use_fake_telemetry: bool = True  # Establecer a False para usar MAVSDK
     fake_drone_count: int = 6
+    # Grupos de telemetría MAVSDK que disparan una emisión inmediata al estar todos frescos
+    # (position, velocity, battery, flight_mode)
+    telemetry_emit_fields: List[str] = field(default_factory=lambda: ["position"])
+    
+    # Tasa adaptativa por dron: telemetry_update_interval en movimiento, menos frecuente
+    # en vuelo estacionario o en tierra; cambios de estado y umbrales de batería al instante
+    adaptive_rate_enabled: bool = True
+    adaptive_rate_hover_interval: float = 2.0  # segundos
+    adaptive_rate_idle_interval: float = 5.0  # segundos
+    adaptive_rate_battery_thresholds: List[float] = field(default_factory=lambda: [50.0, 30.0, 20.0, 10.0])
+    
+    # Banda muerta: no propagar muestras sin cambios significativos (latido cada heartbeat)
+    telemetry_deadband_enabled: bool = True
+    deadband_position_m: float = 0.5
+    deadband_altitude_m: float = 0.5
+    deadband_battery_pct: float = 1.0
+    deadband_heading_deg: float = 2.0
+    deadband_velocity_ms: float = 0.5
+    deadband_heartbeat_interval: float = 10.0  # segundos
+    
+    # Reproducción de una grabación del grabador de vuelo (tiene prioridad sobre las demás fuentes)
+    replay_file: str = ""  # Segmento .seg o carpeta de grabación; vacío = desactivado
+    replay_speed: float = 1.0  # 1.0 = tiempo real, 10.0 = 10x, 0 = lo más rápido posible
+    replay_loop: bool = False
+    replay_start_offset: float = 0.0  # Segundos desde el inicio de la grabación
+    
+    # Conexiones MAVSDK (un vehículo por cadena de conexión, conectados en paralelo)
+    mavsdk_connection_strings: List[str] = field(
+        default_factory=lambda: ["udp://:14540", "udp://:14541", "udp://:14542"]
+    )
+    mavsdk_connect_timeout: float = 10.0  # segundos por intento
+    mavsdk_backoff_initial: float = 1.0  # segundos tras el primer fallo
+    mavsdk_backoff_max: float = 30.0  # espera máxima entre reintentos
+    
+    # Ingesta de telemetría externa (NDJSON o registros binarios, además de la fuente local)
+    ingestion_enabled: bool = False
+    ingestion_host: str = "0.0.0.0"
+    ingestion_udp_port: int = 14600
+    ingestion_tcp_port: int = 14601
+    
+    # Gateway MAVLink (un solo puerto UDP para toda la flota, sin MAVSDK)
+    use_mavlink_gateway: bool = False  # Con use_fake_telemetry=False, usar el gateway en vez de MAVSDK
+    mavlink_gateway_host: str = "0.0.0.0"
+    mavlink_gateway_port: int = 14550
     
     # Almacenamiento
     poi_storage_file: str = "pois.json"
     
+    # Grabador de vuelo (telemetría binaria en segmentos de solo anexado)
+    flight_recorder_enabled: bool = False
+    flight_recorder_dir: str = "recordings"
+    flight_recorder_segment_records: int = 1_000_000  # ~80 MB por segmento
+    
     # Configuración de UI
     window_width: int = 1400
     window_height: int = 900
     window_title: str = "Sistema de Coordinación Multi-Dron"
     
+    # Dead reckoning en el mapa (extrapolación entre muestras de telemetría)
+    dead_reckoning_horizon: float = 2.0  # segundos máximos de extrapolación (0 = desactivado)
+    dead_reckoning_correction: float = 0.5  # segundos para absorber la corrección de una muestra nueva
+    
     @classmethod
     def load_from_file(cls, path: str = "config.json") -> "Config":
         """Carga la configuración desde un archivo JSON."""
@@ -48,12 +111,52 @@ class Config:
             "default_zoom": self.default_zoom,
             "max_drones": self.max_drones,
             "telemetry_update_interval": self.telemetry_update_interval,
+            "ui_refresh_interval": self.ui_refresh_interval,
+            "ui_max_fps": self.ui_max_fps,
+            "telemetry_queue_policy": self.telemetry_queue_policy,
+            "telemetry_queue_size": self.telemetry_queue_size,
+            "telemetry_queue_block_timeout": self.telemetry_queue_block_timeout,
+            "command_timeout": self.command_timeout,
+            "drone_stale_timeout": self.drone_stale_timeout,
+            "drone_evict_timeout": self.drone_evict_timeout,
             "use_fake_telemetry": self.use_fake_telemetry,
             "fake_drone_count": self.fake_drone_count,
+            "telemetry_emit_fields": self.telemetry_emit_fields,
+            "adaptive_rate_enabled": self.adaptive_rate_enabled,
+            "adaptive_rate_hover_interval": self.adaptive_rate_hover_interval,
+            "adaptive_rate_idle_interval": self.adaptive_rate_idle_interval,
+            "adaptive_rate_battery_thresholds": self.adaptive_rate_battery_thresholds,
+            "telemetry_deadband_enabled": self.telemetry_deadband_enabled,
+            "deadband_position_m": self.deadband_position_m,
+            "deadband_altitude_m": self.deadband_altitude_m,
+            "deadband_battery_pct": self.deadband_battery_pct,
+            "deadband_heading_deg": self.deadband_heading_deg,
+            "deadband_velocity_ms": self.deadband_velocity_ms,
+            "deadband_heartbeat_interval": self.deadband_heartbeat_interval,
+            "replay_file": self.replay_file,
+            "replay_speed": self.replay_speed,
+            "replay_loop": self.replay_loop,
+            "replay_start_offset": self.replay_start_offset,
+            "mavsdk_connection_strings": self.mavsdk_connection_strings,
+            "mavsdk_connect_timeout": self.mavsdk_connect_timeout,
+            "mavsdk_backoff_initial": self.mavsdk_backoff_initial,
+            "mavsdk_backoff_max": self.mavsdk_backoff_max,
+            "ingestion_enabled": self.ingestion_enabled,
+            "ingestion_host": self.ingestion_host,
+            "ingestion_udp_port": self.ingestion_udp_port,
+            "ingestion_tcp_port": self.ingestion_tcp_port,
+            "use_mavlink_gateway": self.use_mavlink_gateway,
+            "mavlink_gateway_host": self.mavlink_gateway_host,
+            "mavlink_gateway_port": self.mavlink_gateway_port,
             "poi_storage_file": self.poi_storage_file,
+            "flight_recorder_enabled": self.flight_recorder_enabled,
+            "flight_recorder_dir": self.flight_recorder_dir,
+            "flight_recorder_segment_records": self.flight_recorder_segment_records,
             "window_width": self.window_width,
             "window_height": self.window_height,
             "window_title": self.window_title,
+            "dead_reckoning_horizon": self.dead_reckoning_horizon,
+            "dead_reckoning_correction": self.dead_reckoning_correction,
         }
         with open(path, "w") as f:
             json.dump(data, f, indent=2)
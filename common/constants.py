@@ -23,6 +23,31 @@ class DroneStatus(str, Enum):
     ERROR = "error"
 
 
+class ConnectionHealth(str, Enum):
+    """Estados de salud de la conexión con un vehículo."""
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    DISCONNECTED = "disconnected"  # Se perdió la conexión; se reintentará
+    BACKOFF = "backoff"  # Esperando antes del siguiente intento
+    STOPPED = "stopped"
+
+
+class QueuePolicy(str, Enum):
+    """Política de la cola de telemetría cuando está llena."""
+    BLOCK = "block"  # El productor espera a que haya espacio (con plazo)
+    DROP_OLDEST = "drop_oldest"  # Se descarta la muestra más antigua
+    CONFLATE = "conflate"  # Solo la última muestra pendiente por dron
+
+
+class CommandStatus(str, Enum):
+    """Resultado del envío de un comando a un dron."""
+    OK = "ok"
+    UNKNOWN_DRONE = "unknown_drone"  # No hay dron activo con ese ID
+    UNSUPPORTED = "unsupported"  # El dron no implementa el comando
+    TIMEOUT = "timeout"  # Sin acuse dentro del plazo
+    FAILED = "failed"  # El dron rechazó el comando o falló el envío
+
+
 # Nombres de canales Pub/Sub para Flet
 CHANNEL_TELEMETRY = "telemetry"
 CHANNEL_POI = "poi"
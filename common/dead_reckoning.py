@@ -0,0 +1,157 @@
+"""
+Estimación por navegación a estima (dead reckoning).
+Extrapola la posición de cada dron desde su última muestra (rumbo, velocidad
+y velocidad vertical) para desacoplar la tasa de visualización de la tasa de
+telemetría, y corrige suavemente cuando llega una muestra real.
+"""
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+
+METERS_PER_DEGREE_LAT = 111320.0  # Aproximación esférica, suficiente a escala de misión
+
+# Campos del almacén de flota necesarios para extrapolar
+PREDICTION_FIELDS = ("latitude", "longitude", "altitude", "heading", "velocity", "vertical_speed", "timestamp")
+
+
+def extrapolate(lat, lon, alt, heading, velocity, vertical_speed, dt):
+    """
+    Extrapola una posición a rumbo y velocidad constantes.
+    
+    Acepta escalares o arrays de NumPy (vectorizado sobre la flota).
+    
+    Args:
+        lat: Latitud de la muestra (grados)
+        lon: Longitud de la muestra (grados)
+        alt: Altitud de la muestra (metros)
+        heading: Rumbo (grados, 0 = norte, sentido horario)
+        velocity: Velocidad horizontal (m/s)
+        vertical_speed: Velocidad vertical (m/s, positivo = sube)
+        dt: Segundos transcurridos desde la muestra
+    
+    Returns:
+        Tupla (lat, lon, alt) extrapolada
+    """
+    heading_rad = np.radians(heading)
+    distance = velocity * dt
+    north = distance * np.cos(heading_rad)
+    east = distance * np.sin(heading_rad)
+    new_lat = lat + north / METERS_PER_DEGREE_LAT
+    new_lon = lon + east / (METERS_PER_DEGREE_LAT * np.cos(np.radians(lat)))
+    new_alt = alt + vertical_speed * dt
+    return new_lat, new_lon, new_alt
+
+
+class DeadReckoningTracker:
+    """
+    Predicción de posiciones de la flota con corrección suave.
+    
+    Trabaja sobre el FleetStateStore: en cada consulta extrapola todas las
+    filas de forma vectorizada hasta max_horizon segundos. Cuando un dron
+    tiene una muestra nueva, la diferencia entre lo que se predecía con la
+    muestra anterior y lo que predice la nueva se guarda como desplazamiento
+    y se reduce linealmente a cero en correction_time segundos, de modo que
+    la posición mostrada no salta.
+    """
+    
+    def __init__(self, max_horizon: float = 2.0, correction_time: float = 0.5):
+        """
+        Inicializa el predictor.
+        
+        Args:
+            max_horizon: Segundos máximos de extrapolación (después, la posición se congela)
+            correction_time: Segundos para absorber la corrección de una muestra nueva
+        """
+        self.max_horizon = max_horizon
+        self.correction_time = correction_time
+        # Estado de la consulta anterior, alineado por fila con _track_ids:
+        # muestra de la que se extrapolaba, desplazamiento (lat, lon, alt) e inicio de corrección
+        self._track_ids: List[str] = []
+        self._track_rows: Dict[str, int] = {}
+        self._samples: Dict[str, np.ndarray] = {field: np.zeros(0) for field in PREDICTION_FIELDS}
+        self._offsets = np.zeros((0, 3))
+        self._corrected_at = np.zeros(0)
+    
+    def predict(self, fleet_state, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Predice la posición actual de toda la flota.
+        
+        Solo los drones cuyo timestamp cambió desde la consulta anterior
+        recalculan su desplazamiento de corrección; la detección y el cálculo
+        son operaciones de NumPy sobre toda la flota.
+        
+        Args:
+            fleet_state: FleetStateStore con la última muestra de cada dron
+            now: Hora de la predicción (time.time() por defecto)
+        
+        Returns:
+            drone_id -> {"latitude", "longitude", "altitude", "age"}; age son
+            los segundos desde la última muestra real
+        """
+        now = time.time() if now is None else now
+        ids, columns = fleet_state.snapshot(PREDICTION_FIELDS)
+        columns["vertical_speed"] = np.nan_to_num(columns["vertical_speed"])
+        n = len(ids)
+        
+        age = now - columns["timestamp"]
+        pred_lat, pred_lon, pred_alt = self._extrapolate(columns, now)
+        
+        # Filas de la consulta anterior (solo se recalculan si cambió el conjunto de IDs)
+        if ids == self._track_ids:
+            previous = np.arange(n)
+        else:
+            track_rows = self._track_rows
+            previous = np.fromiter((track_rows.get(drone_id, -1) for drone_id in ids), dtype=np.intp, count=n)
+            self._track_ids = ids
+            self._track_rows = {drone_id: i for i, drone_id in enumerate(ids)}
+        known = previous >= 0
+        source = previous[known]
+        
+        offsets = np.zeros((n, 3))
+        corrected_at = np.full(n, now)
+        offsets[known] = self._offsets[source]
+        corrected_at[known] = self._corrected_at[source]
+        
+        # Muestra nueva: partir desde donde se estaba mostrando el dron
+        old = {field: values[source] for field, values in self._samples.items()}
+        changed_known = old["timestamp"] != columns["timestamp"][known]
+        if changed_known.any():
+            rows = np.flatnonzero(known)[changed_known]
+            old = {field: values[changed_known] for field, values in old.items()}
+            shown_lat, shown_lon, shown_alt = self._extrapolate(old, now)
+            weight = self._correction_weights(corrected_at[rows], now)
+            offsets[rows, 0] = shown_lat + offsets[rows, 0] * weight - pred_lat[rows]
+            offsets[rows, 1] = shown_lon + offsets[rows, 1] * weight - pred_lon[rows]
+            offsets[rows, 2] = shown_alt + offsets[rows, 2] * weight - pred_alt[rows]
+            corrected_at[rows] = now
+        
+        self._samples = columns
+        self._offsets = offsets
+        self._corrected_at = corrected_at
+        
+        weights = self._correction_weights(corrected_at, now)
+        pred_lat = pred_lat + offsets[:, 0] * weights
+        pred_lon = pred_lon + offsets[:, 1] * weights
+        pred_alt = pred_alt + offsets[:, 2] * weights
+        
+        return {
+            drone_id: {"latitude": lat, "longitude": lon, "altitude": alt, "age": sample_age}
+            for drone_id, lat, lon, alt, sample_age in zip(
+                ids, pred_lat.tolist(), pred_lon.tolist(), pred_alt.tolist(), age.tolist()
+            )
+        }
+    
+    def _extrapolate(self, samples: Dict[str, np.ndarray], now: float):
+        """Extrapola un conjunto de muestras (columnas de PREDICTION_FIELDS) hasta now."""
+        dt = np.clip(now - samples["timestamp"], 0.0, self.max_horizon)
+        return extrapolate(
+            samples["latitude"], samples["longitude"], samples["altitude"],
+            samples["heading"], samples["velocity"], samples["vertical_speed"], dt
+        )
+    
+    def _correction_weights(self, corrected_at: np.ndarray, now: float) -> np.ndarray:
+        """Fracción del desplazamiento de corrección que aún se aplica a cada dron."""
+        if self.correction_time <= 0:
+            return np.zeros(len(corrected_at))
+        return np.clip(1.0 - (now - corrected_at) / self.correction_time, 0.0, None)
@@ -0,0 +1,164 @@
+"""
+Filtro de banda muerta para telemetría.
+Descarta las muestras que no cambian de forma significativa respecto a la
+última publicada de cada dron (jitter RTK, timestamp nuevo), con un latido
+periódico para que la detección de drones obsoletos siga funcionando.
+También define la última muestra publicada y la comparación por umbrales
+que comparte con la política de tasa adaptativa (drones/rate_policy.py).
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from common.dead_reckoning import METERS_PER_DEGREE_LAT
+from backend.schemas import TelemetrySchema
+
+
+@dataclass(slots=True)
+class PublishedSample:
+    """Valores de la última muestra publicada de un dron."""
+    last_emit: float
+    latitude: float
+    longitude: float
+    altitude: float
+    battery: float
+    heading: float
+    velocity: float
+    status: str
+    
+    @classmethod
+    def from_telemetry(cls, telemetry: TelemetrySchema, now: float) -> "PublishedSample":
+        """Registra una muestra publicada en el instante now."""
+        return cls(
+            last_emit=now,
+            latitude=telemetry.latitude,
+            longitude=telemetry.longitude,
+            altitude=telemetry.altitude,
+            battery=telemetry.battery,
+            heading=telemetry.heading,
+            velocity=telemetry.velocity,
+            status=telemetry.status,
+        )
+
+
+def _reaches(delta: float, threshold: float) -> bool:
+    """Cambio que alcanza el umbral; sin cambio nunca cuenta (ni con umbral 0)."""
+    return delta >= threshold and delta > 0.0
+
+
+@dataclass(slots=True)
+class DeltaThresholds:
+    """
+    Umbrales de cambio respecto a la última muestra publicada.
+    
+    Un cambio cuenta si alcanza su umbral (comparación inclusiva). Un umbral
+    None no se compara; uno de 0 hace que cualquier cambio cuente.
+    """
+    position_m: Optional[float] = None
+    altitude_m: Optional[float] = None
+    battery_pct: Optional[float] = None
+    heading_deg: Optional[float] = None
+    velocity_ms: Optional[float] = None
+    
+    def exceeded(self, last: PublishedSample, telemetry: TelemetrySchema) -> bool:
+        """Indica si algún campo alcanza su umbral respecto a la última muestra publicada."""
+        if self.altitude_m is not None and _reaches(abs(telemetry.altitude - last.altitude), self.altitude_m):
+            return True
+        if self.battery_pct is not None and _reaches(abs(telemetry.battery - last.battery), self.battery_pct):
+            return True
+        if self.heading_deg is not None and _reaches(abs((telemetry.heading - last.heading + 180.0) % 360.0 - 180.0), self.heading_deg):
+            return True
+        if self.velocity_ms is not None and _reaches(abs(telemetry.velocity - last.velocity), self.velocity_ms):
+            return True
+        if self.position_m is None:
+            return False
+        north = (telemetry.latitude - last.latitude) * METERS_PER_DEGREE_LAT
+        east = (telemetry.longitude - last.longitude) * METERS_PER_DEGREE_LAT * math.cos(math.radians(last.latitude))
+        return _reaches(math.hypot(north, east), self.position_m)
+
+
+
+class TelemetryDeadbandFilter:
+    """
+    Banda muerta por campo sobre el flujo de telemetría.
+    
+    Una muestra se propaga si algún campo alcanza su umbral respecto a la
+    última muestra propagada del mismo dron, si cambia el estado, o si han
+    pasado heartbeat_interval segundos desde la última (latido). Un umbral
+    de 0 hace que cualquier cambio en ese campo se propague.
+    """
+    
+    def __init__(
+        self,
+        position_m: float = 0.5,
+        altitude_m: float = 0.5,
+        battery_pct: float = 1.0,
+        heading_deg: float = 2.0,
+        velocity_ms: float = 0.5,
+        heartbeat_interval: float = 10.0
+    ):
+        """
+        Inicializa el filtro.
+        
+        Args:
+            position_m: Desplazamiento horizontal mínimo (metros)
+            altitude_m: Cambio de altitud mínimo (metros)
+            battery_pct: Cambio de batería mínimo (puntos porcentuales)
+            heading_deg: Cambio de rumbo mínimo (grados)
+            velocity_ms: Cambio de velocidad mínimo (m/s); evita que el mapa
+                extrapole una velocidad que ya no es la real
+            heartbeat_interval: Segundos máximos sin propagar una muestra de un dron
+        """
+        self.thresholds = DeltaThresholds(position_m, altitude_m, battery_pct, heading_deg, velocity_ms)
+        self.heartbeat_interval = heartbeat_interval
+        
+        self._published: Dict[str, PublishedSample] = {}
+        self._lock = threading.Lock()
+        
+        # Contadores de estadísticas
+        self.passed_count = 0
+        self.suppressed_count = 0
+        self.heartbeat_count = 0
+    
+    def accept(self, telemetry: TelemetrySchema, now: Optional[float] = None) -> bool:
+        """
+        Indica si la muestra debe propagarse y, si es así, la registra.
+        
+        Args:
+            telemetry: Muestra recibida
+            now: Reloj monotónico (time.monotonic() por defecto)
+        
+        Returns:
+            True si la muestra sale de la banda muerta (o es un latido)
+        """
+        now = time.monotonic() if now is None else now
+        drone_id = telemetry.drone_id
+        
+        with self._lock:
+            last = self._published.get(drone_id)
+            if last is not None and telemetry.status == last.status and not self.thresholds.exceeded(last, telemetry):
+                if now - last.last_emit < self.heartbeat_interval:
+                    self.suppressed_count += 1
+                    return False
+                self.heartbeat_count += 1
+            
+            self.passed_count += 1
+            self._published[drone_id] = PublishedSample.from_telemetry(telemetry, now)
+        return True
+    
+    def forget(self, drone_id: str):
+        """Descarta la última muestra de un dron (la próxima se propaga)."""
+        with self._lock:
+            self._published.pop(drone_id, None)
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Obtiene los contadores y la fracción de muestras suprimidas."""
+        with self._lock:
+            total = self.passed_count + self.suppressed_count
+            return {
+                "passed": self.passed_count,
+                "suppressed": self.suppressed_count,
+                "heartbeats": self.heartbeat_count,
+                "suppression_ratio": round(self.suppressed_count / total, 3) if total else 0.0,
+            }
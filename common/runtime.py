@@ -0,0 +1,194 @@
+"""
+Runtime asíncrono de la aplicación.
+Un único event loop de larga vida, en su propio hilo, donde se ejecutan los
+drones, el servidor de datos y el procesamiento de eventos. Los hilos de la
+UI le envían trabajo con submit() (run_coroutine_threadsafe).
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class AsyncRuntime:
+    """
+    Dueño del event loop de segundo plano.
+    
+    Mide dos latencias de planificación:
+    - submit: desde que un hilo externo envía una corrutina hasta que empieza
+      a ejecutarse en el loop
+    - lag: retraso del loop respecto a un temporizador periódico (un valor
+      alto indica que algo bloquea el loop)
+    """
+    
+    def __init__(self, name: str = "async-runtime", lag_interval: float = 0.5):
+        """
+        Inicializa el runtime (el hilo se crea con start()).
+        
+        Args:
+            name: Nombre del hilo del loop
+            lag_interval: Segundos entre mediciones del retraso del loop (0 = no medir)
+        """
+        self.name = name
+        self.lag_interval = lag_interval
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.running = False
+        
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stats_lock = threading.Lock()
+        
+        # Contadores de estadísticas
+        self.submitted_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
+        self._started_count = 0
+        self.last_submit_ms = 0.0
+        self.max_submit_ms = 0.0
+        self._total_submit_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+    
+    def start(self, timeout: float = 5.0):
+        """Crea el loop en su hilo y espera a que esté listo."""
+        if self.running:
+            return
+        self.running = True
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError(f"El runtime {self.name} no arrancó en {timeout} s")
+    
+    def stop(self, timeout: float = 5.0):
+        """
+        Cancela las tareas pendientes, espera a que terminen y cierra el loop.
+        
+        Args:
+            timeout: Segundos máximos de espera del hilo
+        """
+        loop = self.loop
+        if not self.running or loop is None:
+            return
+        self.running = False
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+    
+    def in_runtime(self) -> bool:
+        """Indica si el llamador se ejecuta en el hilo del loop."""
+        return self._thread is threading.current_thread()
+    
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        """
+        Envía una corrutina al loop desde cualquier hilo.
+        
+        Args:
+            coro: Corrutina a ejecutar
+        
+        Returns:
+            Future con el resultado de la corrutina
+        """
+        if not self.running or self.loop is None:
+            if asyncio.iscoroutine(coro):
+                coro.close()  # Evitar el aviso de corrutina nunca esperada
+            raise RuntimeError(f"El runtime {self.name} no está en ejecución")
+        with self._stats_lock:
+            self.submitted_count += 1
+        future = asyncio.run_coroutine_threadsafe(self._timed(coro, time.perf_counter()), self.loop)
+        future.add_done_callback(self._on_done)
+        return future
+    
+    def call_soon(self, func: Callable[..., Any], *args):
+        """Ejecuta una función síncrona en el loop desde cualquier hilo."""
+        if not self.running or self.loop is None:
+            raise RuntimeError(f"El runtime {self.name} no está en ejecución")
+        self.loop.call_soon_threadsafe(func, *args)
+    
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Envía una corrutina y espera su resultado (no llamar desde el propio loop)."""
+        if self.in_runtime():
+            raise RuntimeError("run() bloquearía el loop del runtime; usa await")
+        return self.submit(coro).result(timeout)
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Obtiene los contadores y latencias de planificación (milisegundos)."""
+        with self._stats_lock:
+            started = self._started_count
+            return {
+                "submitted": self.submitted_count,
+                "completed": self.completed_count,
+                "failed": self.failed_count,
+                "pending": self.submitted_count - self.completed_count - self.failed_count,
+                "last_submit_ms": round(self.last_submit_ms, 2),
+                "avg_submit_ms": round(self._total_submit_ms / started, 2) if started else 0.0,
+                "max_submit_ms": round(self.max_submit_ms, 2),
+                "last_lag_ms": round(self.last_lag_ms, 2),
+                "max_lag_ms": round(self.max_lag_ms, 2),
+            }
+    
+    async def _timed(self, coro: Awaitable[Any], submitted_at: float) -> Any:
+        """Registra la latencia de planificación y ejecuta la corrutina."""
+        delay_ms = (time.perf_counter() - submitted_at) * 1000.0
+        with self._stats_lock:
+            self._started_count += 1
+            self.last_submit_ms = delay_ms
+            self.max_submit_ms = max(self.max_submit_ms, delay_ms)
+            self._total_submit_ms += delay_ms
+        return await coro
+    
+    def _on_done(self, future: Future):
+        """Cuenta las corrutinas terminadas y registra sus errores."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        failed = future.cancelled() or future.exception() is not None
+        if failed and not future.cancelled():
+            # El dueño del Future decide cómo informar el error
+            logger.debug(f"Trabajo del runtime con error: {future.exception()}")
+        with self._stats_lock:
+            if failed:
+                self.failed_count += 1
+            else:
+                self.completed_count += 1
+    
+    async def _monitor_lag(self):
+        """Mide cuánto se retrasa el loop respecto a un temporizador periódico."""
+        while True:
+            expected = time.perf_counter() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag_ms = max(0.0, (time.perf_counter() - expected) * 1000.0)
+            with self._stats_lock:
+                self.last_lag_ms = lag_ms
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+    
+    def _run(self):
+        """Hilo del loop: lo ejecuta hasta stop() y luego cancela lo pendiente."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        if self.lag_interval > 0:
+            loop.create_task(self._monitor_lag())
+        loop.call_soon(self._ready.set)
+        logger.info(f"Runtime {self.name} iniciado")
+        
+        try:
+            loop.run_forever()
+            # Cancelar lo pendiente y dejar que ejecute sus bloques finally (ej., detener drones)
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        except Exception as e:
+            logger.error(f"Error en el runtime {self.name}: {e}", exc_info=True)
+        finally:
+            self.running = False
+            loop.close()
+            logger.info(f"Runtime {self.name} detenido")
@@ -0,0 +1,185 @@
+"""
+Detección de drones obsoletos.
+Registra la última telemetría de cada dron y, con un único montículo de
+plazos (en lugar de un temporizador por dron), detecta cuándo un dron pasa a
+obsoleto y cuándo debe desalojarse.
+"""
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(slots=True)
+class _Track:
+    """Seguimiento de un dron."""
+    last_seen: float
+    stale: bool
+    generation: int  # Invalida las entradas del montículo de un seguimiento anterior
+    scheduled: float  # Plazo de la única entrada válida del dron en el montículo
+
+
+class StalenessTracker:
+    """
+    Última telemetría por dron con umbrales de obsolescencia y desalojo.
+    
+    touch() es O(1) mientras el dron informa: solo actualiza last_seen. Cada
+    dron tiene una sola entrada en el montículo con su próximo plazo; al
+    vencer, expire() la compara con last_seen y la reprograma si el dron
+    informó mientras tanto; las entradas reemplazadas se descartan al salir
+    (borrado perezoso). El coste por revisión es O(k log n) con k = plazos
+    vencidos, no O(n).
+    """
+    
+    def __init__(self, stale_after: float = 15.0, evict_after: float = 60.0):
+        """
+        Inicializa el seguimiento.
+        
+        Args:
+            stale_after: Segundos sin telemetría para considerar obsoleto un dron
+            evict_after: Segundos sin telemetría para desalojarlo (0 = nunca)
+        """
+        if evict_after and evict_after < stale_after:
+            raise ValueError("evict_after debe ser mayor o igual que stale_after")
+        self.stale_after = stale_after
+        self.evict_after = evict_after
+        
+        self._tracks: Dict[str, _Track] = {}
+        self._heap: List[Tuple[float, int, str]] = []  # (plazo, generación, drone_id)
+        self._generation = 0
+        self._stale_count = 0
+        
+        # Contadores de estadísticas
+        self.stale_transitions = 0
+        self.recovered_count = 0
+        self.evicted_count = 0
+    
+    def touch(self, drone_id: str, now: Optional[float] = None) -> bool:
+        """
+        Registra telemetría de un dron.
+        
+        Args:
+            drone_id: ID del dron
+            now: Reloj monotónico (time.monotonic() por defecto)
+        
+        Returns:
+            True si el dron estaba obsoleto y vuelve a informar
+        """
+        now = time.monotonic() if now is None else now
+        track = self._tracks.get(drone_id)
+        if track is None:
+            self._generation += 1
+            track = self._tracks[drone_id] = _Track(now, False, self._generation, 0.0)
+            self._schedule(track, drone_id, now + self.stale_after)
+            return False
+        
+        track.last_seen = now
+        if not track.stale:
+            return False
+        track.stale = False
+        self._stale_count -= 1
+        self.recovered_count += 1
+        # La nueva entrada invalida la pendiente (la de desalojo)
+        self._schedule(track, drone_id, now + self.stale_after)
+        return True
+    
+    def expire(self, now: Optional[float] = None) -> Tuple[List[str], List[str]]:
+        """
+        Procesa los plazos vencidos.
+        
+        Args:
+            now: Reloj monotónico (time.monotonic() por defecto)
+        
+        Returns:
+            Tupla (drones que pasan a obsoletos, drones a desalojar); los
+            desalojados ya no se siguen
+        """
+        now = time.monotonic() if now is None else now
+        heap = self._heap
+        newly_stale: List[str] = []
+        evicted: List[str] = []
+        
+        while heap and heap[0][0] <= now:
+            deadline, generation, drone_id = heapq.heappop(heap)
+            track = self._tracks.get(drone_id)
+            if track is None or track.generation != generation or track.scheduled != deadline:
+                continue  # Entrada de un dron olvidado o reprogramada
+            
+            if not track.stale:
+                due = track.last_seen + self.stale_after
+                if due > now:
+                    self._schedule(track, drone_id, due)
+                    continue
+                track.stale = True
+                self._stale_count += 1
+                self.stale_transitions += 1
+                newly_stale.append(drone_id)
+                if not self.evict_after:
+                    continue  # Sin desalojo: queda sin entrada hasta que vuelva a informar
+            
+            due = track.last_seen + self.evict_after
+            if due > now:
+                self._schedule(track, drone_id, due)
+                continue
+            del self._tracks[drone_id]
+            self._stale_count -= 1
+            self.evicted_count += 1
+            evicted.append(drone_id)
+        
+        return newly_stale, evicted
+    
+    def _schedule(self, track: _Track, drone_id: str, deadline: float):
+        """Programa el próximo plazo de un dron (invalida su entrada anterior)."""
+        track.scheduled = deadline
+        heapq.heappush(self._heap, (deadline, track.generation, drone_id))
+    
+    def next_deadline(self) -> Optional[float]:
+        """Plazo más próximo (reloj monotónico) o None si no hay drones."""
+        return self._heap[0][0] if self._heap else None
+    
+    def forget(self, drone_id: str) -> bool:
+        """Deja de seguir un dron (su entrada del montículo se descarta al vencer)."""
+        track = self._tracks.pop(drone_id, None)
+        if track is None:
+            return False
+        if track.stale:
+            self._stale_count -= 1
+        return True
+    
+    def clear(self):
+        """Deja de seguir todos los drones."""
+        self._tracks.clear()
+        self._heap.clear()
+        self._stale_count = 0
+    
+    def is_stale(self, drone_id: str) -> bool:
+        """Indica si el dron está obsoleto."""
+        track = self._tracks.get(drone_id)
+        return track is not None and track.stale
+    
+    def stale_ids(self) -> List[str]:
+        """IDs de los drones obsoletos."""
+        return [drone_id for drone_id, track in self._tracks.items() if track.stale]
+    
+    @property
+    def stale_count(self) -> int:
+        """Número de drones obsoletos."""
+        return self._stale_count
+    
+    def __len__(self) -> int:
+        """Número de drones seguidos."""
+        return len(self._tracks)
+    
+    def __contains__(self, drone_id: str) -> bool:
+        return drone_id in self._tracks
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Obtiene los drones seguidos, obsoletos y los contadores de transiciones."""
+        return {
+            "tracked": len(self._tracks),
+            "stale": self._stale_count,
+            "heap": len(self._heap),
+            "stale_transitions": self.stale_transitions,
+            "recovered": self.recovered_count,
+            "evicted": self.evicted_count,
+        }
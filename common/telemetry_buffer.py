@@ -0,0 +1,270 @@
+"""
+Buffers de telemetría entre los productores (drones) y el consumidor de la UI.
+Incluye el buffer de conflación (último valor por dron) y una cola acotada
+con política de desborde seleccionable.
+"""
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from common.constants import QueuePolicy
+from backend.schemas import TelemetrySchema
+
+
+class TelemetryConflationBuffer:
+    """
+    Buffer de último valor indexado por drone_id.
+
+    Los productores sobrescriben la muestra de su dron en O(1) y nunca esperan
+    al consumidor. El consumidor drena, a su propio ritmo, una instantánea con
+    solo los drones que cambiaron desde el último drenado. Las muestras que se
+    sobrescriben antes de ser consumidas se cuentan como conflacionadas.
+    """
+
+    def __init__(self, max_drones: Optional[int] = None):
+        """
+        Inicializa el buffer vacío.
+        
+        Args:
+            max_drones: Drones pendientes como máximo (None = sin límite); al
+                llegar al límite, un dron nuevo desplaza al pendiente más antiguo
+        """
+        self.max_drones = max_drones
+        self._latest: Dict[str, TelemetrySchema] = {}
+        self._lock = threading.Lock()
+
+        # Contadores de estadísticas
+        self.published_count = 0
+        self.conflated_count = 0
+        self.dropped_count = 0
+        self.drained_count = 0
+
+    def put(self, telemetry: TelemetrySchema) -> bool:
+        """
+        Publica una muestra de telemetría, reemplazando la pendiente del mismo dron.
+
+        Args:
+            telemetry: Registro de telemetría (debe incluir drone_id)
+
+        Returns:
+            True si la muestra fue aceptada, False si no tiene drone_id
+        """
+        drone_id = telemetry.drone_id
+        if not drone_id:
+            return False
+
+        with self._lock:
+            latest = self._latest
+            if drone_id in latest:
+                self.conflated_count += 1
+            elif self.max_drones is not None and len(latest) >= self.max_drones:
+                del latest[next(iter(latest))]  # El pendiente más antiguo
+                self.dropped_count += 1
+            latest[drone_id] = telemetry
+            self.published_count += 1
+        return True
+
+    def drain(self) -> Dict[str, TelemetrySchema]:
+        """
+        Obtiene y limpia la instantánea de drones modificados.
+
+        Returns:
+            Diccionario drone_id -> última muestra pendiente
+        """
+        with self._lock:
+            if not self._latest:
+                return {}
+            snapshot = self._latest
+            self._latest = {}
+            self.drained_count += len(snapshot)
+        return snapshot
+
+    def discard(self, drone_id: str) -> bool:
+        """Descarta la muestra pendiente de un dron (ej., dron retirado)."""
+        with self._lock:
+            return self._latest.pop(drone_id, None) is not None
+    
+    def __len__(self) -> int:
+        """Número de drones con una muestra pendiente."""
+        with self._lock:
+            return len(self._latest)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Obtiene las estadísticas del buffer."""
+        with self._lock:
+            return {
+                "published": self.published_count,
+                "conflated": self.conflated_count,
+                "dropped": self.dropped_count,
+                "drained": self.drained_count,
+                "pending": len(self._latest),
+            }
+
+
+class BoundedTelemetryQueue:
+    """
+    Cola de telemetría acotada con contrapresión explícita.
+    
+    La memoria nunca supera maxsize muestras. Cuando la cola está llena:
+    - BLOCK: put() espera hasta block_timeout segundos a que el consumidor
+      libere espacio y, si no lo hace, descarta la muestra nueva. Requiere el
+      consumidor en otro hilo (shared_loop=False): en el mismo loop de asyncio
+      la espera congela el loop entero y no puede terminar antes del plazo.
+    - DROP_OLDEST: se descarta la muestra más antigua; el productor no espera.
+    - CONFLATE: una muestra pendiente por dron (TelemetryConflationBuffer);
+      un dron nuevo con la cola llena desplaza al pendiente más antiguo.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        policy: QueuePolicy = QueuePolicy.CONFLATE,
+        block_timeout: float = 0.1,
+        shared_loop: bool = True
+    ):
+        """
+        Inicializa la cola.
+        
+        Args:
+            maxsize: Muestras pendientes como máximo (drones, con CONFLATE)
+            policy: Política cuando la cola está llena
+            block_timeout: Espera máxima del productor con BLOCK (segundos)
+            shared_loop: El consumidor se ejecuta en el mismo event loop que los productores
+        
+        Raises:
+            ValueError: Si maxsize no es positivo o si se pide BLOCK con shared_loop
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize debe ser mayor que 0")
+        if QueuePolicy(policy) == QueuePolicy.BLOCK and shared_loop:
+            raise ValueError(
+                "La política block requiere el consumidor en otro hilo: "
+                "en el loop de los productores congelaría el loop entero"
+            )
+        self.maxsize = maxsize
+        self.policy = QueuePolicy(policy)
+        self.block_timeout = block_timeout
+        
+        self._items: Deque[TelemetrySchema] = deque()
+        self._conflation = TelemetryConflationBuffer(max_drones=maxsize)
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        
+        # Contadores de estadísticas
+        self.enqueued_count = 0
+        self.dropped_count = 0
+        self.blocked_count = 0
+        self.drained_count = 0
+        self.max_depth = 0
+    
+    def put(self, telemetry: TelemetrySchema) -> bool:
+        """
+        Encola una muestra aplicando la política de desborde.
+        
+        Args:
+            telemetry: Registro de telemetría
+        
+        Returns:
+            True si la muestra quedó en la cola, False si se descartó
+        """
+        if self.policy == QueuePolicy.CONFLATE:
+            accepted = self._conflation.put(telemetry)
+            depth = len(self._conflation)
+            with self._lock:
+                if accepted:
+                    self.enqueued_count += 1
+                self.max_depth = max(self.max_depth, depth)
+            return accepted
+        
+        with self._lock:
+            items = self._items
+            if len(items) >= self.maxsize:
+                if self.policy == QueuePolicy.DROP_OLDEST:
+                    items.popleft()
+                    self.dropped_count += 1
+                else:
+                    self.blocked_count += 1
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(items) >= self.maxsize:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.dropped_count += 1
+                            return False
+                        self._not_full.wait(remaining)
+            items.append(telemetry)
+            self.enqueued_count += 1
+            if len(items) > self.max_depth:
+                self.max_depth = len(items)
+        return True
+    
+    def drain(self, max_items: Optional[int] = None) -> List[TelemetrySchema]:
+        """
+        Extrae las muestras pendientes en orden de llegada.
+        
+        Args:
+            max_items: Máximo de muestras a extraer (None = todas)
+        
+        Returns:
+            Lista de muestras (con CONFLATE, una por dron y siempre todas)
+        """
+        if self.policy == QueuePolicy.CONFLATE:
+            batch = list(self._conflation.drain().values())
+            with self._lock:
+                self.drained_count += len(batch)
+            return batch
+        
+        with self._lock:
+            items = self._items
+            if max_items is None or max_items >= len(items):
+                batch = list(items)
+                items.clear()
+            else:
+                batch = [items.popleft() for _ in range(max_items)]
+            self.drained_count += len(batch)
+            if batch:
+                self._not_full.notify_all()
+        return batch
+    
+    def discard(self, drone_id: str) -> int:
+        """
+        Descarta las muestras pendientes de un dron (ej., dron retirado).
+        
+        Returns:
+            Número de muestras descartadas
+        """
+        if self.policy == QueuePolicy.CONFLATE:
+            return int(self._conflation.discard(drone_id))
+        with self._lock:
+            kept = deque(t for t in self._items if t.drone_id != drone_id)
+            removed = len(self._items) - len(kept)
+            self._items = kept
+            if removed:
+                self._not_full.notify_all()
+        return removed
+    
+    def __len__(self) -> int:
+        """Número de muestras pendientes."""
+        if self.policy == QueuePolicy.CONFLATE:
+            return len(self._conflation)
+        with self._lock:
+            return len(self._items)
+    
+    def get_stats(self) -> Dict:
+        """Obtiene la profundidad de la cola y los contadores de descartes."""
+        depth = len(self)
+        with self._lock:
+            stats = {
+                "policy": self.policy.value,
+                "depth": depth,
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "enqueued": self.enqueued_count,
+                "dropped": self.dropped_count,
+                "blocked": self.blocked_count,
+                "drained": self.drained_count,
+            }
+        if self.policy == QueuePolicy.CONFLATE:
+            conflation = self._conflation.get_stats()
+            stats["conflated"] = conflation["conflated"]
+            stats["dropped"] = conflation["dropped"]
+        return stats
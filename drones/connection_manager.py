@@ -0,0 +1,279 @@
+"""
+Gestor de conexiones MAVSDK.
+Conecta a todos los vehículos configurados en paralelo, con plazo por
+vehículo y reconexión con espera exponencial.
+"""
+import asyncio
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from common.constants import ConnectionHealth
+from backend.schemas import TelemetrySchema
+from drones.simulator import MAVSDKSimulator
+from drones.rate_policy import AdaptiveRatePolicy
+
+
+class VehicleConnection:
+    """Estado de conexión de un vehículo."""
+    
+    def __init__(self, simulator: MAVSDKSimulator):
+        """
+        Inicializa el estado de conexión.
+        
+        Args:
+            simulator: Simulador MAVSDK del vehículo
+        """
+        self.simulator = simulator
+        self.state = ConnectionHealth.CONNECTING
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.connected_since: Optional[float] = None
+        self.next_retry: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    def to_dict(self) -> Dict:
+        """Convierte el estado a diccionario."""
+        return {
+            "state": self.state.value,
+            "connection_string": self.simulator.connection_string,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "connected_since": self.connected_since,
+            "next_retry": self.next_retry,
+        }
+
+
+class MAVSDKConnectionManager:
+    """
+    Supervisa las conexiones MAVSDK de toda la flota.
+    
+    Cada vehículo tiene su propia tarea supervisora, por lo que un vehículo
+    inalcanzable no retrasa a los demás ni el arranque: start() solo crea las
+    tareas. Cada intento de conexión tiene un plazo; tras un fallo o una
+    desconexión se reintenta con espera exponencial (con jitter) hasta
+    backoff_max, y la espera se reinicia al conectar.
+    """
+    
+    def __init__(
+        self,
+        connection_strings: Dict[str, str],
+        callback: Optional[Callable[[TelemetrySchema], None]] = None,
+        update_interval: float = 0.5,
+        emit_fields: Optional[Iterable[str]] = None,
+        connect_timeout: float = 10.0,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 30.0,
+        grpc_base_port: int = 50051,
+        rate_policy: Optional[AdaptiveRatePolicy] = None,
+        on_state_change: Optional[Callable[[str, ConnectionHealth], None]] = None
+    ):
+        """
+        Inicializa el gestor.
+        
+        Args:
+            connection_strings: drone_id -> cadena de conexión MAVSDK
+            callback: Función a llamar con actualizaciones de telemetría
+            update_interval: Segundos mínimos entre actualizaciones parciales
+            emit_fields: Grupos que disparan una emisión inmediata (ver TelemetryFusion)
+            connect_timeout: Plazo máximo de cada intento de conexión (segundos)
+            backoff_initial: Primera espera tras un fallo (segundos)
+            backoff_max: Espera máxima entre intentos (segundos)
+            grpc_base_port: Primer puerto de los mavsdk_server embebidos (uno por vehículo)
+            rate_policy: Política de tasa adaptativa compartida por la flota
+            on_state_change: Función a llamar con (drone_id, estado) en cada transición
+        """
+        self.callback = callback
+        self.update_interval = update_interval
+        self.emit_fields = emit_fields
+        self.connect_timeout = connect_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.rate_policy = rate_policy
+        self.on_state_change = on_state_change
+        self.running = False
+        
+        # Puertos gRPC: los de vehículos eliminados se reutilizan antes de abrir nuevos
+        self._next_grpc_port = grpc_base_port
+        self._free_grpc_ports: List[int] = []
+        
+        self.connections: Dict[str, VehicleConnection] = {}
+        for drone_id, connection_string in connection_strings.items():
+            self._create_connection(drone_id, connection_string)
+    
+    def _create_connection(self, drone_id: str, connection_string: str) -> VehicleConnection:
+        """Crea el simulador de un vehículo con un puerto gRPC libre."""
+        if self._free_grpc_ports:
+            grpc_port = self._free_grpc_ports.pop()
+        else:
+            grpc_port = self._next_grpc_port
+            self._next_grpc_port += 1
+        simulator = MAVSDKSimulator(
+            drone_id=drone_id,
+            connection_string=connection_string,
+            callback=self.callback,
+            emit_fields=self.emit_fields,
+            grpc_port=grpc_port,
+            rate_policy=self.rate_policy
+        )
+        connection = VehicleConnection(simulator)
+        self.connections[drone_id] = connection
+        return connection
+    
+    def add_vehicle(self, drone_id: str, connection_string: str) -> MAVSDKSimulator:
+        """
+        Agrega un vehículo en caliente (su supervisor arranca si el gestor ya corre).
+        
+        Args:
+            drone_id: Identificador único del vehículo
+            connection_string: Cadena de conexión MAVSDK
+        
+        Returns:
+            Simulador del vehículo
+        """
+        if drone_id in self.connections:
+            raise ValueError(f"El vehículo {drone_id} ya existe")
+        connection = self._create_connection(drone_id, connection_string)
+        if self.running:
+            connection.task = asyncio.create_task(self._supervise(drone_id, connection))
+        return connection.simulator
+    
+    async def remove_vehicle(self, drone_id: str) -> bool:
+        """
+        Detiene un vehículo y su supervisor y libera su puerto gRPC.
+        
+        Args:
+            drone_id: ID del vehículo
+        
+        Returns:
+            True si el vehículo existía
+        """
+        connection = self.connections.pop(drone_id, None)
+        if connection is None:
+            return False
+        try:
+            await connection.simulator.stop()
+        except Exception:
+            pass
+        if connection.task:
+            connection.task.cancel()
+            await asyncio.gather(connection.task, return_exceptions=True)
+        connection.simulator.reset()  # Libera el mavsdk_server embebido
+        self._set_state(drone_id, connection, ConnectionHealth.STOPPED)
+        if connection.simulator.grpc_port is not None:
+            self._free_grpc_ports.append(connection.simulator.grpc_port)
+        return True
+    
+    def start(self) -> List[asyncio.Task]:
+        """
+        Lanza una tarea supervisora por vehículo (no espera a ninguna conexión).
+        
+        Returns:
+            Lista de tareas creadas
+        """
+        self.running = True
+        tasks = []
+        for drone_id, connection in self.connections.items():
+            connection.task = asyncio.create_task(self._supervise(drone_id, connection))
+            tasks.append(connection.task)
+        return tasks
+    
+    async def stop(self):
+        """Detiene todos los vehículos y sus supervisores."""
+        self.running = False
+        tasks = []
+        for drone_id, connection in self.connections.items():
+            try:
+                await connection.simulator.stop()
+            except Exception:
+                pass
+            if connection.task:
+                connection.task.cancel()
+                tasks.append(connection.task)
+            self._set_state(drone_id, connection, ConnectionHealth.STOPPED)
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def get_simulators(self) -> Dict[str, MAVSDKSimulator]:
+        """Obtiene los simuladores indexados por drone_id."""
+        return {drone_id: c.simulator for drone_id, c in self.connections.items()}
+    
+    def get_health(self) -> Dict[str, Dict]:
+        """Obtiene el estado de conexión de cada vehículo."""
+        return {drone_id: c.to_dict() for drone_id, c in self.connections.items()}
+    
+    def count_by_state(self) -> Dict[str, int]:
+        """Cuenta los vehículos en cada estado de conexión."""
+        counts: Dict[str, int] = {}
+        for connection in self.connections.values():
+            counts[connection.state.value] = counts.get(connection.state.value, 0) + 1
+        return counts
+    
+    async def _supervise(self, drone_id: str, connection: VehicleConnection):
+        """Conecta, transmite y reconecta un vehículo hasta que se detenga el gestor."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        simulator = connection.simulator
+        backoff = self.backoff_initial
+        
+        try:
+            while self.running:
+                connection.attempts += 1
+                self._set_state(drone_id, connection, ConnectionHealth.CONNECTING)
+                
+                try:
+                    await asyncio.wait_for(simulator.connect(), self.connect_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    connection.last_error = f"Sin conexión tras {self.connect_timeout:g}s"
+                except Exception as e:
+                    connection.last_error = str(e)
+                
+                if simulator.connected:
+                    backoff = self.backoff_initial
+                    connection.last_error = None
+                    connection.connected_since = time.time()
+                    self._set_state(drone_id, connection, ConnectionHealth.CONNECTED)
+                    
+                    try:
+                        # Retorna cuando el vehículo se desconecta o se detiene
+                        await simulator.start(self.update_interval)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        connection.last_error = str(e)
+                    
+                    connection.connected_since = None
+                    if not self.running:
+                        break
+                    self._set_state(drone_id, connection, ConnectionHealth.DISCONNECTED)
+                
+                if not self.running:
+                    break
+                
+                # Reintentar con un System nuevo tras esperar (jitter para no sincronizar la flota)
+                simulator.reset()
+                delay = backoff * random.uniform(0.8, 1.2)
+                connection.next_retry = time.time() + delay
+                self._set_state(drone_id, connection, ConnectionHealth.BACKOFF)
+                logger.info(f"[{drone_id}] Reintento en {delay:.1f}s ({connection.last_error})")
+                await asyncio.sleep(delay)
+                connection.next_retry = None
+                backoff = min(backoff * 2.0, self.backoff_max)
+        except asyncio.CancelledError:
+            pass
+    
+    def _set_state(self, drone_id: str, connection: VehicleConnection, state: ConnectionHealth):
+        """Registra una transición de estado y la notifica."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if connection.state == state:
+            return
+        connection.state = state
+        logger.info(f"[{drone_id}] Conexión: {state.value}")
+        if self.on_state_change:
+            try:
+                self.on_state_change(drone_id, state)
+            except Exception as e:
+                logger.error(f"Error en callback de estado de conexión: {e}", exc_info=True)
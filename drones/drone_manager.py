@@ -3,11 +3,21 @@ Gestor de drones para manejar múltiples drones simultáneamente.
 Coordina la recolección y distribución de telemetría.
 """
 import asyncio
-from typing import Dict, List, Optional, Callable
+import inspect
+import time
+from typing import Dict, Iterable, List, Optional, Callable
 from common.config import Config
+from common.constants import CommandStatus
 from common.utils import generate_drone_id
 from drones.fake_generator import FakeTelemetryGenerator
 from drones.simulator import MAVSDKSimulator, MAVSDK_AVAILABLE
+from drones.mavlink_gateway import MAVLinkGateway, MAVLinkVehicle
+from drones.connection_manager import MAVSDKConnectionManager
+from drones.replay import TelemetryReplay
+from drones.rate_policy import AdaptiveRatePolicy
+from common.staleness import StalenessTracker
+from backend.schemas import TelemetrySchema, DroneCommand, CommandAck
+from backend.ingestion import TelemetryIngestionServer
 
 
 class DroneManager:
@@ -25,9 +35,33 @@ class DroneManager:
         """
         self.config = config
         self.telemetry_callback = telemetry_callback
-        self.drones: Dict[str, FakeTelemetryGenerator | MAVSDKSimulator] = {}
+        self.drones: Dict[str, FakeTelemetryGenerator | MAVSDKSimulator | MAVLinkVehicle | TelemetryReplay] = {}
+        self.gateway: Optional[MAVLinkGateway] = None
+        self.connection_manager: Optional[MAVSDKConnectionManager] = None
+        self.replay: Optional[TelemetryReplay] = None
+        self.ingestion: Optional[TelemetryIngestionServer] = None
+        self.telemetry_listeners: List[Callable[[TelemetrySchema], None]] = []
+        self.drone_removed_listeners: List[Callable[[str], None]] = []
+        self.drone_stale_listeners: List[Callable[[str, bool], None]] = []
         self.running = False
         self.tasks: List[asyncio.Task] = []
+        # Tarea de cada dron simulado (para retirarlo en caliente)
+        self._drone_tasks: Dict[str, asyncio.Task] = {}
+        # Última telemetría de cada dron, de cualquier fuente, con plazos de obsolescencia
+        self.staleness = StalenessTracker(
+            stale_after=config.drone_stale_timeout,
+            evict_after=config.drone_evict_timeout
+        )
+        
+        # Tasa de publicación adaptativa, compartida por los drones simulados y MAVSDK
+        self.rate_policy: Optional[AdaptiveRatePolicy] = None
+        if config.adaptive_rate_enabled:
+            self.rate_policy = AdaptiveRatePolicy(
+                active_interval=config.telemetry_update_interval,
+                hover_interval=config.adaptive_rate_hover_interval,
+                idle_interval=config.adaptive_rate_idle_interval,
+                battery_thresholds=config.adaptive_rate_battery_thresholds
+            )
     
     async def start(self):
         """Inicia todas las simulaciones de drones."""
@@ -36,15 +70,40 @@ class DroneManager:
         
         self.running = True
         
-        if self.config.use_fake_telemetry:
+        if self.config.replay_file:
+            await self._start_replay()
+        elif self.config.use_fake_telemetry:
             await self._start_fake_drones()
+        elif self.config.use_mavlink_gateway:
+            await self._start_mavlink_gateway()
         else:
             await self._start_mavsdk_drones()
+        
+        # La ingesta externa se suma a cualquiera de las fuentes anteriores
+        if self.config.ingestion_enabled:
+            await self._start_ingestion()
+        
+        if self.config.drone_stale_timeout > 0:
+            self.tasks.append(asyncio.create_task(self._watch_staleness()))
     
     async def stop(self):
         """Detiene todas las simulaciones de drones."""
         self.running = False
         
+        # Detener las conexiones MAVSDK (detiene sus simuladores y supervisores)
+        if self.connection_manager:
+            await self.connection_manager.stop()
+            self.connection_manager = None
+        
+        # Detener la ingesta externa
+        if self.ingestion:
+            await self.ingestion.stop()
+            self.ingestion = None
+        
+        # Detener la reproducción (todos los drones reproducidos comparten la instancia)
+        if self.replay:
+            await self.replay.stop()
+        
         # Detener todos los drones
         for drone in self.drones.values():
             if isinstance(drone, FakeTelemetryGenerator):
@@ -52,13 +111,24 @@ class DroneManager:
             elif isinstance(drone, MAVSDKSimulator):
                 await drone.stop()
         
+        # Detener el gateway MAVLink (cierra el socket y los emisores por vehículo)
+        if self.gateway:
+            await self.gateway.stop()
+            self.gateway = None
+        
         # Cancelar todas las tareas
         for task in self.tasks:
             task.cancel()
         
         await asyncio.gather(*self.tasks, return_exceptions=True)
         self.tasks.clear()
+        self._drone_tasks.clear()
+        self.staleness.clear()
         self.drones.clear()
+        
+        if self.replay:
+            self.replay.close()
+            self.replay = None
     
     async def _start_fake_drones(self):
         """Inicia generadores de telemetría falsa."""
@@ -79,30 +149,34 @@ class DroneManager:
             
             logger.info(f"Creando dron {drone_id} en posición ({base_lat + offset_lat:.6f}, {base_lon + offset_lon:.6f})")
             
-            drone = FakeTelemetryGenerator(
-                drone_id=drone_id,
-                start_lat=base_lat + offset_lat,
-                start_lon=base_lon + offset_lon,
-                callback=self._on_telemetry_update
-            )
-            
-            self.drones[drone_id] = drone
+            self._spawn_fake_drone(drone_id, base_lat + offset_lat, base_lon + offset_lon)
+    
+    def _spawn_fake_drone(self, drone_id: str, latitude: float, longitude: float) -> FakeTelemetryGenerator:
+        """Crea un generador de telemetría falsa y lanza su tarea."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        drone = FakeTelemetryGenerator(
+            drone_id=drone_id,
+            start_lat=latitude,
+            start_lon=longitude,
+            callback=self._on_telemetry_update,
+            rate_policy=self.rate_policy
+        )
+        self.drones[drone_id] = drone
             
-            # Crear tarea y agregar callback para verificar que se ejecute
-            # IMPORTANTE: Capturar drone_id y drone en el closure para evitar problemas
-            def create_drone_task(d_id, d_instance):
-                async def drone_task_wrapper():
-                    try:
-                        logger.info(f"Iniciando tarea para {d_id}")
-                        await d_instance.start(self.config.telemetry_update_interval)
-                    except Exception as e:
-                        logger.error(f"Error en tarea de {d_id}: {e}", exc_info=True)
-                return drone_task_wrapper
+        async def drone_task_wrapper():
+            try:
+                logger.info(f"Iniciando tarea para {drone_id}")
+                await drone.start(self.config.telemetry_update_interval)
+            except Exception as e:
+                logger.error(f"Error en tarea de {drone_id}: {e}", exc_info=True)
             
-            task_wrapper = create_drone_task(drone_id, drone)
-            task = asyncio.create_task(task_wrapper())
-            self.tasks.append(task)
-            logger.info(f"Tarea creada para {drone_id}, total tareas: {len(self.tasks)}")
+        task = asyncio.create_task(drone_task_wrapper())
+        self.tasks.append(task)
+        self._drone_tasks[drone_id] = task
+        logger.info(f"Tarea creada para {drone_id}, total tareas: {len(self.tasks)}")
+        return drone
     
     async def _start_mavsdk_drones(self):
         """Inicia drones basados en MAVSDK."""
@@ -112,30 +186,263 @@ class DroneManager:
                 "Instálalo con: pip install mavsdk"
             )
         
-        # Para MVP, asumiremos un dron por cadena de conexión
-        # En producción, configurarías múltiples cadenas de conexión
-        connection_strings = ["udp://:14540", "udp://:14541", "udp://:14542"]
-        count = min(self.config.fake_drone_count, len(connection_strings))
+        # Un dron por cadena de conexión; todos se conectan en paralelo y un
+        # vehículo inalcanzable solo reintenta su propia conexión
+        connection_strings = {
+            generate_drone_id(i): connection_string
+            for i, connection_string in enumerate(self.config.mavsdk_connection_strings)
+        }
+        self.connection_manager = MAVSDKConnectionManager(
+            connection_strings,
+            callback=self._on_telemetry_update,
+            update_interval=self.config.telemetry_update_interval,
+            emit_fields=self.config.telemetry_emit_fields,
+            connect_timeout=self.config.mavsdk_connect_timeout,
+            backoff_initial=self.config.mavsdk_backoff_initial,
+            backoff_max=self.config.mavsdk_backoff_max,
+            rate_policy=self.rate_policy
+        )
+        self.drones.update(self.connection_manager.get_simulators())
+        self.tasks.extend(self.connection_manager.start())
+    
+    async def _start_replay(self):
+        """Inicia la reproducción de una grabación por el callback de telemetría normal."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        self.replay = TelemetryReplay(
+            self.config.replay_file,
+            callback=self._on_telemetry_update,
+            speed=self.config.replay_speed,
+            loop=self.config.replay_loop
+        )
+        if self.config.replay_start_offset and self.replay.start_time is not None:
+            self.replay.seek(self.replay.start_time + self.config.replay_start_offset)
         
-        for i in range(count):
-            drone_id = generate_drone_id(i)
-            drone = MAVSDKSimulator(
-                drone_id=drone_id,
-                connection_string=connection_strings[i],
-                callback=self._on_telemetry_update
+        for drone_id in self.replay.drone_ids():
+            self.drones[drone_id] = self.replay
+        logger.info(f"Reproducción preparada: {len(self.replay)} registros, {len(self.drones)} drones")
+        self.tasks.append(asyncio.create_task(self.replay.start()))
+    
+    async def _start_ingestion(self):
+        """Inicia la ingesta de telemetría externa por UDP/TCP."""
+        self.ingestion = TelemetryIngestionServer(
+            callback=self._on_telemetry_update,
+            host=self.config.ingestion_host,
+            udp_port=self.config.ingestion_udp_port,
+            tcp_port=self.config.ingestion_tcp_port
+        )
+        await self.ingestion.start()
+    
+    async def _start_mavlink_gateway(self):
+        """Inicia el gateway MAVLink; los drones se crean al recibir su primer HEARTBEAT."""
+        self.gateway = MAVLinkGateway(
+            callback=self._on_telemetry_update,
+            host=self.config.mavlink_gateway_host,
+            port=self.config.mavlink_gateway_port,
+            emit_fields=self.config.telemetry_emit_fields,
+            max_rate_hz=1.0 / self.config.telemetry_update_interval,
+            on_vehicle=self._on_gateway_vehicle
+        )
+        await self.gateway.start()
+    
+    def _on_gateway_vehicle(self, vehicle: MAVLinkVehicle):
+        """Registra un vehículo descubierto por el gateway."""
+        self.drones[vehicle.drone_id] = vehicle
+    
+    def add_telemetry_listener(self, listener: Callable[[TelemetrySchema], None]):
+        """
+        Agrega un oyente adicional del flujo de telemetría (ej., el grabador de vuelo).
+        
+        Args:
+            listener: Función a llamar con cada registro (debe ser O(1), no bloquear)
+        """
+        if listener not in self.telemetry_listeners:
+            self.telemetry_listeners.append(listener)
+    
+    def remove_telemetry_listener(self, listener: Callable[[TelemetrySchema], None]):
+        """Elimina un oyente del flujo de telemetría."""
+        if listener in self.telemetry_listeners:
+            self.telemetry_listeners.remove(listener)
+    
+    def add_drone_removed_listener(self, listener: Callable[[str], None]):
+        """
+        Agrega un oyente de drones retirados (para limpiar cachés por dron).
+        
+        Args:
+            listener: Función a llamar con el drone_id retirado
+        """
+        if listener not in self.drone_removed_listeners:
+            self.drone_removed_listeners.append(listener)
+    
+    def add_drone_stale_listener(self, listener: Callable[[str, bool], None]):
+        """
+        Agrega un oyente de transiciones de obsolescencia.
+        
+        Args:
+            listener: Función a llamar con (drone_id, obsoleto) cuando un dron
+                deja de informar o vuelve a hacerlo
+        """
+        if listener not in self.drone_stale_listeners:
+            self.drone_stale_listeners.append(listener)
+    
+    async def add_drone(
+        self,
+        drone_id: Optional[str] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        connection_string: Optional[str] = None
+    ) -> str:
+        """
+        Agrega un dron en caliente, sin reiniciar el gestor.
+        
+        En modo MAVSDK se agrega un vehículo con su supervisor de conexión; en
+        modo simulado, un generador de telemetría falsa. Los drones del gateway
+        MAVLink, de la reproducción y de la ingesta se descubren solos.
+        
+        Args:
+            drone_id: ID del dron (None = siguiente ID libre)
+            latitude: Latitud inicial del dron simulado (ubicación por defecto si es None)
+            longitude: Longitud inicial del dron simulado
+            connection_string: Cadena de conexión MAVSDK (obligatoria en modo MAVSDK)
+        
+        Returns:
+            ID del dron agregado
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if not self.running:
+            raise RuntimeError("El gestor de drones no está en ejecución")
+        if drone_id is None:
+            index = len(self.drones)
+            while generate_drone_id(index) in self.drones:
+                index += 1
+            drone_id = generate_drone_id(index)
+        elif drone_id in self.drones:
+            raise ValueError(f"El dron {drone_id} ya existe")
+        
+        if self.connection_manager:
+            if not connection_string:
+                raise ValueError("En modo MAVSDK se necesita connection_string")
+            self.drones[drone_id] = self.connection_manager.add_vehicle(drone_id, connection_string)
+        elif self.gateway or self.replay or connection_string:
+            raise ValueError("Esta fuente de telemetría no admite agregar drones manualmente")
+        else:
+            self._spawn_fake_drone(
+                drone_id,
+                self.config.default_latitude if latitude is None else latitude,
+                self.config.default_longitude if longitude is None else longitude
             )
+        
+        logger.info(f"Dron agregado: {drone_id} (total: {len(self.drones)})")
+        return drone_id
+    
+    async def remove_drone(self, drone_id: str) -> bool:
+        """
+        Retira un dron en caliente: detiene su fuente y limpia su estado.
+        
+        Args:
+            drone_id: ID del dron
+        
+        Returns:
+            True si el dron existía
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        drone = self.drones.pop(drone_id, None)
+        if isinstance(drone, FakeTelemetryGenerator):
+            await drone.stop()
+        elif isinstance(drone, MAVSDKSimulator) and self.connection_manager:
+            await self.connection_manager.remove_vehicle(drone_id)
+        elif isinstance(drone, MAVLinkVehicle) and self.gateway:
+            await self.gateway.remove_vehicle(drone_id)
+        elif drone is not None and drone is self.replay:
+            # La grabación sigue en curso: saltar los registros de este dron
+            self.replay.exclude(drone_id)
+        
+        task = self._drone_tasks.pop(drone_id, None)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self.tasks.remove(task)
+        
+        if drone is None and drone_id not in self.staleness:
+            return False
+        self._forget_drone(drone_id)
+        logger.info(f"Dron retirado: {drone_id} (total: {len(self.drones)})")
+        return True
+    
+    def _forget_drone(self, drone_id: str):
+        """Limpia el estado por dron y avisa a los oyentes."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        self.staleness.forget(drone_id)
+        if self.rate_policy:
+            self.rate_policy.forget(drone_id)
+        for listener in self.drone_removed_listeners:
+            try:
+                listener(drone_id)
+            except Exception as e:
+                logger.error(f"Error en oyente de drones retirados: {e}", exc_info=True)
+    
+    def get_stale_count(self) -> int:
+        """Obtiene el número de drones sin telemetría reciente."""
+        return self.staleness.stale_count
+    
+    def _notify_stale(self, drone_id: str, stale: bool):
+        """Publica una transición de obsolescencia a los oyentes."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        for listener in self.drone_stale_listeners:
+            try:
+                listener(drone_id, stale)
+            except Exception as e:
+                logger.error(f"Error en oyente de obsolescencia: {e}", exc_info=True)
+    
+    async def _watch_staleness(self):
+        """
+        Procesa los plazos vencidos del seguimiento de obsolescencia.
+        Duerme hasta el plazo más próximo (como máximo un segundo, para
+        atender a los drones que aparecen mientras tanto).
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        while self.running:
+            deadline = self.staleness.next_deadline()
+            delay = 1.0 if deadline is None else deadline - time.monotonic()
+            await asyncio.sleep(min(max(delay, 0.05), 1.0))
             
-            self.drones[drone_id] = drone
-            task = asyncio.create_task(
-                drone.start(self.config.telemetry_update_interval)
-            )
-            self.tasks.append(task)
+            newly_stale, evicted = self.staleness.expire()
+            for drone_id in newly_stale:
+                logger.warning(
+                    f"Dron {drone_id} sin telemetría durante {self.config.drone_stale_timeout:g}s "
+                    f"({self.staleness.stale_count} obsoletos)"
+                )
+                self._notify_stale(drone_id, True)
+            for drone_id in evicted:
+                logger.warning(f"Dron {drone_id} sin telemetría durante {self.config.drone_evict_timeout:g}s; se retira")
+                drone = self.drones.get(drone_id)
+                if drone is not None and not isinstance(drone, MAVSDKSimulator):
+                    await self.remove_drone(drone_id)
+                else:
+                    # Ingesta externa, o MAVSDK (el supervisor sigue reintentando y el
+                    # dron reaparece al reconectar): solo se limpia su estado
+                    self._forget_drone(drone_id)
     
-    def _on_telemetry_update(self, telemetry: Dict):
+    def _on_telemetry_update(self, telemetry: TelemetrySchema):
         """Maneja la actualización de telemetría de un dron."""
         import logging
         logger = logging.getLogger(__name__)
         
+        if self.staleness.touch(telemetry.drone_id):
+            logger.info(f"Dron {telemetry.drone_id} vuelve a informar")
+            self._notify_stale(telemetry.drone_id, False)
+        
         if self.telemetry_callback:
             try:
                 self.telemetry_callback(telemetry)
@@ -143,6 +450,18 @@ class DroneManager:
                 logger.error(f"Error en callback de telemetría: {e}", exc_info=True)
         else:
             logger.warning("No hay callback configurado para telemetría")
+        
+        for listener in self.telemetry_listeners:
+            try:
+                listener(telemetry)
+            except Exception as e:
+                logger.error(f"Error en oyente de telemetría: {e}", exc_info=True)
+    
+    def get_connection_health(self) -> Dict[str, Dict]:
+        """Obtiene el estado de conexión por vehículo (solo en modo MAVSDK)."""
+        if self.connection_manager:
+            return self.connection_manager.get_health()
+        return {}
     
     def get_drone_list(self) -> List[str]:
         """Obtiene la lista de IDs de drones activos."""
@@ -152,7 +471,7 @@ class DroneManager:
         """Obtiene el número de drones activos."""
         return len(self.drones)
     
-    async def send_command_to_drone(self, drone_id: str, command: str, **kwargs):
+    async def send_command_to_drone(self, drone_id: str, command: str, **kwargs) -> CommandAck:
         """
         Envía un comando a un dron específico.
         
@@ -160,17 +479,93 @@ class DroneManager:
             drone_id: ID del dron objetivo
             command: Nombre del comando (ej., "set_target")
             **kwargs: Parámetros del comando
+        
+        Returns:
+            Acuse del comando
         """
-        if drone_id not in self.drones:
-            return
+        acks = await self.send_commands([DroneCommand(drone_id, command, kwargs)])
+        return acks[0]
+    
+    async def send_commands(
+        self,
+        batch: Iterable[DroneCommand],
+        timeout: Optional[float] = None
+    ) -> List[CommandAck]:
+        """
+        Envía un lote de comandos en paralelo y espera todos los acuses.
         
-        drone = self.drones[drone_id]
+        Cada comando tiene su propio plazo, así que un dron lento o caído no
+        retrasa a los demás: el lote completo tarda lo que el acuse más lento
+        (o el plazo), no la suma de todos.
         
-        if isinstance(drone, FakeTelemetryGenerator):
-            if command == "set_target":
-                drone.set_target(
-                    kwargs.get("latitude"),
-                    kwargs.get("longitude"),
-                    kwargs.get("altitude", 20.0)
-                )
+        Args:
+            batch: Comandos a enviar
+            timeout: Segundos máximos por comando (config.command_timeout por defecto)
+        
+        Returns:
+            Un acuse por comando, en el mismo orden que el lote
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        timeout = self.config.command_timeout if timeout is None else timeout
+        commands = list(batch)
+        if not commands:
+            return []
+        
+        started = time.perf_counter()
+        acks = await asyncio.gather(*(self._execute_command(command, timeout) for command in commands))
+        failed = sum(1 for ack in acks if not ack.ok)
+        logger.info(
+            f"Lote de {len(acks)} comandos en {(time.perf_counter() - started) * 1000:.1f} ms "
+            f"({failed} sin acuse correcto)"
+        )
+        return list(acks)
+    
+    async def _execute_command(self, command: DroneCommand, timeout: float) -> CommandAck:
+        """Ejecuta un comando en su dron y construye el acuse."""
+        started = time.perf_counter()
+        
+        def ack(status: CommandStatus, error: Optional[str] = None) -> CommandAck:
+            return CommandAck(
+                drone_id=command.drone_id,
+                command=command.command,
+                status=status.value,
+                latency=time.perf_counter() - started,
+                error=error
+            )
+        
+        drone = self.drones.get(command.drone_id)
+        if drone is None:
+            return ack(CommandStatus.UNKNOWN_DRONE, f"Dron desconocido: {command.drone_id}")
+        
+        try:
+            result = self._invoke_command(drone, command)
+            if result is None:
+                return ack(CommandStatus.UNSUPPORTED, f"Comando no soportado: {command.command}")
+            if inspect.isawaitable(result):
+                await asyncio.wait_for(result, timeout)
+        except asyncio.TimeoutError:
+            return ack(CommandStatus.TIMEOUT, f"Sin acuse en {timeout:.1f} s")
+        except Exception as e:
+            return ack(CommandStatus.FAILED, str(e))
+        return ack(CommandStatus.OK)
+    
+    def _invoke_command(self, drone, command: DroneCommand):
+        """
+        Llama al manejador del comando en el dron.
+        
+        Returns:
+            El resultado del manejador (awaitable en MAVSDK), True si es
+            síncrono, o None si el dron no soporta el comando
+        """
+        params = command.params
+        if command.command == "set_target" and hasattr(drone, "set_target"):
+            result = drone.set_target(
+                params["latitude"],
+                params["longitude"],
+                params.get("altitude", 20.0)
+            )
+            return True if result is None else result
         # Agregar más manejadores de comandos según sea necesario
+        return None
@@ -7,9 +7,11 @@ import asyncio
 import time
 import random
 import math
-from typing import Dict, Any, Callable, Optional
-from common.utils import generate_drone_id, normalize_telemetry
+from typing import Callable, Optional
+from common.utils import generate_drone_id
 from common.constants import DroneStatus
+from backend.schemas import TelemetrySchema
+from drones.rate_policy import AdaptiveRatePolicy
 
 
 class FakeTelemetryGenerator:
@@ -36,7 +38,8 @@ class FakeTelemetryGenerator:
         drone_id: str,
         start_lat: float = 37.7749,
         start_lon: float = -122.4194,
-        callback: Optional[Callable[[Dict[str, Any]], None]] = None
+        callback: Optional[Callable[[TelemetrySchema], None]] = None,
+        rate_policy: Optional[AdaptiveRatePolicy] = None
     ):
         """
         Inicializa el generador de telemetría falsa para Matrice 300 RTK.
@@ -46,6 +49,7 @@ class FakeTelemetryGenerator:
             start_lat: Latitud inicial
             start_lon: Longitud inicial
             callback: Función a llamar con actualizaciones de telemetría
+            rate_policy: Política de tasa adaptativa (None = publicar cada actualización)
         """
         self.drone_id = drone_id
         self.latitude = start_lat
@@ -56,6 +60,7 @@ class FakeTelemetryGenerator:
         self.battery = 100.0
         self.status = DroneStatus.IDLE.value
         self.callback = callback
+        self.rate_policy = rate_policy
         self.running = False
         
         # Parámetros de movimiento
@@ -79,6 +84,9 @@ class FakeTelemetryGenerator:
         """
         Inicia la generación de actualizaciones de telemetría.
         
+        La simulación avanza cada update_interval; con rate_policy solo se
+        publican las muestras que la política permite.
+        
         Args:
             update_interval: Segundos entre actualizaciones
         """
@@ -92,6 +100,8 @@ class FakeTelemetryGenerator:
         try:
             self._update_position()
             telemetry = self._generate_telemetry()
+            if self.rate_policy:
+                self.rate_policy.should_emit(telemetry)  # Registrar la muestra publicada
             if self.callback:
                 logger.info(f"Enviando primera telemetría para {self.drone_id}")
                 self.callback(telemetry)
@@ -108,7 +118,9 @@ class FakeTelemetryGenerator:
                 self._update_position()
                 telemetry = self._generate_telemetry()
                 
-                if self.callback:
+                if self.rate_policy and not self.rate_policy.should_emit(telemetry):
+                    pass  # Sin cambios relevantes: no publicar esta muestra
+                elif self.callback:
                     try:
                         self.callback(telemetry)
                     except Exception as e:
@@ -241,37 +253,34 @@ class FakeTelemetryGenerator:
             self.velocity = 0.0
             self.speed = 0.0
     
-    def _generate_telemetry(self) -> Dict[str, Any]:
-        """Genera diccionario de telemetría normalizado con datos Matrice 300 RTK."""
-        telemetry = normalize_telemetry({
-            "drone_id": self.drone_id,
-            "latitude": self.latitude,
-            "longitude": self.longitude,
-            "altitude": self.altitude,
-            "heading": self.heading,
-            "velocity": self.velocity,
-            "battery": self.battery,
-            "status": self.status,
-            "timestamp": time.time(),
-        })
-        
-        # Agregar campos específicos de Matrice 300 RTK
-        telemetry["vertical_speed"] = self.vertical_speed
-        telemetry["rtk_fix"] = self.rtk_fix
-        telemetry["max_speed"] = self.MAX_SPEED
-        telemetry["max_altitude"] = self.MAX_ALTITUDE
-        
+    def _generate_telemetry(self) -> TelemetrySchema:
+        """Genera el registro de telemetría con datos Matrice 300 RTK."""
         # Calcular tiempo de vuelo restante estimado
         if self.battery > 0 and self.status in [DroneStatus.FLYING.value, DroneStatus.TAKEOFF.value]:
             if self.velocity > 5.0:
                 flight_time_remaining = (self.battery / 100.0) * self.MAX_FLIGHT_TIME
             else:
                 flight_time_remaining = (self.battery / 100.0) * (60.0 * 60.0)  # Tiempo de vuelo estacionario
-            telemetry["flight_time_remaining"] = flight_time_remaining
         else:
-            telemetry["flight_time_remaining"] = 0.0
+            flight_time_remaining = 0.0
         
-        return telemetry
+        return TelemetrySchema(
+            drone_id=self.drone_id,
+            latitude=self.latitude,
+            longitude=self.longitude,
+            altitude=self.altitude,
+            heading=self.heading,
+            velocity=self.velocity,
+            battery=self.battery,
+            status=self.status,
+            timestamp=time.time(),
+            # Campos específicos de Matrice 300 RTK
+            vertical_speed=self.vertical_speed,
+            rtk_fix=self.rtk_fix,
+            max_speed=self.MAX_SPEED,
+            max_altitude=self.MAX_ALTITUDE,
+            flight_time_remaining=flight_time_remaining,
+        )
     
     def set_target(self, lat: float, lon: float, altitude: float = 20.0):
         """Establece un waypoint objetivo para el dron."""
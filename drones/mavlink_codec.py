@@ -0,0 +1,248 @@
+"""
+Codificación y decodificación mínima de MAVLink (v1 y v2).
+Solo cubre los mensajes de telemetría que consume el sistema, sin depender
+de pymavlink ni de MAVSDK.
+"""
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+MAVLINK_V1_MAGIC = 0xFE
+MAVLINK_V2_MAGIC = 0xFD
+
+# IDs de mensajes soportados
+MSG_HEARTBEAT = 0
+MSG_SYS_STATUS = 1
+MSG_GLOBAL_POSITION_INT = 33
+MSG_VFR_HUD = 74
+
+# Definición de cada mensaje: (formato struct del payload, CRC_EXTRA, campos)
+# Los campos están en orden de transmisión (ordenados por tamaño, según MAVLink)
+MESSAGES: Dict[int, Tuple[str, int, Tuple[str, ...]]] = {
+    MSG_HEARTBEAT: (
+        "<IBBBBB", 50,
+        ("custom_mode", "type", "autopilot", "base_mode", "system_status", "mavlink_version"),
+    ),
+    MSG_SYS_STATUS: (
+        "<IIIHHhHHHHHHb", 124,
+        ("onboard_control_sensors_present", "onboard_control_sensors_enabled",
+         "onboard_control_sensors_health", "load", "voltage_battery", "current_battery",
+         "drop_rate_comm", "errors_comm", "errors_count1", "errors_count2",
+         "errors_count3", "errors_count4", "battery_remaining"),
+    ),
+    MSG_GLOBAL_POSITION_INT: (
+        "<IiiiihhhH", 104,
+        ("time_boot_ms", "lat", "lon", "alt", "relative_alt", "vx", "vy", "vz", "hdg"),
+    ),
+    MSG_VFR_HUD: (
+        "<ffffhH", 20,
+        ("airspeed", "groundspeed", "alt", "climb", "heading", "throttle"),
+    ),
+}
+
+# MAV_TYPE del remitente de un HEARTBEAT que no es un vehículo (estación de tierra)
+MAV_TYPE_GCS = 6
+
+# MAV_STATE (campo system_status del HEARTBEAT)
+MAV_STATE_STANDBY = 3
+MAV_STATE_ACTIVE = 4
+MAV_STATE_CRITICAL = 5
+MAV_STATE_EMERGENCY = 6
+
+# Bit de base_mode que indica que el vehículo está armado
+MAV_MODE_FLAG_SAFETY_ARMED = 0x80
+
+
+@dataclass(slots=True)
+class MAVLinkMessage:
+    """Mensaje MAVLink decodificado."""
+    msg_id: int
+    system_id: int
+    component_id: int
+    sequence: int
+    fields: Dict[str, float]
+
+
+def x25_crc(data: bytes, crc: int = 0xFFFF) -> int:
+    """
+    Calcula el CRC-16/MCRF4XX (X.25) usado por MAVLink.
+    
+    Args:
+        data: Bytes a acumular
+        crc: Valor inicial (para acumular por partes)
+    
+    Returns:
+        CRC de 16 bits
+    """
+    for byte in data:
+        tmp = byte ^ (crc & 0xFF)
+        tmp = (tmp ^ (tmp << 4)) & 0xFF
+        crc = ((crc >> 8) ^ (tmp << 8) ^ (tmp << 3) ^ (tmp >> 4)) & 0xFFFF
+    return crc
+
+
+def encode_message(
+    msg_id: int,
+    values: Dict[str, float],
+    system_id: int,
+    component_id: int = 1,
+    sequence: int = 0,
+    version: int = 2
+) -> bytes:
+    """
+    Codifica un mensaje MAVLink soportado.
+    
+    Args:
+        msg_id: ID del mensaje (ver MESSAGES)
+        values: Valores de los campos (los ausentes se envían en 0)
+        system_id: ID de sistema del remitente
+        component_id: ID de componente del remitente
+        sequence: Número de secuencia (0-255)
+        version: Versión del protocolo (1 o 2)
+    
+    Returns:
+        Trama MAVLink completa
+    """
+    fmt, crc_extra, names = MESSAGES[msg_id]
+    payload = struct.pack(fmt, *(values.get(name, 0) for name in names))
+    
+    if version == 1:
+        header = struct.pack(
+            "<BBBBBB", MAVLINK_V1_MAGIC, len(payload),
+            sequence & 0xFF, system_id, component_id, msg_id
+        )
+    else:
+        # MAVLink 2 recorta los ceros finales del payload
+        payload = payload.rstrip(b"\x00") or payload[:1]
+        header = struct.pack(
+            "<BBBBBBBHB", MAVLINK_V2_MAGIC, len(payload), 0, 0,
+            sequence & 0xFF, system_id, component_id,
+            msg_id & 0xFFFF, msg_id >> 16
+        )
+    
+    crc = x25_crc(header[1:] + payload)
+    crc = x25_crc(bytes((crc_extra,)), crc)
+    return header + payload + struct.pack("<H", crc)
+
+
+class MAVLinkParser:
+    """
+    Decodificador incremental de tramas MAVLink v1/v2.
+    
+    Acepta bytes arbitrarios (datagramas o fragmentos de un flujo), se
+    resincroniza tras bytes corruptos y descarta mensajes no soportados o con
+    CRC inválido, contándolos en las estadísticas.
+    """
+    
+    def __init__(self):
+        """Inicializa el decodificador vacío."""
+        self._buffer = bytearray()
+        self.parsed_count = 0
+        self.crc_errors = 0
+        self.unknown_count = 0
+    
+    def feed(self, data: bytes) -> List[MAVLinkMessage]:
+        """
+        Agrega bytes y devuelve los mensajes completos decodificados.
+        
+        Args:
+            data: Bytes recibidos
+        
+        Returns:
+            Lista de mensajes soportados, en orden de llegada
+        """
+        buffer = self._buffer
+        buffer.extend(data)
+        messages = []
+        
+        while buffer:
+            # Buscar el siguiente byte de inicio
+            start = self._find_magic(buffer)
+            if start < 0:
+                buffer.clear()
+                break
+            if start:
+                del buffer[:start]
+            
+            frame = self._frame_length(buffer)
+            if frame is None or len(buffer) < frame:
+                break  # Trama incompleta: esperar más bytes
+            
+            message = self._decode(bytes(buffer[:frame]))
+            if message is None:
+                # Descartar solo el byte de inicio y resincronizar
+                del buffer[:1]
+                continue
+            
+            del buffer[:frame]
+            if message is not False:
+                messages.append(message)
+        
+        return messages
+    
+    @staticmethod
+    def _find_magic(buffer: bytearray) -> int:
+        """Posición del primer byte de inicio v1 o v2 (-1 si no hay)."""
+        positions = [p for p in (buffer.find(MAVLINK_V1_MAGIC), buffer.find(MAVLINK_V2_MAGIC)) if p >= 0]
+        return min(positions) if positions else -1
+    
+    @staticmethod
+    def _frame_length(buffer: bytearray) -> Optional[int]:
+        """Longitud total de la trama que comienza en buffer[0]."""
+        if len(buffer) < 2:
+            return None
+        payload_len = buffer[1]
+        if buffer[0] == MAVLINK_V1_MAGIC:
+            return 6 + payload_len + 2
+        if len(buffer) < 3:
+            return None
+        signed = buffer[2] & 0x01  # MAVLINK_IFLAG_SIGNED
+        return 10 + payload_len + 2 + (13 if signed else 0)
+    
+    def _decode(self, frame: bytes):
+        """
+        Decodifica una trama completa.
+        
+        Returns:
+            MAVLinkMessage, False si es válida pero no soportada,
+            o None si el CRC no coincide
+        """
+        if frame[0] == MAVLINK_V1_MAGIC:
+            payload_len, sequence, system_id, component_id, msg_id = struct.unpack_from("<BBBBB", frame, 1)
+            header_len = 6
+        else:
+            payload_len, _, _, sequence, system_id, component_id, msg_low, msg_high = struct.unpack_from(
+                "<BBBBBBHB", frame, 1
+            )
+            msg_id = msg_low | (msg_high << 16)
+            header_len = 10
+        
+        definition = MESSAGES.get(msg_id)
+        if definition is None:
+            # Sin CRC_EXTRA no se puede validar: descartar la trama completa
+            self.unknown_count += 1
+            return False
+        
+        fmt, crc_extra, names = definition
+        payload_end = header_len + payload_len
+        crc = x25_crc(frame[1:payload_end])
+        crc = x25_crc(bytes((crc_extra,)), crc)
+        if crc != struct.unpack_from("<H", frame, payload_end)[0]:
+            self.crc_errors += 1
+            return None
+        
+        # Restaurar los ceros finales recortados por MAVLink 2
+        payload = frame[header_len:payload_end]
+        expected = struct.calcsize(fmt)
+        if len(payload) < expected:
+            payload = payload + bytes(expected - len(payload))
+        
+        self.parsed_count += 1
+        return MAVLinkMessage(
+            msg_id=msg_id,
+            system_id=system_id,
+            component_id=component_id,
+            sequence=sequence,
+            fields=dict(zip(names, struct.unpack(fmt, payload[:expected]))),
+        )
@@ -0,0 +1,374 @@
+"""
+Gateway MAVLink de un solo socket UDP.
+Recibe MAVLink de cualquier número de vehículos en un puerto, los separa por
+ID de sistema/componente y alimenta un estado fusionado por vehículo.
+"""
+import asyncio
+import math
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from common.constants import DroneStatus
+from common.utils import generate_drone_id
+from backend.schemas import TelemetrySchema
+from drones.telemetry_fusion import TelemetryFusion
+from drones.mavlink_codec import (
+    MAVLinkMessage,
+    MAVLinkParser,
+    MSG_HEARTBEAT,
+    MSG_SYS_STATUS,
+    MSG_GLOBAL_POSITION_INT,
+    MSG_VFR_HUD,
+    MAV_TYPE_GCS,
+    MAV_STATE_STANDBY,
+    MAV_STATE_ACTIVE,
+    MAV_STATE_CRITICAL,
+    MAV_STATE_EMERGENCY,
+    MAV_MODE_FLAG_SAFETY_ARMED,
+)
+
+
+# Segundos sin datagramas tras los que se descarta el decodificador de una dirección
+PARSER_IDLE_TIMEOUT = 60.0
+# Direcciones de origen con decodificador propio como máximo
+MAX_SOURCE_ADDRESSES = 1024
+
+
+class MAVLinkVehicle:
+    """Estado de un vehículo descubierto por el gateway."""
+    
+    def __init__(
+        self,
+        drone_id: str,
+        system_id: int,
+        component_id: int,
+        address: Tuple[str, int],
+        fusion: TelemetryFusion
+    ):
+        """
+        Inicializa el vehículo.
+        
+        Args:
+            drone_id: Identificador del dron en el sistema
+            system_id: ID de sistema MAVLink
+            component_id: ID de componente MAVLink
+            address: Dirección UDP desde la que transmite
+            fusion: Estado fusionado de telemetría
+        """
+        self.drone_id = drone_id
+        self.system_id = system_id
+        self.component_id = component_id
+        self.address = address
+        self.fusion = fusion
+        self.last_heartbeat = time.monotonic()
+        self.message_count = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class _GatewayProtocol(asyncio.DatagramProtocol):
+    """Protocolo asyncio que entrega los datagramas al gateway."""
+    
+    def __init__(self, gateway: "MAVLinkGateway"):
+        self.gateway = gateway
+    
+    def datagram_received(self, data: bytes, addr):
+        self.gateway.datagram_received(data, addr)
+    
+    def error_received(self, exc):
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.warning(f"Error en socket del gateway MAVLink: {exc}")
+
+
+class MAVLinkGateway:
+    """
+    Gateway MAVLink sobre un único socket UDP.
+    
+    Cada vehículo se identifica por (system_id, component_id) y se crea al
+    recibir su primer HEARTBEAT; los mensajes de vehículos aún no anunciados
+    se descartan. Los mensajes se traducen a grupos de TelemetryFusion y un
+    emisor por vehículo entrega los registros al callback.
+    
+    Una dirección de origen solo obtiene decodificador propio cuando envía
+    una trama válida; los de direcciones inactivas más de PARSER_IDLE_TIMEOUT
+    se descartan y nunca se mantienen más de MAX_SOURCE_ADDRESSES.
+    """
+    
+    def __init__(
+        self,
+        callback: Optional[Callable[[TelemetrySchema], None]] = None,
+        host: str = "0.0.0.0",
+        port: int = 14550,
+        emit_fields: Optional[Iterable[str]] = None,
+        max_rate_hz: float = 2.0,
+        on_vehicle: Optional[Callable[[MAVLinkVehicle], None]] = None
+    ):
+        """
+        Inicializa el gateway.
+        
+        Args:
+            callback: Función a llamar con actualizaciones de telemetría
+            host: Interfaz de escucha
+            port: Puerto UDP de escucha
+            emit_fields: Grupos que disparan una emisión inmediata (ver TelemetryFusion)
+            max_rate_hz: Tasa máxima de emisión de actualizaciones parciales por vehículo
+            on_vehicle: Función a llamar cuando se descubre un vehículo nuevo
+        """
+        self.callback = callback
+        self.host = host
+        self.port = port
+        self.emit_fields = emit_fields
+        self.max_rate_hz = max_rate_hz
+        self.on_vehicle = on_vehicle
+        
+        self.vehicles: Dict[Tuple[int, int], MAVLinkVehicle] = {}
+        self.running = False
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._parsers: Dict[Tuple[str, int], MAVLinkParser] = {}
+        self._parser_seen: Dict[Tuple[str, int], float] = {}
+        
+        # Contadores de estadísticas
+        self.datagram_count = 0
+        self.dropped_count = 0
+        self.rejected_count = 0
+        # Totales de los decodificadores ya descartados
+        self._retired_messages = 0
+        self._retired_crc_errors = 0
+    
+    async def start(self):
+        """Abre el socket UDP y comienza a recibir."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if self.running:
+            return
+        
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _GatewayProtocol(self),
+            local_addr=(self.host, self.port)
+        )
+        # Puerto real (útil si se pidió el puerto 0)
+        self.port = self._transport.get_extra_info("sockname")[1]
+        self.running = True
+        logger.info(f"Gateway MAVLink escuchando en udp://{self.host}:{self.port}")
+    
+    async def stop(self):
+        """Cierra el socket y detiene los emisores de todos los vehículos."""
+        self.running = False
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        
+        tasks = []
+        for vehicle in self.vehicles.values():
+            vehicle.fusion.wake()
+            if vehicle.task:
+                vehicle.task.cancel()
+                tasks.append(vehicle.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for addr in list(self._parsers):
+            self._retire_parser(addr)
+    
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        """
+        Decodifica un datagrama y enruta sus mensajes.
+        
+        Args:
+            data: Bytes recibidos
+            addr: Dirección del remitente
+        """
+        self.datagram_count += 1
+        now = time.monotonic()
+        parser = self._parsers.get(addr)
+        if parser is None:
+            # Dirección nueva: decodificar sin registrarla hasta ver una trama válida
+            parser = MAVLinkParser()
+            messages = parser.feed(data)
+            if not parser.parsed_count:
+                self.rejected_count += 1
+                return
+            self._prune_parsers(now)
+            if len(self._parsers) >= MAX_SOURCE_ADDRESSES:
+                self.rejected_count += 1
+                return
+            self._parsers[addr] = parser
+        else:
+            messages = parser.feed(data)
+        self._parser_seen[addr] = now
+        
+        for message in messages:
+            self.route_message(message, addr)
+    
+    def route_message(self, message: MAVLinkMessage, addr: Tuple[str, int]):
+        """
+        Aplica un mensaje al estado del vehículo que lo envió.
+        
+        Args:
+            message: Mensaje decodificado
+            addr: Dirección del remitente
+        """
+        key = (message.system_id, message.component_id)
+        vehicle = self.vehicles.get(key)
+        fields = message.fields
+        
+        if vehicle is None:
+            if message.msg_id != MSG_HEARTBEAT or fields["type"] == MAV_TYPE_GCS:
+                self.dropped_count += 1
+                return
+            vehicle = self._create_vehicle(message, addr)
+        
+        vehicle.address = addr
+        vehicle.message_count += 1
+        fusion = vehicle.fusion
+        
+        if message.msg_id == MSG_HEARTBEAT:
+            vehicle.last_heartbeat = time.monotonic()
+            fusion.update("flight_mode", status=self._heartbeat_status(fields))
+        
+        elif message.msg_id == MSG_GLOBAL_POSITION_INT:
+            fusion.update(
+                "position",
+                latitude=fields["lat"] / 1e7,
+                longitude=fields["lon"] / 1e7,
+                altitude=fields["relative_alt"] / 1000.0,
+            )
+            values = {
+                "velocity": math.hypot(fields["vx"], fields["vy"]) / 100.0,
+                "vertical_speed": -fields["vz"] / 100.0,  # NED: abajo es positivo
+            }
+            if fields["hdg"] != 65535:  # UINT16_MAX = rumbo desconocido
+                values["heading"] = fields["hdg"] / 100.0
+            fusion.update("velocity", **values)
+        
+        elif message.msg_id == MSG_VFR_HUD:
+            fusion.update(
+                "velocity",
+                velocity=fields["groundspeed"],
+                vertical_speed=fields["climb"],
+                heading=float(fields["heading"] % 360),
+            )
+        
+        elif message.msg_id == MSG_SYS_STATUS:
+            if fields["battery_remaining"] >= 0:  # -1 = desconocido
+                fusion.update("battery", battery=float(fields["battery_remaining"]))
+    
+    def get_vehicle(self, drone_id: str) -> Optional[MAVLinkVehicle]:
+        """Obtiene un vehículo por su drone_id."""
+        for vehicle in self.vehicles.values():
+            if vehicle.drone_id == drone_id:
+                return vehicle
+        return None
+    
+    async def remove_vehicle(self, drone_id: str) -> bool:
+        """
+        Olvida un vehículo y detiene su emisor; si vuelve a enviar HEARTBEAT
+        se descubre de nuevo.
+        
+        Args:
+            drone_id: ID del vehículo
+        
+        Returns:
+            True si el vehículo existía
+        """
+        for key, vehicle in self.vehicles.items():
+            if vehicle.drone_id == drone_id:
+                break
+        else:
+            return False
+        
+        del self.vehicles[key]
+        vehicle.fusion.wake()
+        if vehicle.task:
+            vehicle.task.cancel()
+            await asyncio.gather(vehicle.task, return_exceptions=True)
+        # El parser de la dirección solo se descarta si ningún otro vehículo la usa
+        if all(other.address != vehicle.address for other in self.vehicles.values()):
+            self._retire_parser(vehicle.address)
+        return True
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Obtiene las estadísticas del gateway."""
+        return {
+            "vehicles": len(self.vehicles),
+            "datagrams": self.datagram_count,
+            "sources": len(self._parsers),
+            "messages": self._retired_messages + sum(p.parsed_count for p in self._parsers.values()),
+            "crc_errors": self._retired_crc_errors + sum(p.crc_errors for p in self._parsers.values()),
+            "dropped": self.dropped_count,
+            "rejected": self.rejected_count,
+        }
+    
+    def _prune_parsers(self, now: float):
+        """Descarta los decodificadores de direcciones inactivas (al aparecer una nueva)."""
+        idle = [
+            addr for addr, seen in self._parser_seen.items()
+            if now - seen > PARSER_IDLE_TIMEOUT
+        ]
+        for addr in idle:
+            self._retire_parser(addr)
+    
+    def _retire_parser(self, addr: Tuple[str, int]):
+        """Descarta el decodificador de una dirección conservando sus contadores."""
+        parser = self._parsers.pop(addr, None)
+        self._parser_seen.pop(addr, None)
+        if parser is not None:
+            self._retired_messages += parser.parsed_count
+            self._retired_crc_errors += parser.crc_errors
+    
+    def _create_vehicle(self, message: MAVLinkMessage, addr: Tuple[str, int]) -> MAVLinkVehicle:
+        """Registra un vehículo nuevo y arranca su emisor."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        drone_id = generate_drone_id(message.system_id)
+        if message.component_id != 1:  # MAV_COMP_ID_AUTOPILOT1
+            drone_id = f"{drone_id}_{message.component_id}"
+        
+        vehicle = MAVLinkVehicle(
+            drone_id=drone_id,
+            system_id=message.system_id,
+            component_id=message.component_id,
+            address=addr,
+            fusion=TelemetryFusion(drone_id, self.emit_fields, self.max_rate_hz),
+        )
+        self.vehicles[(message.system_id, message.component_id)] = vehicle
+        vehicle.task = asyncio.get_running_loop().create_task(self._emit_loop(vehicle))
+        logger.info(
+            f"Vehículo MAVLink descubierto: {drone_id} "
+            f"(sysid={message.system_id}, compid={message.component_id}, {addr[0]}:{addr[1]})"
+        )
+        
+        if self.on_vehicle:
+            self.on_vehicle(vehicle)
+        return vehicle
+    
+    async def _emit_loop(self, vehicle: MAVLinkVehicle):
+        """Entrega los registros fusionados de un vehículo al callback."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        fusion = vehicle.fusion
+        try:
+            while self.running:
+                await fusion.wait()
+                if self.running and fusion.should_emit():
+                    telemetry = fusion.emit()
+                    if self.callback:
+                        try:
+                            self.callback(telemetry)
+                        except Exception as e:
+                            logger.error(f"Error en callback de telemetría para {vehicle.drone_id}: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            pass
+    
+    @staticmethod
+    def _heartbeat_status(fields: Dict[str, float]) -> str:
+        """Traduce MAV_STATE y base_mode del HEARTBEAT a un estado del sistema."""
+        system_status = fields["system_status"]
+        if system_status in (MAV_STATE_CRITICAL, MAV_STATE_EMERGENCY):
+            return DroneStatus.ERROR.value
+        if system_status == MAV_STATE_ACTIVE:
+            return DroneStatus.FLYING.value
+        if system_status == MAV_STATE_STANDBY and fields["base_mode"] & MAV_MODE_FLAG_SAFETY_ARMED:
+            return DroneStatus.ARMED.value
+        return DroneStatus.IDLE.value
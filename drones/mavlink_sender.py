@@ -0,0 +1,204 @@
+"""
+Emisor MAVLink de prueba.
+Sustituye a los vehículos reales: reutiliza el modelo de vuelo de
+FakeTelemetryGenerator y envía su telemetría como MAVLink por UDP.
+
+Uso:
+    python -m drones.mavlink_sender --count 20 --port 14550
+"""
+import asyncio
+import math
+import socket
+import time
+from typing import List, Optional, Tuple
+from common.constants import DroneStatus
+from common.utils import generate_drone_id
+from backend.schemas import TelemetrySchema
+from drones.fake_generator import FakeTelemetryGenerator
+from drones.mavlink_codec import (
+    encode_message,
+    MSG_HEARTBEAT,
+    MSG_SYS_STATUS,
+    MSG_GLOBAL_POSITION_INT,
+    MSG_VFR_HUD,
+    MAV_STATE_STANDBY,
+    MAV_STATE_ACTIVE,
+    MAV_STATE_CRITICAL,
+    MAV_MODE_FLAG_SAFETY_ARMED,
+)
+
+
+# Estado del sistema -> (MAV_STATE, armado)
+STATUS_MAV_STATE = {
+    DroneStatus.IDLE.value: (MAV_STATE_STANDBY, False),
+    DroneStatus.ARMED.value: (MAV_STATE_STANDBY, True),
+    DroneStatus.TAKEOFF.value: (MAV_STATE_ACTIVE, True),
+    DroneStatus.FLYING.value: (MAV_STATE_ACTIVE, True),
+    DroneStatus.LANDING.value: (MAV_STATE_ACTIVE, True),
+    DroneStatus.ERROR.value: (MAV_STATE_CRITICAL, False),
+}
+
+MAV_TYPE_QUADROTOR = 2
+MAV_AUTOPILOT_PX4 = 12
+
+
+class FakeMAVLinkVehicle:
+    """
+    Vehículo simulado que transmite MAVLink por UDP.
+    Cada actualización se envía como un datagrama con HEARTBEAT, SYS_STATUS,
+    GLOBAL_POSITION_INT y VFR_HUD.
+    """
+    
+    def __init__(
+        self,
+        system_id: int,
+        target: Tuple[str, int] = ("127.0.0.1", 14550),
+        start_lat: float = 20.9674,
+        start_lon: float = -89.5926,
+        component_id: int = 1,
+        version: int = 2,
+        sock: Optional[socket.socket] = None
+    ):
+        """
+        Inicializa el vehículo simulado.
+        
+        Args:
+            system_id: ID de sistema MAVLink (1-255)
+            target: Dirección UDP del gateway
+            start_lat: Latitud inicial
+            start_lon: Longitud inicial
+            component_id: ID de componente MAVLink
+            version: Versión del protocolo (1 o 2)
+            sock: Socket UDP compartido (se crea uno si no se indica)
+        """
+        self.system_id = system_id
+        self.component_id = component_id
+        self.target = target
+        self.version = version
+        self.sequence = 0
+        self.sent_count = 0
+        self._boot_time = time.monotonic()
+        self._sock = sock or socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.generator = FakeTelemetryGenerator(
+            drone_id=generate_drone_id(system_id),
+            start_lat=start_lat,
+            start_lon=start_lon,
+            callback=self.send_telemetry
+        )
+    
+    async def start(self, update_interval: float = 0.5):
+        """Inicia el vuelo simulado y la transmisión."""
+        await self.generator.start(update_interval)
+    
+    async def stop(self):
+        """Detiene el vuelo simulado."""
+        await self.generator.stop()
+    
+    def send_telemetry(self, telemetry: TelemetrySchema):
+        """Codifica un registro de telemetría como MAVLink y lo envía."""
+        self._sock.sendto(self.encode(telemetry), self.target)
+        self.sent_count += 1
+    
+    def encode(self, telemetry: TelemetrySchema) -> bytes:
+        """
+        Codifica un registro de telemetría como un datagrama MAVLink.
+        
+        Args:
+            telemetry: Registro a codificar
+        
+        Returns:
+            Tramas concatenadas
+        """
+        mav_state, armed = STATUS_MAV_STATE.get(telemetry.status, (MAV_STATE_ACTIVE, True))
+        heading_rad = math.radians(telemetry.heading)
+        vertical_speed = telemetry.vertical_speed or 0.0
+        
+        messages = (
+            (MSG_HEARTBEAT, {
+                "type": MAV_TYPE_QUADROTOR,
+                "autopilot": MAV_AUTOPILOT_PX4,
+                "base_mode": MAV_MODE_FLAG_SAFETY_ARMED if armed else 0,
+                "system_status": mav_state,
+                "mavlink_version": 3,
+            }),
+            (MSG_SYS_STATUS, {
+                "battery_remaining": int(round(telemetry.battery)),
+            }),
+            (MSG_GLOBAL_POSITION_INT, {
+                "time_boot_ms": int((time.monotonic() - self._boot_time) * 1000) & 0xFFFFFFFF,
+                "lat": int(round(telemetry.latitude * 1e7)),
+                "lon": int(round(telemetry.longitude * 1e7)),
+                "alt": int(round(telemetry.altitude * 1000)),
+                "relative_alt": int(round(telemetry.altitude * 1000)),
+                "vx": int(round(telemetry.velocity * math.cos(heading_rad) * 100)),
+                "vy": int(round(telemetry.velocity * math.sin(heading_rad) * 100)),
+                "vz": int(round(-vertical_speed * 100)),
+                "hdg": int(round(telemetry.heading * 100)) % 36000,
+            }),
+            (MSG_VFR_HUD, {
+                "airspeed": telemetry.velocity,
+                "groundspeed": telemetry.velocity,
+                "alt": telemetry.altitude,
+                "climb": vertical_speed,
+                "heading": int(round(telemetry.heading)) % 360,
+            }),
+        )
+        
+        frames = []
+        for msg_id, values in messages:
+            frames.append(encode_message(
+                msg_id, values, self.system_id, self.component_id, self.sequence, self.version
+            ))
+            self.sequence = (self.sequence + 1) & 0xFF
+        return b"".join(frames)
+
+
+async def run_fleet(
+    count: int,
+    target: Tuple[str, int] = ("127.0.0.1", 14550),
+    update_interval: float = 0.5,
+    base_lat: float = 20.9674,
+    base_lon: float = -89.5926
+) -> List[FakeMAVLinkVehicle]:
+    """
+    Lanza una flota simulada que comparte un socket UDP.
+    
+    Args:
+        count: Número de vehículos (system_id 1..count)
+        target: Dirección UDP del gateway
+        update_interval: Segundos entre envíos por vehículo
+        base_lat: Latitud central de la flota
+        base_lon: Longitud central de la flota
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    vehicles = []
+    for i in range(count):
+        vehicles.append(FakeMAVLinkVehicle(
+            system_id=i + 1,
+            target=target,
+            start_lat=base_lat + (i % 10 - 5) * 0.005,
+            start_lon=base_lon + (i // 10 - 5) * 0.005,
+            sock=sock
+        ))
+    
+    try:
+        await asyncio.gather(*(v.start(update_interval) for v in vehicles))
+    finally:
+        sock.close()
+    return vehicles
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Flota MAVLink simulada sobre UDP")
+    parser.add_argument("--count", type=int, default=6, help="Número de vehículos (máx. 255)")
+    parser.add_argument("--host", default="127.0.0.1", help="Host del gateway")
+    parser.add_argument("--port", type=int, default=14550, help="Puerto UDP del gateway")
+    parser.add_argument("--interval", type=float, default=0.5, help="Segundos entre envíos")
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(run_fleet(min(args.count, 255), (args.host, args.port), args.interval))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,132 @@
+"""
+Política de tasa de telemetría adaptativa por dron.
+Decide si una muestra se publica según el estado del dron y la magnitud del
+cambio desde la última publicación, sin alterar el ciclo de simulación.
+"""
+import time
+from typing import Dict, Iterable, Optional
+from common.constants import DroneStatus
+from common.deadband import DeltaThresholds, PublishedSample
+from backend.schemas import TelemetrySchema
+
+
+class AdaptiveRatePolicy:
+    """
+    Limita la tasa de publicación de cada dron según su actividad.
+    
+    Intervalos mínimos entre publicaciones:
+    - active_interval: en movimiento (velocidad horizontal o vertical
+      significativa) o maniobrando (cambio de rumbo, velocidad o altitud
+      de al menos los umbrales desde la última publicación)
+    - hover_interval: en el aire pero quieto (vuelo estacionario)
+    - idle_interval: en tierra e inactivo
+    
+    Un cambio de estado o el cruce de un umbral de batería se publica de
+    inmediato. Una sola instancia sirve a toda la flota (estado por drone_id).
+    """
+    
+    def __init__(
+        self,
+        active_interval: float = 0.5,
+        hover_interval: float = 2.0,
+        idle_interval: float = 5.0,
+        battery_thresholds: Iterable[float] = (50.0, 30.0, 20.0, 10.0),
+        moving_speed: float = 0.5,
+        heading_delta: float = 10.0,
+        velocity_delta: float = 2.0,
+        altitude_delta: float = 2.0
+    ):
+        """
+        Inicializa la política.
+        
+        Args:
+            active_interval: Segundos mínimos entre publicaciones en movimiento
+            hover_interval: Segundos mínimos entre publicaciones en vuelo estacionario
+            idle_interval: Segundos mínimos entre publicaciones en tierra
+            battery_thresholds: Porcentajes de batería cuyo cruce se publica de inmediato
+            moving_speed: Velocidad (m/s) a partir de la cual el dron está en movimiento
+            heading_delta: Cambio de rumbo (grados) que se considera maniobra
+            velocity_delta: Cambio de velocidad (m/s) que se considera maniobra
+            altitude_delta: Cambio de altitud (m) que se considera maniobra
+        """
+        self.active_interval = active_interval
+        self.hover_interval = hover_interval
+        self.idle_interval = idle_interval
+        self.battery_thresholds = sorted(battery_thresholds)
+        self.moving_speed = moving_speed
+        # Maniobra: mismos umbrales (y misma comparación) que la banda muerta
+        self.manoeuvre = DeltaThresholds(
+            altitude_m=altitude_delta,
+            heading_deg=heading_delta,
+            velocity_ms=velocity_delta,
+        )
+        
+        self._states: Dict[str, PublishedSample] = {}
+        
+        # Contadores de estadísticas
+        self.emitted_count = 0
+        self.suppressed_count = 0
+    
+    def should_emit(self, telemetry: TelemetrySchema, now: Optional[float] = None) -> bool:
+        """
+        Indica si la muestra debe publicarse y, si es así, la registra.
+        
+        Args:
+            telemetry: Muestra recién generada
+            now: Reloj monotónico (time.monotonic() por defecto)
+        
+        Returns:
+            True si la muestra debe enviarse al callback
+        """
+        now = time.monotonic() if now is None else now
+        state = self._states.get(telemetry.drone_id)
+        
+        if state is None or self._is_event(state, telemetry):
+            emit = True
+        else:
+            emit = now - state.last_emit >= self.interval_for(telemetry, state)
+        
+        if not emit:
+            self.suppressed_count += 1
+            return False
+        
+        self.emitted_count += 1
+        self._states[telemetry.drone_id] = PublishedSample.from_telemetry(telemetry, now)
+        return True
+    
+    def interval_for(self, telemetry: TelemetrySchema, state: Optional[PublishedSample] = None) -> float:
+        """
+        Intervalo mínimo de publicación para el estado actual del dron.
+        
+        Args:
+            telemetry: Muestra actual
+            state: Última muestra publicada (para detectar maniobras)
+        """
+        vertical_speed = abs(telemetry.vertical_speed or 0.0)
+        if telemetry.velocity >= self.moving_speed or vertical_speed >= self.moving_speed:
+            return self.active_interval
+        if state is not None and self.manoeuvre.exceeded(state, telemetry):
+            return self.active_interval
+        if telemetry.status == DroneStatus.IDLE.value and telemetry.altitude <= 0.5:
+            return self.idle_interval
+        return self.hover_interval
+    
+    def forget(self, drone_id: str):
+        """Descarta el estado de un dron (la próxima muestra se publica)."""
+        self._states.pop(drone_id, None)
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Obtiene las publicaciones enviadas y suprimidas."""
+        total = self.emitted_count + self.suppressed_count
+        return {
+            "emitted": self.emitted_count,
+            "suppressed": self.suppressed_count,
+            "reduction": total / self.emitted_count if self.emitted_count else 0.0,
+        }
+    
+    def _is_event(self, state: PublishedSample, telemetry: TelemetrySchema) -> bool:
+        """Cambio de estado o cruce de un umbral de batería."""
+        if telemetry.status != state.status:
+            return True
+        low, high = sorted((telemetry.battery, state.battery))
+        return any(low < threshold <= high for threshold in self.battery_thresholds)
@@ -0,0 +1,212 @@
+"""
+Reproducción de telemetría grabada.
+Inyecta una grabación del FlightRecorder por el mismo callback que los drones
+en vivo, con multiplicador de velocidad, búsqueda por timestamp y bucle.
+"""
+import asyncio
+import time
+from typing import Callable, List, Optional, Set
+import numpy as np
+from backend.flight_recorder import FlightLogReader, to_telemetry
+from backend.schemas import TelemetrySchema
+
+
+class TelemetryReplay:
+    """
+    Fuente de telemetría que reproduce una grabación como si fuera en vivo.
+    
+    Los registros se ordenan por timestamp y se emiten respetando los
+    intervalos originales divididos por speed (speed <= 0 = lo más rápido
+    posible, cediendo el loop cada batch_size registros). Con
+    live_timestamps los registros salen con la hora actual, para que el
+    resto del sistema los trate como telemetría fresca.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        callback: Optional[Callable[[TelemetrySchema], None]] = None,
+        speed: float = 1.0,
+        loop: bool = False,
+        live_timestamps: bool = True,
+        batch_size: int = 1000
+    ):
+        """
+        Inicializa la reproducción.
+        
+        Args:
+            path: Segmento .seg o carpeta de grabación
+            callback: Función a llamar con cada registro reproducido
+            speed: Multiplicador de velocidad (1.0 = tiempo real, <= 0 = sin espera)
+            loop: Volver al inicio al terminar
+            live_timestamps: Reemplazar el timestamp grabado por la hora actual
+            batch_size: Registros máximos emitidos sin ceder el loop de eventos
+        """
+        self.path = path
+        self.callback = callback
+        self.speed = speed
+        self.loop = loop
+        self.live_timestamps = live_timestamps
+        self.batch_size = batch_size
+        self.running = False
+        
+        self._reader = FlightLogReader(path)
+        records = self._reader.read()
+        # Orden por timestamp (estable para conservar el orden de llegada en empates)
+        self._records = records[np.argsort(records["timestamp"], kind="stable")]
+        self._timestamps = self._records["timestamp"]
+        self._position = 0
+        self._wall_base = 0.0
+        self._record_base = 0.0
+        self._wakeup = asyncio.Event()
+        # Drones retirados: sus registros se saltan durante el resto de la reproducción
+        self._excluded: Set[str] = set()
+        
+        self.emitted_count = 0
+        self.skipped_count = 0
+        self.loop_count = 0
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    @property
+    def start_time(self) -> Optional[float]:
+        """Timestamp del primer registro (None si está vacía)."""
+        return float(self._timestamps[0]) if len(self) else None
+    
+    @property
+    def end_time(self) -> Optional[float]:
+        """Timestamp del último registro (None si está vacía)."""
+        return float(self._timestamps[-1]) if len(self) else None
+    
+    @property
+    def current_time(self) -> Optional[float]:
+        """Timestamp grabado del próximo registro a emitir."""
+        if self._position < len(self):
+            return float(self._timestamps[self._position])
+        return self.end_time
+    
+    def drone_ids(self) -> List[str]:
+        """Drones presentes en la grabación."""
+        return self._reader.drone_ids()
+    
+    def exclude(self, drone_id: str):
+        """Deja de emitir los registros de un dron (ej., retirado en caliente)."""
+        self._excluded.add(drone_id)
+    
+    def seek(self, timestamp: float):
+        """
+        Salta al primer registro con timestamp >= timestamp.
+        
+        Args:
+            timestamp: Timestamp grabado de destino
+        """
+        self._position = int(np.searchsorted(self._timestamps, timestamp, side="left"))
+        self._rebase()
+        self._wakeup.set()
+    
+    def set_speed(self, speed: float):
+        """Cambia el multiplicador de velocidad sin saltos en la reproducción."""
+        self.speed = speed
+        self._rebase()
+        self._wakeup.set()
+    
+    async def start(self):
+        """Reproduce la grabación hasta terminar (o indefinidamente con loop)."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if not len(self):
+            logger.warning(f"Grabación vacía: {self.path}")
+            return
+        
+        self.running = True
+        self._rebase()
+        logger.info(
+            f"Reproduciendo {len(self)} registros de {self.path} "
+            f"(velocidad {self.speed if self.speed > 0 else 'máxima'}, bucle={self.loop})"
+        )
+        
+        try:
+            while self.running:
+                if self._position >= len(self):
+                    if not self.loop:
+                        break
+                    self._position = 0
+                    self.loop_count += 1
+                    self._rebase()
+                
+                delay = self._emit_due()
+                if delay is None:
+                    await asyncio.sleep(0)  # Ceder el loop entre lotes
+                elif delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.running = False
+            logger.info(f"Reproducción terminada: {self.emitted_count} registros emitidos")
+    
+    async def stop(self):
+        """Detiene la reproducción (la grabación sigue abierta hasta close())."""
+        self.running = False
+        self._wakeup.set()
+    
+    def close(self):
+        """Libera el mapeo de la grabación."""
+        self._records = None
+        self._timestamps = None
+        self._reader.close()
+    
+    def _emit_due(self) -> Optional[float]:
+        """
+        Emite los registros cuyo momento de reproducción ya llegó.
+        
+        Returns:
+            Segundos hasta el próximo registro, o None si se cortó el lote
+            por batch_size (hay que ceder el loop y continuar)
+        """
+        records = self._records
+        timestamps = self._timestamps
+        total = len(records)
+        position = self._position
+        
+        if self.speed > 0:
+            # Último timestamp grabado que ya debería haberse emitido
+            due = self._record_base + (time.monotonic() - self._wall_base) * self.speed
+            end = int(np.searchsorted(timestamps, due, side="right"))
+        else:
+            end = total
+        limit = min(end, position + self.batch_size)
+        
+        now = time.time()
+        callback = self.callback
+        excluded = self._excluded
+        skipped = 0
+        for row in records[position:limit]:
+            telemetry = to_telemetry(row)
+            if excluded and telemetry.drone_id in excluded:
+                skipped += 1
+                continue
+            if self.live_timestamps:
+                telemetry.timestamp = now
+            if callback:
+                callback(telemetry)
+        self.emitted_count += limit - position - skipped
+        self.skipped_count += skipped
+        self._position = limit
+        
+        if limit < end or self.speed <= 0:
+            return None
+        if limit >= total:
+            return 0.0
+        return (float(timestamps[limit]) - self._record_base) / self.speed - (time.monotonic() - self._wall_base)
+    
+    def _rebase(self):
+        """Hace coincidir el reloj de pared actual con el registro en curso."""
+        self._wall_base = time.monotonic()
+        self._record_base = self.current_time or 0.0
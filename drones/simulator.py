@@ -3,8 +3,8 @@ Simulador de dron basado en MAVSDK.
 Se conecta a instancias MAVSDK para obtener datos de telemetría reales.
 """
 import asyncio
-import time
-from typing import Dict, Any, Callable, Optional
+import math
+from typing import Callable, Optional, Iterable
 
 try:
     from mavsdk import System
@@ -13,21 +13,56 @@ try:
 except ImportError:
     MAVSDK_AVAILABLE = False
 
-from common.utils import normalize_telemetry
 from common.constants import DroneStatus
+from backend.schemas import TelemetrySchema
+from drones.telemetry_fusion import TelemetryFusion
+from drones.rate_policy import AdaptiveRatePolicy
+
+
+def _battery_scale() -> float:
+    """
+    Factor que lleva remaining_percent a 0-100 según la versión de MAVSDK.
+    
+    MAVSDK < 2.0 reporta una fracción 0-1; las versiones posteriores ya
+    reportan 0-100. Se decide una sola vez: reescalar por muestra confundiría
+    un 1 % real con el 100 %.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        major = int(version("mavsdk").split(".")[0])
+    except (PackageNotFoundError, ValueError):
+        return 1.0
+    return 100.0 if major < 2 else 1.0
+
+
+BATTERY_SCALE = _battery_scale() if MAVSDK_AVAILABLE else 1.0
+
+
+# Mapeo de modos de vuelo MAVSDK a estados del sistema
+FLIGHT_MODE_STATUS = {
+    "READY": DroneStatus.IDLE.value,
+    "TAKEOFF": DroneStatus.TAKEOFF.value,
+    "LAND": DroneStatus.LANDING.value,
+    "UNKNOWN": DroneStatus.IDLE.value,
+}
 
 
 class MAVSDKSimulator:
     """
     Simulador de dron basado en MAVSDK.
     Se conecta a una instancia de Sistema MAVSDK y transmite telemetría.
+    Los flujos de posición, velocidad, batería y modo de vuelo escriben en un
+    estado fusionado (TelemetryFusion) y el emisor se despierta por eventos.
     """
     
     def __init__(
         self,
         drone_id: str,
         connection_string: str = "udp://:14540",
-        callback: Optional[Callable[[Dict[str, Any]], None]] = None
+        callback: Optional[Callable[[TelemetrySchema], None]] = None,
+        emit_fields: Optional[Iterable[str]] = None,
+        grpc_port: Optional[int] = None,
+        rate_policy: Optional[AdaptiveRatePolicy] = None
     ):
         """
         Inicializa el simulador MAVSDK.
@@ -36,6 +71,12 @@ class MAVSDKSimulator:
             drone_id: Identificador único para este dron
             connection_string: Cadena de conexión MAVSDK (ej., "udp://:14540")
             callback: Función a llamar con actualizaciones de telemetría
+            emit_fields: Grupos de telemetría que disparan una emisión inmediata
+                al estar todos frescos (ver TelemetryFusion)
+            grpc_port: Puerto del mavsdk_server embebido (debe ser distinto por
+                vehículo cuando se conectan varios en paralelo)
+            rate_policy: Política de tasa adaptativa aplicada a los registros
+                fusionados (None = publicar cada emisión)
         """
         if not MAVSDK_AVAILABLE:
             raise ImportError(
@@ -46,9 +87,35 @@ class MAVSDKSimulator:
         self.drone_id = drone_id
         self.connection_string = connection_string
         self.callback = callback
-        self.drone = System()
+        self.emit_fields = emit_fields
+        self.grpc_port = grpc_port
+        self.rate_policy = rate_policy
+        self.drone = self._create_system()
+        self.connected = False
         self.running = False
+        self.fusion: Optional[TelemetryFusion] = None
+        # Altitud del terreno (AMSL) bajo el vehículo, para convertir altitudes relativas
+        self.ground_altitude: Optional[float] = None
         
+    def _create_system(self) -> "System":
+        """Crea la instancia de System (con su propio mavsdk_server si se indicó puerto)."""
+        if self.grpc_port is not None:
+            return System(port=self.grpc_port)
+        return System()
+    
+    def reset(self):
+        """Descarta la conexión actual para reintentar con un System nuevo."""
+        self.connected = False
+        self.running = False
+        # Liberar el mavsdk_server embebido anterior antes de reutilizar su puerto
+        stop_server = getattr(self.drone, "_stop_mavsdk_server", None)
+        if stop_server:
+            try:
+                stop_server()
+            except Exception:
+                pass
+        self.drone = self._create_system()
+    
     async def connect(self):
         """Conecta al sistema del dron."""
         await self.drone.connect(self.connection_string)
@@ -57,6 +124,7 @@ class MAVSDKSimulator:
         async for state in self.drone.core.connection_state():
             if state.is_connected:
                 print(f"[{self.drone_id}] Conectado al dron")
+                self.connected = True
                 break
     
     async def start(self, update_interval: float = 0.5):
@@ -64,55 +132,103 @@ class MAVSDKSimulator:
         Inicia la transmisión de telemetría.
         
         Args:
-            update_interval: Segundos mínimos entre actualizaciones
+            update_interval: Segundos mínimos entre actualizaciones parciales
+                (limitador de tasa de la fusión)
         """
-        if not self.drone:
+        if not self.connected:
             await self.connect()
         
         self.running = True
+        max_rate_hz = 1.0 / update_interval if update_interval > 0 else 0.0
+        self.fusion = TelemetryFusion(self.drone_id, self.emit_fields, max_rate_hz)
+        await self._configure_stream_rates(max_rate_hz)
         
         # Suscribirse a flujos de telemetría
-        position_task = asyncio.create_task(self._stream_position())
-        velocity_task = asyncio.create_task(self._stream_velocity())
-        battery_task = asyncio.create_task(self._stream_battery())
-        flight_mode_task = asyncio.create_task(self._stream_flight_mode())
-        
-        # Combinar y enviar actualizaciones
-        last_update = time.time()
-        telemetry_cache = {}
+        stream_tasks = [
+            asyncio.create_task(self._watch_connection()),
+            asyncio.create_task(self._stream_position()),
+            asyncio.create_task(self._stream_velocity()),
+            asyncio.create_task(self._stream_battery()),
+            asyncio.create_task(self._stream_flight_mode()),
+        ]
         
-        while self.running:
-            current_time = time.time()
-            
-            if current_time - last_update >= update_interval and telemetry_cache:
-                telemetry = self._generate_telemetry(telemetry_cache)
-                if self.callback:
-                    self.callback(telemetry)
-                last_update = current_time
-                telemetry_cache.clear()
-            
-            await asyncio.sleep(0.1)
-        
-        # Cancelar tareas
-        position_task.cancel()
-        velocity_task.cancel()
-        battery_task.cancel()
-        flight_mode_task.cancel()
+        # Emitir en cuanto la fusión lo permita (sin sondeo periódico)
+        try:
+            while self.running:
+                await self.fusion.wait()
+                if self.running and self.fusion.should_emit():
+                    telemetry = self.fusion.emit()
+                    if self.rate_policy and not self.rate_policy.should_emit(telemetry):
+                        continue
+                    if self.callback:
+                        self.callback(telemetry)
+        finally:
+            # Cancelar tareas
+            for task in stream_tasks:
+                task.cancel()
     
     async def stop(self):
         """Detiene la transmisión de telemetría."""
         self.running = False
-        if self.drone:
+        if self.fusion:
+            # Despertar al emisor para que salga del loop
+            self.fusion.wake()
+        if self.drone and hasattr(self.drone, "close"):
             await self.drone.close()
     
+    async def set_target(self, lat: float, lon: float, altitude: float = 20.0):
+        """
+        Envía el vehículo a un waypoint y espera el acuse del autopiloto.
+        
+        Args:
+            lat: Latitud objetivo
+            lon: Longitud objetivo
+            altitude: Altitud objetivo relativa al terreno (metros)
+        """
+        if not self.connected or self.ground_altitude is None:
+            raise RuntimeError(f"{self.drone_id} sin conexión o sin posición todavía")
+        # Rumbo NaN: el autopiloto mantiene el actual
+        await self.drone.action.goto_location(lat, lon, self.ground_altitude + altitude, float("nan"))
+    
+    async def _configure_stream_rates(self, rate_hz: float):
+        """Ajusta la tasa de los flujos en el vehículo (si el firmware lo permite)."""
+        if rate_hz <= 0:
+            return
+        for set_rate in (
+            self.drone.telemetry.set_rate_position,
+            self.drone.telemetry.set_rate_velocity_ned,
+            self.drone.telemetry.set_rate_battery,
+        ):
+            try:
+                await set_rate(rate_hz)
+            except Exception:
+                pass  # No todos los autopilotos aceptan cambiar la tasa
+    
+    async def _watch_connection(self):
+        """Detiene la emisión cuando el vehículo se desconecta (para reconectar)."""
+        try:
+            async for state in self.drone.core.connection_state():
+                if not state.is_connected:
+                    self.connected = False
+                    self.running = False
+                    self.fusion.wake()
+                    break
+        except asyncio.CancelledError:
+            pass
+    
     async def _stream_position(self):
         """Transmite telemetría de posición."""
         try:
             async for position in self.drone.telemetry.position():
                 if not self.running:
                     break
-                # Almacenar en caché para combinación
-                pass  # La posición se combinará en el loop principal
+                self.ground_altitude = position.absolute_altitude_m - position.relative_altitude_m
+                self.fusion.update(
+                    "position",
+                    latitude=position.latitude_deg,
+                    longitude=position.longitude_deg,
+                    altitude=position.relative_altitude_m,
+                )
         except asyncio.CancelledError:
             pass
     
@@ -122,8 +238,17 @@ class MAVSDKSimulator:
             async for velocity_ned in self.drone.telemetry.velocity_ned():
                 if not self.running:
                     break
-                # Almacenar en caché
-                pass
+                north = velocity_ned.north_m_s
+                east = velocity_ned.east_m_s
+                ground_speed = math.hypot(north, east)
+                values = {
+                    "velocity": ground_speed,
+                    "vertical_speed": -velocity_ned.down_m_s,  # NED: abajo es positivo
+                }
+                # El rumbo solo es fiable cuando el vehículo se desplaza
+                if ground_speed > 0.5:
+                    values["heading"] = math.degrees(math.atan2(east, north)) % 360.0
+                self.fusion.update("velocity", **values)
         except asyncio.CancelledError:
             pass
     
@@ -133,8 +258,7 @@ class MAVSDKSimulator:
             async for battery in self.drone.telemetry.battery():
                 if not self.running:
                     break
-                # Almacenar en caché
-                pass
+                self.fusion.update("battery", battery=battery.remaining_percent * BATTERY_SCALE)
         except asyncio.CancelledError:
             pass
     
@@ -144,23 +268,8 @@ class MAVSDKSimulator:
             async for flight_mode in self.drone.telemetry.flight_mode():
                 if not self.running:
                     break
-                # Almacenar en caché
-                pass
+                mode_name = getattr(flight_mode, "name", str(flight_mode))
+                status = FLIGHT_MODE_STATUS.get(mode_name, DroneStatus.FLYING.value)
+                self.fusion.update("flight_mode", status=status)
         except asyncio.CancelledError:
             pass
-    
-    def _generate_telemetry(self, cache: Dict[str, Any]) -> Dict[str, Any]:
-        """Genera telemetría normalizada desde datos MAVSDK."""
-        # Esta es una versión simplificada - en implementación real,
-        # combinarías posición, velocidad, batería y modo de vuelo desde el caché
-        return normalize_telemetry({
-            "drone_id": self.drone_id,
-            "latitude": cache.get("latitude", 0.0),
-            "longitude": cache.get("longitude", 0.0),
-            "altitude": cache.get("altitude", 0.0),
-            "heading": cache.get("heading", 0.0),
-            "velocity": cache.get("velocity", 0.0),
-            "battery": cache.get("battery", 100.0),
-            "status": cache.get("status", DroneStatus.IDLE.value),
-            "timestamp": time.time(),
-        })
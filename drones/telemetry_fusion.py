@@ -0,0 +1,156 @@
+"""
+Fusión de flujos de telemetría por vehículo.
+Combina muestras de posición, velocidad, batería y modo de vuelo que llegan
+de forma independiente en un único estado, y decide cuándo emitir un registro.
+"""
+import asyncio
+import time
+from typing import Dict, Any, Optional, Iterable, Set
+from common.constants import DroneStatus
+from backend.schemas import TelemetrySchema
+
+
+# Grupos de campos que actualiza cada flujo
+FIELD_GROUPS = {
+    "position": ("latitude", "longitude", "altitude"),
+    "velocity": ("velocity", "vertical_speed", "heading"),
+    "battery": ("battery",),
+    "flight_mode": ("status",),
+}
+
+# Grupos sin valor por defecto razonable: no se emite hasta recibirlos
+REQUIRED_GROUPS = frozenset({"position", "battery"})
+
+
+class TelemetryFusion:
+    """
+    Estado fusionado de un vehículo con emisión dirigida por eventos.
+    
+    Cada flujo escribe su grupo de campos con update(). Se emite un registro:
+    - en cuanto todos los grupos de emit_fields están frescos (actualizados
+      desde la última emisión), o
+    - cuando hay algún grupo fresco y el limitador de tasa lo permite
+      (ha pasado al menos 1 / max_rate_hz desde la última emisión).
+    
+    Nunca se emite antes de haber recibido al menos una vez los grupos de
+    REQUIRED_GROUPS: una posición o batería inventadas llegarían al mapa y
+    al grabador como datos reales.
+    
+    wait() bloquea sin sondeo hasta que llega una actualización o vence el
+    plazo del limitador.
+    """
+    
+    def __init__(
+        self,
+        drone_id: str,
+        emit_fields: Optional[Iterable[str]] = None,
+        max_rate_hz: float = 2.0
+    ):
+        """
+        Inicializa el estado fusionado.
+        
+        Args:
+            drone_id: Identificador del vehículo
+            emit_fields: Grupos que disparan una emisión inmediata al estar
+                todos frescos (por defecto solo "position")
+            max_rate_hz: Tasa máxima para emitir actualizaciones parciales
+        """
+        emit_fields = set(emit_fields) if emit_fields else {"position"}
+        unknown = emit_fields - set(FIELD_GROUPS)
+        if unknown:
+            raise ValueError(f"Grupos de telemetría desconocidos: {sorted(unknown)}")
+        
+        self.drone_id = drone_id
+        self.emit_fields: Set[str] = emit_fields
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+        
+        self.values: Dict[str, Any] = {}
+        self.fresh: Set[str] = set()
+        self.received: Set[str] = set()
+        self.last_emit = 0.0
+        self.emitted_count = 0
+        self._event = asyncio.Event()
+    
+    def update(self, group: str, **values):
+        """
+        Escribe los valores de un grupo y despierta al emisor.
+        
+        Args:
+            group: Nombre del grupo (position, velocity, battery, flight_mode)
+            **values: Campos del grupo
+        """
+        self.values.update(values)
+        self.fresh.add(group)
+        self.received.add(group)
+        self._event.set()
+    
+    def wake(self):
+        """Despierta al emisor sin marcar datos frescos (ej., al detenerse)."""
+        self._event.set()
+    
+    @property
+    def ready(self) -> bool:
+        """Indica si ya se recibieron todos los grupos obligatorios."""
+        return REQUIRED_GROUPS <= self.received
+    
+    def should_emit(self, now: Optional[float] = None) -> bool:
+        """Indica si corresponde emitir un registro ahora."""
+        if not self.fresh or not self.ready:
+            return False
+        if self.emit_fields <= self.fresh:
+            return True
+        now = time.monotonic() if now is None else now
+        return now - self.last_emit >= self.min_interval
+    
+    def time_until_allowed(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Segundos hasta que el limitador permita emitir los datos frescos.
+        
+        Returns:
+            None si no hay datos frescos o faltan grupos obligatorios
+            (esperar sin plazo)
+        """
+        if not self.fresh or not self.ready:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.last_emit + self.min_interval - now)
+    
+    async def wait(self):
+        """Espera una actualización o el vencimiento del limitador de tasa."""
+        timeout = self.time_until_allowed()
+        self._event.clear()
+        if timeout is None:
+            await self._event.wait()
+        elif timeout > 0:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    
+    def emit(self, now: Optional[float] = None) -> TelemetrySchema:
+        """Construye el registro fusionado y marca los grupos como consumidos."""
+        self.last_emit = time.monotonic() if now is None else now
+        self.fresh.clear()
+        self.emitted_count += 1
+        return self.snapshot()
+    
+    def snapshot(self) -> TelemetrySchema:
+        """
+        Construye el registro con el último valor conocido de cada campo.
+        
+        Raises:
+            KeyError: Si aún no se recibieron los grupos obligatorios
+        """
+        values = self.values
+        return TelemetrySchema(
+            drone_id=self.drone_id,
+            latitude=values["latitude"],
+            longitude=values["longitude"],
+            altitude=values["altitude"],
+            heading=values.get("heading", 0.0),
+            velocity=values.get("velocity", 0.0),
+            battery=values["battery"],
+            status=values.get("status", DroneStatus.IDLE.value),
+            timestamp=time.time(),
+            vertical_speed=values.get("vertical_speed"),
+        )
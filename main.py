@@ -4,11 +4,16 @@ Punto de entrada principal para el sistema de coordinación multi-dron.
 import asyncio
 import flet as ft
 import logging
+import threading
 from common.config import Config
 from backend.storage import POIStorage
 from drones.drone_manager import DroneManager
 from ui.main import MainApp
-from common.constants import CHANNEL_TELEMETRY
+from common.constants import CHANNEL_TELEMETRY, QueuePolicy
+from common.telemetry_buffer import BoundedTelemetryQueue
+from common.deadband import TelemetryDeadbandFilter
+from common.runtime import AsyncRuntime
+from backend.flight_recorder import FlightRecorder
 from common.colors import RED
 
 # Configurar logging
@@ -37,14 +42,42 @@ async def main(page: ft.Page):
         storage = POIStorage(config.poi_storage_file)
         logger.info("Almacenamiento de POIs inicializado")
         
+        # Runtime único: drones, servidor de datos y eventos del mapa en un mismo loop de fondo
+        runtime = AsyncRuntime(name="drone-runtime")
+        runtime.start()
+        
         # Inicializar UI primero (sin drone_manager todavía)
-        app = MainApp(config, storage, drone_manager=None)
+        app = MainApp(config, storage, drone_manager=None, runtime=runtime)
         app.setup_page(page)
         logger.info("UI inicializada")
         
+        # Cola acotada entre los drones (productores) y la UI (consumidor).
+        # Con "block" el consumidor corre en un hilo propio: los drones esperan en
+        # put() mientras él libera espacio, en vez de congelar su propio loop
+        queue_policy = QueuePolicy(config.telemetry_queue_policy)
+        consumer_thread = queue_policy == QueuePolicy.BLOCK
+        telemetry_queue = BoundedTelemetryQueue(
+            maxsize=config.telemetry_queue_size,
+            policy=queue_policy,
+            block_timeout=config.telemetry_queue_block_timeout,
+            shared_loop=not consumer_thread
+        )
+        
+        # Banda muerta: las muestras sin cambios significativos no llegan a la UI ni al almacén
+        deadband = None
+        if config.telemetry_deadband_enabled:
+            deadband = TelemetryDeadbandFilter(
+                position_m=config.deadband_position_m,
+                altitude_m=config.deadband_altitude_m,
+                battery_pct=config.deadband_battery_pct,
+                heading_deg=config.deadband_heading_deg,
+                velocity_ms=config.deadband_velocity_ms,
+                heartbeat_interval=config.deadband_heartbeat_interval
+            )
+        
         # Crear callback de telemetría que usa app (ahora ya existe)
         def on_telemetry_update(telemetry):
-            """Maneja actualizaciones de telemetría de los drones."""
+            """Recibe telemetría de los drones y la encola según la política configurada."""
             try:
                 # Log solo ocasionalmente para no saturar
                 if hasattr(on_telemetry_update, '_log_count'):
@@ -53,8 +86,17 @@ async def main(page: ft.Page):
                     on_telemetry_update._log_count = 1
                 
                 if on_telemetry_update._log_count % 20 == 0:  # Log cada 20 actualizaciones
-                    logger.info(f"Telemetría recibida: {telemetry.get('drone_id', 'UNKNOWN')} (total: {on_telemetry_update._log_count})")
+                    logger.info(f"Telemetría recibida: {telemetry.drone_id} (total: {on_telemetry_update._log_count})")
                 
+                if deadband and not deadband.accept(telemetry):
+                    return
+                telemetry_queue.put(telemetry)
+            except Exception as e:
+                logger.error(f"Error al encolar telemetría: {e}", exc_info=True)
+        
+        def publish_telemetry(telemetry):
+            """Aplica una muestra drenada de la cola a la UI y la transmite."""
+            try:
                 # Actualizar UI directamente (Flet maneja el threading)
                 app.update_telemetry(telemetry)
                 
@@ -66,7 +108,7 @@ async def main(page: ft.Page):
                             topic=CHANNEL_TELEMETRY,
                             message={
                                 "action": "telemetry_update",
-                                "telemetry": telemetry,
+                                "telemetry": telemetry.to_dict(),
                             }
                         )
                     else:
@@ -74,7 +116,7 @@ async def main(page: ft.Page):
                         page.pubsub.send_all(
                             message={
                                 "action": "telemetry_update",
-                                "telemetry": telemetry,
+                                "telemetry": telemetry.to_dict(),
                             }
                         )
                 except Exception as e:
@@ -83,6 +125,48 @@ async def main(page: ft.Page):
             except Exception as e:
                 logger.error(f"Error al actualizar telemetría: {e}", exc_info=True)
         
+        drain_count = 0
+        
+        def drain_telemetry():
+            """Publica las muestras pendientes y registra estadísticas periódicamente."""
+            nonlocal drain_count
+            for telemetry in telemetry_queue.drain():
+                publish_telemetry(telemetry)
+            
+            drain_count += 1
+            if drain_count % 100 == 0:
+                logger.info(f"Cola de telemetría: {telemetry_queue.get_stats()}")
+                if deadband:
+                    logger.info(f"Banda muerta de telemetría: {deadband.get_stats()}")
+                logger.info(f"Runtime: {runtime.get_stats()}")
+                if app.dispatcher:
+                    logger.info(f"Despachador de UI: {app.dispatcher.get_stats()}")
+                logger.info(f"Obsolescencia de drones: {drone_manager.staleness.get_stats()}")
+        
+        async def consume_telemetry():
+            """Drena la cola de telemetría al ritmo de la UI."""
+            while True:
+                try:
+                    drain_telemetry()
+                    await asyncio.sleep(config.ui_refresh_interval)
+                except asyncio.CancelledError:
+                    logger.info("Consumidor de telemetría cancelado")
+                    break
+                except Exception as e:
+                    logger.error(f"Error en consumidor de telemetría: {e}", exc_info=True)
+                    await asyncio.sleep(config.ui_refresh_interval)
+        
+        consumer_stop = threading.Event()
+        
+        def consume_telemetry_thread():
+            """Drena la cola de telemetría en un hilo propio (política "block")."""
+            while not consumer_stop.wait(config.ui_refresh_interval):
+                try:
+                    drain_telemetry()
+                except Exception as e:
+                    logger.error(f"Error en consumidor de telemetría: {e}", exc_info=True)
+            logger.info("Consumidor de telemetría detenido")
+        
         # Inicializar gestor de drones con el callback
         drone_manager = DroneManager(config, on_telemetry_update)
         logger.info("Gestor de drones inicializado")
@@ -90,6 +174,26 @@ async def main(page: ft.Page):
         # Asignar drone_manager a app después de crearlo
         app.drone_manager = drone_manager
         
+        def on_drone_removed(drone_id):
+            """Limpia las cachés por dron de un dron retirado (en el runtime)."""
+            if deadband:
+                deadband.forget(drone_id)
+            telemetry_queue.discard(drone_id)
+            app.remove_drone(drone_id)
+        
+        drone_manager.add_drone_removed_listener(on_drone_removed)
+        drone_manager.add_drone_stale_listener(app.set_drone_stale)
+        
+        # Grabador de vuelo: escucha el flujo de telemetría y escribe en un hilo propio
+        flight_recorder = None
+        if config.flight_recorder_enabled:
+            flight_recorder = FlightRecorder(
+                directory=config.flight_recorder_dir,
+                segment_max_records=config.flight_recorder_segment_records
+            )
+            flight_recorder.start()
+            drone_manager.add_telemetry_listener(flight_recorder.record)
+        
         # Iniciar simulación de drones en segundo plano
         async def run_drones():
             try:
@@ -114,18 +218,37 @@ async def main(page: ft.Page):
             finally:
                 logger.info("Deteniendo drones...")
                 await drone_manager.stop()
+                if flight_recorder:
+                    flight_recorder.stop()
+                    logger.info(f"Grabador de vuelo detenido: {flight_recorder.get_stats()}")
         
-        # Iniciar tarea del gestor de drones
-        # Usar el loop de eventos actual (que debería ser el de Flet)
-        loop = asyncio.get_event_loop()
-        logger.info(f"Loop de eventos: {loop}")
-        drone_task = loop.create_task(run_drones())
-        logger.info(f"Tarea de drones creada: {drone_task}")
+        # Drones y consumidor de telemetría en el runtime (no en el loop de Flet)
+        drone_future = runtime.submit(run_drones())
+        if consumer_thread:
+            consumer_future = None
+            threading.Thread(
+                target=consume_telemetry_thread, name="telemetry-consumer", daemon=True
+            ).start()
+            logger.info("Drones enviados al runtime; consumidor de telemetría en hilo propio")
+        else:
+            consumer_future = runtime.submit(consume_telemetry())
+            logger.info("Drones y consumidor de telemetría enviados al runtime")
         
-        # Nota: Flet maneja funciones async automáticamente
-        # La tarea de drones se ejecutará en segundo plano
-        # Cuando se cierre la página, Flet limpiará
+        def on_close(e):
+            """Detiene el runtime (y con él los drones) al cerrar la sesión."""
+            logger.info(f"Cerrando sesión; runtime: {runtime.get_stats()}")
+            drone_future.cancel()
+            if consumer_future:
+                consumer_future.cancel()
+            consumer_stop.set()
+            if app.map_view:
+                app.map_view.telemetry_server.stop()
+            runtime.stop()
+            if app.dispatcher:
+                app.dispatcher.stop()
         
+        page.on_close = on_close
+    
     except Exception as e:
         logger.error(f"Error al inicializar aplicación: {e}", exc_info=True)
         # Mostrar error en la UI
@@ -175,4 +298,3 @@ def run_web():
 if __name__ == "__main__":
     run_app()
 
-  
\ No newline at end of file
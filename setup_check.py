@@ -65,6 +65,7 @@ def check_dependencies():
     required_packages = {
         'flet': 'flet[all]>=0.21.0',
         'folium': 'folium>=0.15.0',
+        'numpy': 'numpy>=1.24.0',
     }
     
     optional_packages = {
@@ -0,0 +1,49 @@
+"""
+Pruebas de la corrección suave de la estima por navegación.
+"""
+import pytest
+
+from backend.fleet_state import FleetStateStore
+from backend.schemas import TelemetrySchema
+from common.constants import DroneStatus
+from common.dead_reckoning import DeadReckoningTracker
+
+
+def _sample(drone_id: str, latitude: float, timestamp: float) -> TelemetrySchema:
+    return TelemetrySchema(drone_id, latitude, -89.0, 10.0, 0.0, 0.0, 80.0, DroneStatus.FLYING.value, timestamp)
+
+
+def test_muestra_nueva_no_salta_y_la_correccion_se_agota():
+    """Al llegar una muestra el dron sigue donde estaba y converge a ella en correction_time."""
+    store = FleetStateStore(capacity=4)
+    tracker = DeadReckoningTracker(correction_time=1.0)
+    store.update(_sample("DRONE_001", 20.0, 100.0))
+    store.update(_sample("DRONE_002", 21.0, 100.0))
+    assert tracker.predict(store, now=100.0)["DRONE_001"]["latitude"] == pytest.approx(20.0)
+
+    store.update(_sample("DRONE_001", 20.001, 100.5))
+    shown = tracker.predict(store, now=100.5)
+    assert shown["DRONE_001"]["latitude"] == pytest.approx(20.0)
+    assert shown["DRONE_002"]["latitude"] == pytest.approx(21.0)
+
+    assert tracker.predict(store, now=101.0)["DRONE_001"]["latitude"] == pytest.approx(20.0005)
+    assert tracker.predict(store, now=101.5)["DRONE_001"]["latitude"] == pytest.approx(20.001)
+
+
+def test_altas_y_bajas_realinean_el_estado():
+    """Un dron nuevo parte sin desplazamiento y una baja no arrastra su corrección a otro."""
+    store = FleetStateStore(capacity=4)
+    tracker = DeadReckoningTracker(correction_time=1.0)
+    store.update(_sample("DRONE_001", 20.0, 100.0))
+    tracker.predict(store, now=100.0)
+    store.update(_sample("DRONE_001", 20.001, 100.2))
+    tracker.predict(store, now=100.2)
+
+    store.remove("DRONE_001")
+    store.update(_sample("DRONE_002", 21.0, 100.3))
+    shown = tracker.predict(store, now=100.3)
+    assert list(shown) == ["DRONE_002"]
+    assert shown["DRONE_002"]["latitude"] == pytest.approx(21.0)
+    assert tracker.predict(store, now=100.4) == {
+        "DRONE_002": pytest.approx({"latitude": 21.0, "longitude": -89.0, "altitude": 10.0, "age": 0.1})
+    }
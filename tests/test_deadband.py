@@ -0,0 +1,45 @@
+"""
+Pruebas de los umbrales compartidos por la banda muerta y la política de tasa.
+"""
+import time
+
+from backend.schemas import TelemetrySchema
+from common.constants import DroneStatus
+from common.deadband import TelemetryDeadbandFilter
+from drones.rate_policy import AdaptiveRatePolicy
+
+
+def _sample(altitude: float = 10.0, heading: float = 0.0, velocity: float = 0.0) -> TelemetrySchema:
+    return TelemetrySchema(
+        "DRONE_001", 20.97, -89.59, altitude, heading, velocity, 80.0,
+        DroneStatus.FLYING.value, time.time(), vertical_speed=0.0
+    )
+
+
+def test_banda_muerta_umbral_inclusivo():
+    """Un cambio igual al umbral sale de la banda muerta."""
+    deadband = TelemetryDeadbandFilter(altitude_m=0.5, heartbeat_interval=60.0)
+    assert deadband.accept(_sample(altitude=10.0), now=0.0)
+    assert not deadband.accept(_sample(altitude=10.25), now=1.0)
+    assert deadband.accept(_sample(altitude=10.5), now=2.0)
+
+
+def test_banda_muerta_umbral_cero():
+    """Con umbral 0 cualquier cambio se propaga, pero una muestra idéntica no."""
+    deadband = TelemetryDeadbandFilter(
+        position_m=0.0, altitude_m=0.0, battery_pct=0.0, heading_deg=0.0, velocity_ms=0.0,
+        heartbeat_interval=60.0
+    )
+    assert deadband.accept(_sample(), now=0.0)
+    assert not deadband.accept(_sample(), now=1.0)
+    assert deadband.accept(_sample(heading=0.1), now=2.0)
+
+
+def test_politica_de_tasa_maniobra_inclusiva():
+    """Un cambio de rumbo igual a heading_delta cuenta como maniobra."""
+    policy = AdaptiveRatePolicy(active_interval=0.5, hover_interval=2.0, heading_delta=10.0)
+    assert policy.should_emit(_sample(heading=0.0), now=0.0)
+    # En vuelo estacionario: 1 s no alcanza hover_interval
+    assert not policy.should_emit(_sample(heading=5.0), now=1.0)
+    # Un giro de exactamente heading_delta usa el intervalo activo
+    assert policy.should_emit(_sample(heading=10.0), now=1.0)
@@ -0,0 +1,40 @@
+"""
+Pruebas del orden de la flota en el almacén columnar.
+"""
+from backend.fleet_state import FleetStateStore
+from backend.schemas import TelemetrySchema
+from common.constants import DroneStatus
+
+
+def _store(*rows) -> FleetStateStore:
+    store = FleetStateStore(capacity=2)
+    for drone_id, battery, status in rows:
+        store.update(TelemetrySchema(drone_id, 20.0, -89.0, 10.0, 0.0, 0.0, battery, status, 0.0))
+    return store
+
+
+def test_orden_por_id_y_desempates():
+    """Los empates de la clave se ordenan por ID; descending invierte todo."""
+    store = _store(
+        ("DRONE_003", 50.0, DroneStatus.FLYING.value),
+        ("DRONE_001", 80.0, DroneStatus.IDLE.value),
+        ("DRONE_002", 50.0, DroneStatus.IDLE.value),
+    )
+    assert store.ordered_ids() == ["DRONE_001", "DRONE_002", "DRONE_003"]
+    assert store.ordered_ids(sort_by="battery") == ["DRONE_002", "DRONE_003", "DRONE_001"]
+    assert store.ordered_ids(sort_by="status") == ["DRONE_001", "DRONE_002", "DRONE_003"]
+    assert store.ordered_ids(sort_by="battery", descending=True) == ["DRONE_001", "DRONE_003", "DRONE_002"]
+
+
+def test_orden_tras_cambiar_el_conjunto_de_ids():
+    """Altas y bajas invalidan el orden por ID en caché; el filtro por texto lo respeta."""
+    store = _store(
+        ("DRONE_002", 50.0, DroneStatus.FLYING.value),
+        ("DRONE_001", 80.0, DroneStatus.IDLE.value),
+    )
+    assert store.ordered_ids() == ["DRONE_001", "DRONE_002"]
+    
+    store.remove("DRONE_002")
+    store.update(TelemetrySchema("alpha", 20.0, -89.0, 10.0, 0.0, 0.0, 60.0, DroneStatus.IDLE.value, 0.0))
+    assert store.ordered_ids() == ["DRONE_001", "alpha"]
+    assert store.ordered_ids(id_contains="ALP") == ["alpha"]
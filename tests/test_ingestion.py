@@ -0,0 +1,104 @@
+"""
+Pruebas de la decodificación y validación de la ingesta externa.
+"""
+import json
+
+import pytest
+
+from backend.flight_recorder import RECORD, pack_record
+from backend.ingestion import decode_json_lines, decode_packed
+from backend.schemas import TelemetrySchema
+from common.constants import DroneStatus
+
+
+VALID = {
+    "drone_id": "GCS_001",
+    "latitude": 20.97,
+    "longitude": -89.59,
+    "altitude": 30.0,
+    "heading": 90.0,
+    "velocity": 5.0,
+    "battery": 80.0,
+    "status": DroneStatus.FLYING.value,
+    "timestamp": 1700000000.0,
+}
+
+
+def _decode(*items) -> tuple:
+    data = b"\n".join(
+        item if isinstance(item, bytes) else json.dumps(item).encode() for item in items
+    )
+    records = []
+    rejected = decode_json_lines(data, records)
+    return records, rejected
+
+
+def test_json_valido_se_acepta():
+    """Un objeto completo y bien tipado produce un registro."""
+    records, rejected = _decode(VALID)
+    assert rejected == 0
+    assert len(records) == 1
+    assert records[0].drone_id == "GCS_001"
+
+
+@pytest.mark.parametrize("changes", [
+    {"drone_id": 5},
+    {"drone_id": None},
+    {"drone_id": ""},
+    {"status": "bogus"},
+    {"status": [1]},
+    {"latitude": "NaN"},
+    {"latitude": "20.97"},
+    {"longitude": float("nan")},
+    {"battery": float("inf")},
+    {"altitude": True},
+    {"timestamp": None},
+    {"vertical_speed": "rápido"},
+])
+def test_json_invalido_se_rechaza(changes):
+    """Tipos o valores que romperían el estado de la flota se cuentan y descartan."""
+    records, rejected = _decode(dict(VALID, **changes), VALID)
+    assert rejected == 1
+    assert [t.drone_id for t in records] == ["GCS_001"]
+
+
+def test_json_campos_faltantes_y_basura():
+    """Objetos incompletos, no objetos y JSON roto se rechazan."""
+    incomplete = {k: v for k, v in VALID.items() if k != "battery"}
+    records, rejected = _decode(incomplete, [VALID], b"{roto", VALID)
+    assert rejected == 3
+    assert len(records) == 1
+
+
+def _packed(t: TelemetrySchema) -> bytearray:
+    return bytearray(pack_record(t))
+
+
+def test_empaquetado_valido_se_acepta():
+    """Un registro del grabador de vuelo se decodifica igual que se grabó."""
+    sent = TelemetrySchema.from_dict(VALID)
+    records = []
+    assert decode_packed(bytes(_packed(sent)), records) == 0
+    assert records[0].drone_id == sent.drone_id
+    assert records[0].status == sent.status
+
+
+def test_empaquetado_invalido_se_rechaza():
+    """drone_id vacío o no UTF-8, estado desconocido y NaN se rechazan."""
+    base = TelemetrySchema.from_dict(VALID)
+    
+    empty_id = _packed(TelemetrySchema.from_dict(dict(VALID, drone_id="X")))
+    empty_id[8:24] = bytes(16)
+    
+    bad_utf8 = _packed(base)
+    bad_utf8[8:10] = b"\xff\xfe"
+    
+    bad_status = _packed(base)
+    bad_status[RECORD.size - 7] = 200
+    
+    nan_lat = _packed(TelemetrySchema.from_dict(dict(VALID, latitude=float("nan"))))
+    
+    records = []
+    data = bytes(empty_id + bad_utf8 + bad_status + nan_lat + _packed(base))
+    assert decode_packed(data, records) == 4
+    assert [t.drone_id for t in records] == ["GCS_001"]
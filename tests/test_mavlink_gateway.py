@@ -0,0 +1,143 @@
+"""
+Pruebas del gateway MAVLink con el emisor de prueba por UDP local.
+"""
+import asyncio
+import socket
+
+from backend.schemas import TelemetrySchema
+from common.constants import DroneStatus
+from drones import mavlink_gateway
+from drones.mavlink_codec import (
+    encode_message,
+    MSG_HEARTBEAT,
+    MSG_SYS_STATUS,
+    MSG_GLOBAL_POSITION_INT,
+    MAV_STATE_ACTIVE,
+)
+from drones.mavlink_gateway import MAVLinkGateway
+from drones.mavlink_sender import FakeMAVLinkVehicle
+
+
+HEARTBEAT = {"type": 2, "autopilot": 12, "system_status": MAV_STATE_ACTIVE, "mavlink_version": 3}
+POSITION = {"lat": 209674000, "lon": -895926000, "relative_alt": 15000, "hdg": 9000}
+
+
+async def _start_gateway(records):
+    gateway = MAVLinkGateway(callback=records.append, host="127.0.0.1", port=0)
+    await gateway.start()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return gateway, sock
+
+
+async def _send(sock, gateway, data: bytes):
+    sock.sendto(data, ("127.0.0.1", gateway.port))
+    await asyncio.sleep(0.05)
+
+
+def test_no_emite_antes_de_posicion_y_bateria():
+    """HEARTBEAT y posición sin SYS_STATUS no emiten un registro inventado."""
+    async def scenario():
+        records = []
+        gateway, sock = await _start_gateway(records)
+        try:
+            await _send(sock, gateway, encode_message(MSG_HEARTBEAT, HEARTBEAT, system_id=7))
+            assert gateway.get_vehicle("DRONE_007") is not None
+            assert records == []
+            
+            await _send(sock, gateway, encode_message(MSG_GLOBAL_POSITION_INT, POSITION, system_id=7))
+            assert records == []
+            
+            await _send(sock, gateway, encode_message(MSG_SYS_STATUS, {"battery_remaining": 64}, system_id=7))
+        finally:
+            sock.close()
+            await gateway.stop()
+        return records
+    
+    records = asyncio.run(scenario())
+    assert len(records) == 1
+    telemetry = records[0]
+    assert telemetry.drone_id == "DRONE_007"
+    assert (telemetry.latitude, telemetry.longitude) == (20.9674, -89.5926)
+    assert telemetry.altitude == 15.0
+    assert telemetry.battery == 64.0
+    assert telemetry.status == DroneStatus.FLYING.value
+
+
+def test_emisor_de_prueba_entrega_registro_completo():
+    """Un datagrama del emisor de prueba se traduce al mismo registro."""
+    async def scenario():
+        records = []
+        gateway, sock = await _start_gateway(records)
+        try:
+            vehicle = FakeMAVLinkVehicle(system_id=3, target=("127.0.0.1", gateway.port), sock=sock)
+            sent = TelemetrySchema(
+                "DRONE_003", 20.97, -89.59, 42.0, 180.0, 6.5, 77.0,
+                DroneStatus.FLYING.value, 0.0, vertical_speed=1.5
+            )
+            vehicle.send_telemetry(sent)
+            await asyncio.sleep(0.05)
+        finally:
+            sock.close()
+            await gateway.stop()
+        return records, sent
+    
+    records, sent = asyncio.run(scenario())
+    assert len(records) == 1
+    telemetry = records[0]
+    assert telemetry.drone_id == sent.drone_id
+    assert abs(telemetry.latitude - sent.latitude) < 1e-6
+    assert abs(telemetry.longitude - sent.longitude) < 1e-6
+    assert telemetry.battery == sent.battery
+    assert abs(telemetry.velocity - sent.velocity) < 0.05
+
+
+def test_direccion_sin_trama_valida_no_crea_decodificador():
+    """Los datagramas basura no reservan estado por dirección."""
+    async def scenario():
+        gateway, sock = await _start_gateway([])
+        try:
+            await _send(sock, gateway, b"no es mavlink")
+            await _send(sock, gateway, b"\xfd\x09" + bytes(20))
+            stats = gateway.get_stats()
+            
+            await _send(sock, gateway, encode_message(MSG_HEARTBEAT, HEARTBEAT, system_id=1))
+            return stats, gateway.get_stats()
+        finally:
+            sock.close()
+            await gateway.stop()
+    
+    before, after = asyncio.run(scenario())
+    assert before["sources"] == 0
+    assert before["rejected"] == 2
+    assert after["sources"] == 1
+    assert after["vehicles"] == 1
+
+
+def test_direcciones_inactivas_se_descartan(monkeypatch):
+    """Al aparecer una dirección nueva se olvidan las inactivas."""
+    gateway = MAVLinkGateway()
+    clock = [1000.0]
+    monkeypatch.setattr(mavlink_gateway.time, "monotonic", lambda: clock[0])
+    frame = encode_message(MSG_SYS_STATUS, {"battery_remaining": 50}, system_id=1)
+    
+    gateway.datagram_received(frame, ("10.0.0.1", 5000))
+    clock[0] += mavlink_gateway.PARSER_IDLE_TIMEOUT + 1
+    gateway.datagram_received(frame, ("10.0.0.2", 5000))
+    
+    stats = gateway.get_stats()
+    assert stats["sources"] == 1
+    assert stats["messages"] == 2
+
+
+def test_limite_de_direcciones(monkeypatch):
+    """Con el límite alcanzado las direcciones nuevas se rechazan."""
+    monkeypatch.setattr(mavlink_gateway, "MAX_SOURCE_ADDRESSES", 2)
+    gateway = MAVLinkGateway()
+    frame = encode_message(MSG_SYS_STATUS, {"battery_remaining": 50}, system_id=1)
+    
+    for port in range(3):
+        gateway.datagram_received(frame, ("10.0.0.1", 5000 + port))
+    
+    stats = gateway.get_stats()
+    assert stats["sources"] == 2
+    assert stats["rejected"] == 1
@@ -0,0 +1,88 @@
+"""
+Pruebas de la cola de telemetría acotada con cada política de desborde.
+"""
+import threading
+import time
+
+import pytest
+
+from backend.schemas import TelemetrySchema
+from common.constants import DroneStatus, QueuePolicy
+from common.telemetry_buffer import BoundedTelemetryQueue
+
+
+def _sample(drone_id: str, battery: float = 80.0) -> TelemetrySchema:
+    return TelemetrySchema(
+        drone_id, 20.97, -89.59, 10.0, 0.0, 0.0, battery, DroneStatus.FLYING.value, time.time()
+    )
+
+
+def test_drop_oldest_descarta_la_mas_antigua():
+    """Con la cola llena el productor no espera y se pierde la muestra más antigua."""
+    queue = BoundedTelemetryQueue(maxsize=2, policy=QueuePolicy.DROP_OLDEST)
+    for battery in (90.0, 80.0, 70.0):
+        assert queue.put(_sample("DRONE_001", battery))
+    
+    assert [t.battery for t in queue.drain()] == [80.0, 70.0]
+    stats = queue.get_stats()
+    assert stats["dropped"] == 1
+    assert stats["max_depth"] == 2
+
+
+def test_conflate_conserva_la_ultima_por_dron():
+    """Con CONFLATE queda una muestra por dron y un dron nuevo desplaza al más antiguo."""
+    queue = BoundedTelemetryQueue(maxsize=2, policy=QueuePolicy.CONFLATE)
+    queue.put(_sample("DRONE_001", 90.0))
+    queue.put(_sample("DRONE_001", 85.0))
+    queue.put(_sample("DRONE_002", 70.0))
+    assert len(queue) == 2
+    
+    queue.put(_sample("DRONE_003", 60.0))
+    batch = {t.drone_id: t.battery for t in queue.drain()}
+    assert batch == {"DRONE_002": 70.0, "DRONE_003": 60.0}
+    stats = queue.get_stats()
+    assert stats["conflated"] == 1
+    assert stats["dropped"] == 1
+
+
+def test_block_rechazada_con_loop_compartido():
+    """BLOCK con el consumidor en el loop de los productores es un error de uso."""
+    with pytest.raises(ValueError):
+        BoundedTelemetryQueue(maxsize=2, policy=QueuePolicy.BLOCK)
+
+
+def test_block_espera_al_consumidor():
+    """Con BLOCK el productor espera hasta que un consumidor en otro hilo libera espacio."""
+    queue = BoundedTelemetryQueue(
+        maxsize=1, policy=QueuePolicy.BLOCK, block_timeout=2.0, shared_loop=False
+    )
+    assert queue.put(_sample("DRONE_001", 90.0))
+    
+    drained = []
+    consumer = threading.Timer(0.1, lambda: drained.extend(queue.drain()))
+    consumer.start()
+    started = time.monotonic()
+    assert queue.put(_sample("DRONE_001", 80.0))
+    waited = time.monotonic() - started
+    consumer.join()
+    
+    assert 0.05 < waited < 2.0
+    assert [t.battery for t in drained] == [90.0]
+    assert [t.battery for t in queue.drain()] == [80.0]
+    stats = queue.get_stats()
+    assert stats["blocked"] == 1
+    assert stats["dropped"] == 0
+
+
+def test_block_descarta_al_vencer_el_plazo():
+    """Sin consumidor la muestra nueva se descarta tras block_timeout."""
+    queue = BoundedTelemetryQueue(
+        maxsize=1, policy=QueuePolicy.BLOCK, block_timeout=0.05, shared_loop=False
+    )
+    queue.put(_sample("DRONE_001", 90.0))
+    assert not queue.put(_sample("DRONE_001", 80.0))
+    
+    assert [t.battery for t in queue.drain()] == [90.0]
+    stats = queue.get_stats()
+    assert stats["blocked"] == 1
+    assert stats["dropped"] == 1
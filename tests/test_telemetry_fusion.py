@@ -0,0 +1,61 @@
+"""
+Pruebas de la fusión de telemetría por vehículo.
+"""
+import pytest
+
+from common.constants import DroneStatus
+from drones.telemetry_fusion import TelemetryFusion
+
+
+def test_no_emite_sin_posicion():
+    """Un modo de vuelo o una batería sueltos no generan un registro."""
+    fusion = TelemetryFusion("DRONE_001", max_rate_hz=2.0)
+    fusion.update("flight_mode", status=DroneStatus.FLYING.value)
+    fusion.update("battery", battery=80.0)
+    
+    assert not fusion.should_emit(now=100.0)
+    assert fusion.time_until_allowed(now=100.0) is None
+
+
+def test_no_inventa_bateria():
+    """Con posición pero sin batería el vehículo se retiene."""
+    fusion = TelemetryFusion("DRONE_001", max_rate_hz=2.0)
+    fusion.update("position", latitude=40.4, longitude=-3.7, altitude=10.0)
+    
+    assert not fusion.should_emit(now=100.0)
+    
+    fusion.update("battery", battery=55.0)
+    assert fusion.should_emit(now=100.0)
+    telemetry = fusion.emit(now=100.0)
+    assert telemetry.battery == 55.0
+    assert (telemetry.latitude, telemetry.longitude) == (40.4, -3.7)
+
+
+def test_primera_emision_con_datos_reales():
+    """El primer registro emitido lleva la posición real, nunca (0, 0)."""
+    fusion = TelemetryFusion("DRONE_001", max_rate_hz=2.0)
+    fusion.update("flight_mode", status=DroneStatus.ARMED.value)
+    fusion.update("battery", battery=90.0)
+    fusion.update("position", latitude=40.4, longitude=-3.7, altitude=0.0)
+    
+    assert fusion.should_emit(now=100.0)
+    telemetry = fusion.emit(now=100.0)
+    assert telemetry.latitude == 40.4
+    assert telemetry.status == DroneStatus.ARMED.value
+
+
+def test_limitador_de_tasa_para_parciales():
+    """Tras la primera emisión los parciales respetan el limitador."""
+    fusion = TelemetryFusion("DRONE_001", max_rate_hz=2.0)
+    fusion.update("battery", battery=90.0)
+    fusion.update("position", latitude=40.4, longitude=-3.7, altitude=0.0)
+    fusion.emit(now=100.0)
+    
+    fusion.update("battery", battery=89.0)
+    assert not fusion.should_emit(now=100.1)
+    assert fusion.time_until_allowed(now=100.1) == pytest.approx(0.4)
+    assert fusion.should_emit(now=100.5)
+    
+    # Una posición nueva se emite sin esperar al limitador
+    fusion.update("position", latitude=40.5, longitude=-3.7, altitude=0.0)
+    assert fusion.should_emit(now=100.2)
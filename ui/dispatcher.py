@@ -0,0 +1,242 @@
+"""
+Despachador de UI.
+Un único hilo aplica todas las mutaciones de controles Flet en lotes y las
+publica con un solo page.update() por frame, a una tasa máxima configurable.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+import flet as ft
+
+
+WorkItem = Tuple[Callable[..., Any], tuple]
+
+
+class UIDispatcher:
+    """
+    Hilo dueño de las mutaciones de la UI.
+    
+    Los productores (tareas de asyncio, hilos de polling, manejadores de
+    eventos) encolan trabajo con submit() o submit_latest() y vuelven de
+    inmediato. El hilo despierta, ejecuta todo lo pendiente en orden y
+    publica el resultado con un page.update(); como máximo max_fps frames
+    por segundo. submit_latest() sustituye el trabajo pendiente con la misma
+    clave, de modo que un refresco pedido muchas veces en un frame se hace
+    una sola vez.
+    
+    Los componentes marcan los controles que cambiaron con mark_dirty(); si
+    en el frame solo hay controles marcados, se publican solo esos
+    (page.update(*controles)) en lugar de comparar toda la página. Así el
+    tráfico hacia el cliente escala con la tasa de frames y con lo que cambia,
+    no con el volumen de telemetría.
+    """
+    
+    def __init__(self, page: ft.Page, max_fps: float = 30.0):
+        """
+        Inicializa el despachador.
+        
+        Args:
+            page: Página Flet a actualizar
+            max_fps: Frames por segundo como máximo
+        """
+        self.page = page
+        self.frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.running = False
+        
+        self._items: Deque[WorkItem] = deque()
+        self._keyed: Dict[Hashable, WorkItem] = {}
+        self._dirty = False  # page.update() completo pendiente
+        self._dirty_controls: Dict[int, ft.Control] = {}  # id(control) -> control
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        
+        # Contadores de estadísticas
+        self.frame_count = 0
+        self.item_count = 0
+        self.coalesced_count = 0
+        self.update_requests = 0
+        self.partial_updates = 0
+        self.dropped_frames = 0
+        self.last_frame_ms = 0.0
+        self.max_frame_ms = 0.0
+        self._total_frame_ms = 0.0
+    
+    def start(self):
+        """Inicia el hilo del despachador."""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="ui-dispatcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 1.0):
+        """Detiene el hilo tras aplicar el trabajo pendiente."""
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+    
+    def in_dispatcher(self) -> bool:
+        """Indica si el llamador es el hilo del despachador."""
+        return self._thread is threading.current_thread()
+    
+    def submit(self, func: Callable[..., Any], *args):
+        """
+        Encola trabajo de UI (se ejecuta en el próximo frame, en orden).
+        
+        Args:
+            func: Función que muta controles
+            *args: Argumentos de la función
+        """
+        with self._condition:
+            self._items.append((func, args))
+            self._condition.notify()
+    
+    def submit_latest(self, key: Hashable, func: Callable[..., Any], *args):
+        """
+        Encola trabajo de UI reemplazando el pendiente con la misma clave.
+        
+        El trabajo debe marcar con mark_dirty() (o commit()) los controles que
+        modifica; solo se publican esos.
+        
+        Args:
+            key: Clave de coalescencia (ej., "drone_list")
+            func: Función que muta controles
+            *args: Argumentos de la función
+        """
+        with self._condition:
+            if key in self._keyed:
+                self.coalesced_count += 1
+            self._keyed[key] = (func, args)
+            self._condition.notify()
+    
+    def request_update(self):
+        """Pide un page.update() completo en el próximo frame (sin trabajo adicional)."""
+        with self._condition:
+            self._dirty = True
+            self.update_requests += 1
+            self._condition.notify()
+    
+    def mark_dirty(self, *controls: ft.Control):
+        """
+        Marca controles modificados para publicarlos en el próximo frame.
+        
+        Args:
+            *controls: Controles modificados (sin controles equivale a request_update())
+        """
+        if not controls:
+            self.request_update()
+            return
+        with self._condition:
+            for control in controls:
+                self._dirty_controls[id(control)] = control
+            self.update_requests += 1
+            self._condition.notify()
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Obtiene estadísticas de frames y trabajo aplicado."""
+        with self._condition:
+            pending = len(self._items) + len(self._keyed)
+        frames = self.frame_count
+        return {
+            "frames": frames,
+            "items": self.item_count,
+            "coalesced": self.coalesced_count,
+            "update_requests": self.update_requests,
+            "partial_updates": self.partial_updates,
+            "dropped_frames": self.dropped_frames,
+            "pending": pending,
+            "last_frame_ms": round(self.last_frame_ms, 2),
+            "avg_frame_ms": round(self._total_frame_ms / frames, 2) if frames else 0.0,
+            "max_frame_ms": round(self.max_frame_ms, 2),
+        }
+    
+    def _run(self):
+        """Loop del hilo: espera trabajo, lo aplica y actualiza la página."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        while True:
+            with self._condition:
+                while self.running and not self._has_work():
+                    self._condition.wait()
+                if not self._has_work():
+                    break  # Detenido y sin trabajo pendiente
+                items = list(self._items)
+                self._items.clear()
+                # El trabajo de submit() puede tocar cualquier control: página completa
+                full = bool(items)
+                items.extend(self._keyed.values())
+                self._keyed.clear()
+            
+            frame_start = time.perf_counter()
+            for func, args in items:
+                try:
+                    func(*args)
+                except Exception as e:
+                    logger.error(f"Error en trabajo de UI {getattr(func, '__name__', func)}: {e}", exc_info=True)
+            
+            # Lo marcado por el trabajo del frame se publica en este mismo frame
+            with self._condition:
+                full = full or self._dirty
+                controls = list(self._dirty_controls.values())
+                self._dirty_controls.clear()
+                self._dirty = False
+            try:
+                self._flush(full, controls)
+            except Exception as e:
+                logger.error(f"Error al actualizar la página: {e}", exc_info=True)
+            
+            elapsed = time.perf_counter() - frame_start
+            self.frame_count += 1
+            self.item_count += len(items)
+            self.last_frame_ms = elapsed * 1000.0
+            self.max_frame_ms = max(self.max_frame_ms, self.last_frame_ms)
+            self._total_frame_ms += self.last_frame_ms
+            
+            # Limitar la tasa de frames; el trabajo que llegue mientras tanto se agrupa
+            if self.running and elapsed < self.frame_interval:
+                time.sleep(self.frame_interval - elapsed)
+            elif self.frame_interval:
+                # El frame se pasó de su intervalo: cuenta los frames perdidos
+                self.dropped_frames += int(elapsed / self.frame_interval)
+    
+    def _has_work(self) -> bool:
+        """Indica si hay trabajo o cambios pendientes (con el lock tomado)."""
+        return bool(self._items or self._keyed or self._dirty or self._dirty_controls)
+    
+    def _flush(self, full: bool, controls: List[ft.Control]):
+        """
+        Publica los cambios del frame.
+        
+        Args:
+            full: True si hay que comparar toda la página
+            controls: Controles marcados como modificados
+        """
+        # Un control aún no montado (sin página) solo se publica con la página completa
+        if full or any(control.page is None for control in controls):
+            self.page.update()
+        elif controls:
+            self.page.update(*controls)
+            self.partial_updates += 1
+
+
+def commit(dispatcher: Optional[UIDispatcher], *controls: ft.Control):
+    """
+    Publica cambios en controles.
+    
+    Con despachador, los controles se marcan para el próximo frame; sin él,
+    se actualiza cada control directamente.
+    
+    Args:
+        dispatcher: Despachador de UI (o None)
+        *controls: Controles modificados
+    """
+    if dispatcher is not None:
+        dispatcher.mark_dirty(*controls)
+        return
+    for control in controls:
+        control.update()
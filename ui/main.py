@@ -3,8 +3,8 @@ Aplicación UI principal de Flet.
 Coordina todos los componentes UI y maneja actualizaciones en tiempo real.
 """
 import flet as ft
-import asyncio
-from typing import Dict, Any, Optional, List
+import threading
+from typing import Dict, Any, Optional, List, Callable
 from common.config import Config
 from common.constants import POIType, CHANNEL_TELEMETRY, CHANNEL_POI
 from common.colors import (
@@ -14,10 +14,14 @@ from common.colors import (
     get_text_color, get_text_secondary_color, get_background_color
 )
 from backend.storage import POIStorage
+from backend.schemas import TelemetrySchema, DroneCommand
+from backend.fleet_state import FleetStateStore
 from ui.telemetry_panel import TelemetryPanel
-from ui.poi_manager import POIManager
+from ui.poi_manager import POIManager, POI_TYPE_COLORS, POI_TYPE_NAMES
 from ui.map_view import MapView
 from ui.zone_manager import ZoneManager
+from ui.dispatcher import UIDispatcher, commit
+from common.runtime import AsyncRuntime
 from common.constants import FlightFormation
 
 
@@ -26,7 +30,13 @@ class MainApp:
     Clase principal de la aplicación que coordina todos los componentes UI.
     """
     
-    def __init__(self, config: Config, storage: POIStorage, drone_manager=None):
+    def __init__(
+        self,
+        config: Config,
+        storage: POIStorage,
+        drone_manager=None,
+        runtime: Optional[AsyncRuntime] = None
+    ):
         """
         Inicializa la aplicación principal.
         
@@ -34,12 +44,23 @@ class MainApp:
             config: Configuración de la aplicación
             storage: Instancia de almacenamiento de POIs
             drone_manager: Instancia de DroneManager para enviar comandos a los drones
+            runtime: Runtime asíncrono donde viven los drones y el servidor de datos
         """
         self.config = config
         self.storage = storage
         self.drone_manager = drone_manager
+        self.runtime = runtime
         self.page: Optional[ft.Page] = None
         
+        # Hilo único que aplica las mutaciones de la UI (se crea con la página)
+        self.dispatcher: Optional[UIDispatcher] = None
+        # Registros ya escritos en el almacén pendientes de mostrar (último por dron)
+        self._pending_telemetry: Dict[str, TelemetrySchema] = {}
+        self._pending_lock = threading.Lock()
+        
+        # Estado actual de la flota (fuente única para panel, mapa y servidor HTTP)
+        self.fleet_state = FleetStateStore(capacity=config.max_drones)
+        
         # Componentes UI (se inicializarán con la página para acceso al tema)
         self.telemetry_panel = None
         self.poi_manager = None
@@ -52,6 +73,13 @@ class MainApp:
         # Referencias de controles UI para actualizaciones
         self.drone_positions_container: Optional[ft.Container] = None
         self.poi_markers_container: Optional[ft.Container] = None
+        # Filas del resumen de posiciones por dron (se crean una vez y se actualizan en el sitio)
+        self._drone_rows: Dict[str, _DroneSummaryRow] = {}
+        # Colores del resumen según el tema (se recalculan solo si cambia el tema)
+        self._summary_theme: Optional[ft.ThemeMode] = None
+        self._summary_colors: Optional[tuple] = None
+        # Filas del resumen de POIs por ID (inserción y borrado sin reconstruir)
+        self._poi_rows: Dict[str, ft.Container] = {}
         
         # Vista de mapa
         self.map_view: Optional[MapView] = None
@@ -72,20 +100,30 @@ class MainApp:
         page.window.width = self.config.window_width
         page.window.height = self.config.window_height
         
+        # Todas las mutaciones de controles pasan por el despachador (un page.update() por frame)
+        self.dispatcher = UIDispatcher(page, max_fps=self.config.ui_max_fps)
+        
         # Inicializar componentes UI con acceso a la página para colores adaptativos
-        self.telemetry_panel = TelemetryPanel(page=page, page_height=self.config.window_height)
+        self.telemetry_panel = TelemetryPanel(
+            page=page,
+            page_height=self.config.window_height,
+            fleet_state=self.fleet_state,
+            dispatcher=self.dispatcher
+        )
         self.poi_manager = POIManager(
             page=page,
-            on_create_poi=self._on_create_poi,
-            on_delete_poi=self._on_delete_poi,
-            page_height=self.config.window_height
+            on_create_poi=self._ui_callback(self._on_create_poi),
+            on_delete_poi=self._ui_callback(self._on_delete_poi),
+            page_height=self.config.window_height,
+            dispatcher=self.dispatcher
         )
         self.zone_manager = ZoneManager(
             page=page,
-            on_zone_created=self._on_zone_created,
-            on_zone_deleted=self._on_delete_zone,
-            on_formation_selected=self._on_formation_selected,
-            page_height=self.config.window_height
+            on_zone_created=self._ui_callback(self._on_zone_created),
+            on_zone_deleted=self._ui_callback(self._on_delete_zone),
+            on_formation_selected=self._ui_callback(self._on_formation_selected),
+            page_height=self.config.window_height,
+            dispatcher=self.dispatcher
         )
         
         # Crear layout principal
@@ -98,6 +136,44 @@ class MainApp:
         
         # Suscribirse a pub/sub
         self._setup_pubsub()
+        
+        self.dispatcher.start()
+    
+    def _dispatch(self, func: Callable, *args):
+        """
+        Ejecuta trabajo de UI en el hilo del despachador.
+        Sin despachador (página aún no configurada) se ejecuta en el acto.
+        """
+        if self.dispatcher:
+            self.dispatcher.submit(func, *args)
+        else:
+            func(*args)
+            if self.page:
+                self.page.update()
+    
+    def _ui_callback(self, func: Callable) -> Callable:
+        """Envuelve un callback de un componente para que se ejecute en el despachador."""
+        def dispatched(*args):
+            self._dispatch(func, *args)
+        return dispatched
+    
+    def _request_update(self):
+        """Pide que se publiquen los cambios de la UI en el próximo frame."""
+        if self.dispatcher:
+            self.dispatcher.request_update()
+        elif self.page:
+            self.page.update()
+    
+    def _show_message(self, text: str, bgcolor: str):
+        """Muestra un mensaje temporal (SnackBar) desde cualquier hilo."""
+        if not self.page:
+            return
+        
+        def show():
+            self.page.snack_bar = ft.SnackBar(content=ft.Text(text), bgcolor=bgcolor)
+            self.page.snack_bar.open = True
+        
+        self._dispatch(show)
     
     def _create_main_layout(self) -> ft.Row:
         """Crea el layout principal de la aplicación."""
@@ -131,27 +207,58 @@ class MainApp:
             initial_lon=self.config.default_longitude,
             zoom=self.config.default_zoom,
             on_poi_click=self._on_poi_click,
-            on_map_click=self._on_map_click,
-            on_zone_created=self._on_zone_created,
-            page=self.page
+            on_map_click=self._ui_callback(self._on_map_click),
+            on_zone_created=self._ui_callback(self._on_zone_created),
+            page=self.page,
+            fleet_state=self.fleet_state,
+            dead_reckoning_horizon=self.config.dead_reckoning_horizon,
+            dead_reckoning_correction=self.config.dead_reckoning_correction,
+            dispatcher=self.dispatcher,
+            runtime=self.runtime
         )
         
-        # Iniciar polling para leer eventos del mapa
-        self._start_map_events_polling()
-        
-        # Crear contenedores para información adicional (opcional)
+        # Resúmenes de posiciones de drones y de POIs (bajo el mapa)
         self.drone_positions_container = ft.Container(
             content=ft.Column(
                 controls=[],
                 spacing=5,
+                scroll=ft.ScrollMode.AUTO,
             ),
+            expand=True,
         )
         
         self.poi_markers_container = ft.Container(
             content=ft.Column(
                 controls=[],
                 spacing=5,
+                scroll=ft.ScrollMode.AUTO,
             ),
+            expand=True,
+        )
+        
+        text_color = get_text_color(self.page) if self.page else "#000000"
+        summaries = ft.Row(
+            controls=[
+                ft.Column(
+                    controls=[
+                        ft.Text("Posiciones de Drones", size=14, weight=ft.FontWeight.BOLD, color=text_color),
+                        self.drone_positions_container,
+                    ],
+                    spacing=5,
+                    expand=True,
+                ),
+                ft.Column(
+                    controls=[
+                        ft.Text("POIs", size=14, weight=ft.FontWeight.BOLD, color=text_color),
+                        self.poi_markers_container,
+                    ],
+                    spacing=5,
+                    expand=True,
+                ),
+            ],
+            height=160,
+            spacing=10,
+            vertical_alignment=ft.CrossAxisAlignment.START,
         )
         
         # Layout con mapa (los controles ahora están en el mapa)
@@ -163,6 +270,8 @@ class MainApp:
                     ft.Divider(),
                     # Mapa interactivo (los botones están integrados en el mapa)
                     self.map_view.get_view(),
+                    ft.Divider(),
+                    summaries,
                 ],
                 spacing=10,
                 expand=True,
@@ -192,22 +301,10 @@ class MainApp:
         logger.info("Creando POI automáticamente (modo de prueba, sin diálogo)")
         try:
             self._on_create_poi(lat, lon, "other", "POI creado desde mapa")
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text(f"POI creado en {lat:.6f}, {lon:.6f}"),
-                    bgcolor=GREEN
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message(f"POI creado en {lat:.6f}, {lon:.6f}", GREEN)
         except Exception as err:
             logger.error(f"Error al crear POI automáticamente: {err}", exc_info=True)
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text(f"Error al crear POI: {err}"),
-                    bgcolor=RED
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message(f"Error al crear POI: {err}", RED)
         
         # Mostrar diálogo para crear POI (comentado temporalmente para pruebas)
         # self._create_poi_dialog(lat, lon)
@@ -224,13 +321,7 @@ class MainApp:
             self.map_view.telemetry_server.set_map_mode('rectangle')
         
         # Mostrar mensaje al usuario
-        if self.page:
-            self.page.snack_bar = ft.SnackBar(
-                content=ft.Text("Modo dibujo activado: Arrastra el cursor en el mapa para dibujar una zona"),
-                bgcolor=BLUE
-            )
-            self.page.snack_bar.open = True
-            self.page.update()
+        self._show_message("Modo dibujo activado: Arrastra el cursor en el mapa para dibujar una zona", BLUE)
     
     def _on_zone_created(self, zone: Dict[str, Any]):
         """Maneja la creación de una zona de interés."""
@@ -241,18 +332,12 @@ class MainApp:
         # Agregar zona al ZoneManager (skip_callback=True para evitar bucle infinito)
         self.zone_manager.add_zone(zone, skip_callback=True)
         
-        # Actualizar servidor HTTP
-        if self.map_view and self.map_view.telemetry_server:
-            self.map_view.telemetry_server.update_zone(zone)
+        # Actualizar mapa (servidor HTTP y canvas)
+        if self.map_view:
+            self.map_view.add_zone(zone)
         
         # Mostrar mensaje
-        if self.page:
-            self.page.snack_bar = ft.SnackBar(
-                content=ft.Text(f"Zona creada: {zone.get('id', 'unknown')}"),
-                bgcolor=GREEN
-            )
-            self.page.snack_bar.open = True
-            self.page.update()
+        self._show_message(f"Zona creada: {zone.get('id', 'unknown')}", GREEN)
     
     def _on_delete_zone(self, zone_id: str):
         """Maneja la eliminación de una zona de interés."""
@@ -260,10 +345,10 @@ class MainApp:
         logger = logging.getLogger(__name__)
         logger.info(f"_on_delete_zone llamado: {zone_id}")
         
-        # Eliminar del servidor HTTP
-        if self.map_view and self.map_view.telemetry_server:
-            self.map_view.telemetry_server.remove_zone(zone_id)
-            logger.info(f"Zona {zone_id} eliminada del servidor HTTP")
+        # Eliminar del mapa (servidor HTTP y canvas)
+        if self.map_view:
+            self.map_view.remove_zone(zone_id)
+            logger.info(f"Zona {zone_id} eliminada del mapa")
         
         # El JavaScript detectará que la zona ya no está en el servidor y la eliminará del mapa automáticamente
     
@@ -282,26 +367,14 @@ class MainApp:
         available_drones = self._get_available_drones()
         
         if not available_drones:
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("No hay drones disponibles para la formación"),
-                    bgcolor=RED
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message("No hay drones disponibles para la formación", RED)
             return
         
         # Calcular waypoints según la formación
         waypoints = self._calculate_formation_waypoints(zone, formation, available_drones)
         
         # Mostrar mensaje
-        if self.page:
-            self.page.snack_bar = ft.SnackBar(
-                content=ft.Text(f"Formación {formation.value} aplicada a {len(waypoints)} drones"),
-                bgcolor=GREEN
-            )
-            self.page.snack_bar.open = True
-            self.page.update()
+        self._show_message(f"Formación {formation.value} aplicada a {len(waypoints)} drones", GREEN)
         
         logger.info(f"Formación {formation.value} aplicada a zona {zone_id} con {len(waypoints)} waypoints")
     
@@ -310,7 +383,7 @@ class MainApp:
         Calcula waypoints para una formación de vuelo.
         
         Args:
-            zone: Zona de interés con bounds
+            zone: Zona de interés del ZoneManager (con id y bounds)
             formation: Tipo de formación
             drone_ids: Lista de IDs de drones disponibles
             
@@ -323,8 +396,10 @@ class MainApp:
         east = bounds.get('east', 0)
         west = bounds.get('west', 0)
         
-        center_lat = (north + south) / 2
-        center_lon = (east + west) / 2
+        # Centro cacheado por el ZoneManager al agregar la zona
+        metrics = self.zone_manager.get_zone_metrics(zone.get('id'))
+        center_lat = metrics.center_lat
+        center_lon = metrics.center_lon
         
         waypoints = []
         num_drones = len(drone_ids)
@@ -424,30 +499,13 @@ class MainApp:
         Returns:
             Lista de IDs de drones disponibles
         """
-        if not self.telemetry_panel:
-            return []
-        
-        available = []
-        for drone_id, telemetry in self.telemetry_panel.drones.items():
-            battery = telemetry.get('battery', 0)
-            status = telemetry.get('status', 'idle').lower()
-            
-            # Verificar batería (mínimo 20%)
-            if battery < 20:
-                continue
-            
-            # Verificar estado (debe estar listo para volar)
-            if status in ['error', 'landing']:
-                continue
-            
-            # Verificar calibración RTK si está disponible
-            rtk_fix = telemetry.get('rtk_fix', True)  # Por defecto True si no está disponible
-            if not rtk_fix:
-                continue
-            
-            available.append(drone_id)
-        
-        return available
+        # Consulta vectorizada sobre el almacén columnar de la flota
+        # (rtk_fix ausente se considera calibrado)
+        return self.fleet_state.filter(
+            min_battery=20,
+            exclude_statuses=['error', 'landing'],
+            require_rtk=True
+        )
     
     def _calculate_sequential_vertical_formation(self, zone: Dict[str, Any], drone_ids: List[str]) -> List[Dict[str, Any]]:
         """
@@ -455,7 +513,7 @@ class MainApp:
         Los drones se distribuyen uniformemente dentro del rectángulo azul para cubrirlo completamente.
         
         Args:
-            zone: Zona de interés con bounds
+            zone: Zona de interés del ZoneManager (con id y bounds)
             drone_ids: Lista de IDs de drones disponibles
             
         Returns:
@@ -493,17 +551,18 @@ class MainApp:
         usable_east = east - lon_margin
         
         # Pasos para distribuir los drones
+        metrics = self.zone_manager.get_zone_metrics(zone.get('id'))
         if rows > 1:
             lat_step = (usable_north - usable_south) / (rows - 1)
         else:
             lat_step = 0
-            usable_south = (usable_north + usable_south) / 2  # Centrar si solo hay una fila
+            usable_south = metrics.center_lat  # Centrar si solo hay una fila
         
         if cols > 1:
             lon_step = (usable_east - usable_west) / (cols - 1)
         else:
             lon_step = 0
-            usable_west = (usable_east + usable_west) / 2  # Centrar si solo hay una columna
+            usable_west = metrics.center_lon  # Centrar si solo hay una columna
         
         # Distribuir drones en la cuadrícula
         for i, drone_id in enumerate(drone_ids):
@@ -530,179 +589,86 @@ class MainApp:
         para cubrirla completamente de forma coordinada y alineada.
         """
         import logging
-        import asyncio
         logger = logging.getLogger(__name__)
         logger.info("Iniciando vuelo coordinado...")
         
         # Verificar que haya zona activa
         if not self.zone_manager or not self.zone_manager.active_zone_id:
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("No hay zona activa. Selecciona una zona primero."),
-                    bgcolor=RED
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message("No hay zona activa. Selecciona una zona primero.", RED)
             return
         
         zone_id = self.zone_manager.active_zone_id
         zone = self.zone_manager.zones.get(zone_id)
         
         if not zone:
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("Zona activa no encontrada."),
-                    bgcolor=RED
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message("Zona activa no encontrada.", RED)
             return
         
         # Obtener drones disponibles
         available_drones = self._get_available_drones()
         
         if not available_drones:
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("No hay drones disponibles. Verifica batería y estado."),
-                    bgcolor=RED
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message("No hay drones disponibles. Verifica batería y estado.", RED)
             return
         
         # Calcular waypoints en formación de cuadrícula
         waypoints = self._calculate_sequential_vertical_formation(zone, available_drones)
         
         if not waypoints:
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("No se pudieron calcular waypoints."),
-                    bgcolor=RED
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message("No se pudieron calcular waypoints.", RED)
             return
         
         # Enviar comandos a los drones
-        if not self.drone_manager:
+        if not self.drone_manager or not self.runtime:
             logger.error("DroneManager no disponible")
-            if self.page:
-                self.page.snack_bar = ft.SnackBar(
-                    content=ft.Text("Error: Gestor de drones no disponible."),
-                    bgcolor=RED
-                )
-                self.page.snack_bar.open = True
-                self.page.update()
+            self._show_message("Error: Gestor de drones no disponible.", RED)
             return
         
-        # Enviar comandos de forma asíncrona
-        async def send_commands():
-            try:
-                for waypoint in waypoints:
-                    await self.drone_manager.send_command_to_drone(
-                        waypoint['drone_id'],
-                        "set_target",
-                        latitude=waypoint['latitude'],
-                        longitude=waypoint['longitude'],
-                        altitude=waypoint['altitude']
-                    )
-                    logger.info(f"Comando enviado a {waypoint['drone_id']}: lat={waypoint['latitude']:.6f}, lon={waypoint['longitude']:.6f}")
-                
-                # Mostrar mensaje de éxito
-                if self.page:
-                    self.page.snack_bar = ft.SnackBar(
-                        content=ft.Text(f"Vuelo coordinado iniciado: {len(waypoints)} drones en formación de cuadrícula"),
-                        bgcolor=GREEN
-                    )
-                    self.page.snack_bar.open = True
-                    self.page.update()
-                
-                logger.info(f"Vuelo coordinado iniciado: {len(waypoints)} drones")
-            except Exception as err:
-                logger.error(f"Error enviando comandos de vuelo: {err}", exc_info=True)
-                if self.page:
-                    self.page.snack_bar = ft.SnackBar(
-                        content=ft.Text(f"Error al iniciar vuelo coordinado: {err}"),
-                        bgcolor=RED
-                    )
-                    self.page.snack_bar.open = True
-                    self.page.update()
+        # Un solo lote: todos los drones reciben su waypoint en paralelo
+        batch = [
+            DroneCommand(
+                waypoint['drone_id'],
+                "set_target",
+                {
+                    "latitude": waypoint['latitude'],
+                    "longitude": waypoint['longitude'],
+                    "altitude": waypoint['altitude'],
+                }
+            )
+            for waypoint in waypoints
+        ]
+        try:
+            # Los drones viven en el runtime: el lote se ejecuta allí sin crear hilos ni loops
+            future = self.runtime.submit(self.drone_manager.send_commands(batch))
+        except RuntimeError as err:
+            logger.error(f"No se pudieron enviar los comandos de vuelo: {err}")
+            self._show_message(f"Error al iniciar vuelo coordinado: {err}", RED)
+            return
         
-        # Ejecutar comandos en un hilo separado con su propio event loop
-        import threading
-        def run_async():
+        def on_acks(done):
             try:
-                # Crear un nuevo event loop para este hilo
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                new_loop.run_until_complete(send_commands())
-                new_loop.close()
+                acks = done.result()
             except Exception as err:
-                logger.error(f"Error ejecutando comandos en hilo: {err}", exc_info=True)
+                logger.error(f"Error enviando comandos de vuelo: {err}", exc_info=True)
+                self._show_message(f"Error al iniciar vuelo coordinado: {err}", RED)
+                return
         
-        # Ejecutar en un hilo separado para no bloquear la UI
-        thread = threading.Thread(target=run_async, daemon=True)
-        thread.start()
+            failed = [ack for ack in acks if not ack.ok]
+            for ack in failed:
+                logger.warning(f"Comando {ack.command} a {ack.drone_id}: {ack.status} ({ack.error})")
+            slowest = max(ack.latency for ack in acks) * 1000.0
+            logger.info(f"Vuelo coordinado: {len(acks) - len(failed)}/{len(acks)} acuses, máx {slowest:.0f} ms")
     
-    def _start_map_events_polling(self):
-        """Inicia polling para leer eventos del mapa."""
-        import threading
-        import time
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        def poll_events():
-            logger.info("Iniciando polling de eventos del mapa...")
-            poll_count = 0
-            while True:
-                try:
-                    poll_count += 1
-                    if poll_count % 20 == 0:  # Log cada 10 segundos (20 * 0.5s)
-                        logger.debug(f"Polling activo (ciclo {poll_count})")
-                    
-                    if self.map_view and self.map_view.telemetry_server:
-                        events = self.map_view.telemetry_server.get_map_events()
-                        if events:
-                            logger.info(f"Polling: {len(events)} eventos recibidos del servidor")
-                        for event in events:
-                            event_type = event.get('type')
-                            logger.info(f"Procesando evento: {event_type}")
-                            
-                            if event_type == 'map_click':
-                                # Clic en mapa para crear POI
-                                lat = event.get('lat')
-                                lon = event.get('lon')
-                                logger.info(f"Evento map_click recibido: lat={lat}, lon={lon}")
-                                if lat and lon:
-                                    # Llamar directamente al método
-                                    logger.info("Llamando a _on_map_click")
-                                    try:
-                                        self._on_map_click(lat, lon)
-                                    except Exception as e:
-                                        logger.error(f"Error en _on_map_click: {e}", exc_info=True)
-                            
-                            elif event_type == 'zone_created':
-                                # Zona creada
-                                zone = event.get('zone')
-                                logger.info(f"Evento zone_created recibido: {zone.get('id', 'unknown') if zone else 'None'}")
-                                if zone:
-                                    # Llamar directamente al método
-                                    try:
-                                        self._on_zone_created(zone)
-                                    except Exception as e:
-                                        logger.error(f"Error en _on_zone_created: {e}", exc_info=True)
-                    else:
-                        if poll_count == 1:
-                            logger.warning("map_view o telemetry_server no disponible para polling")
-                    
-                    time.sleep(0.5)  # Polling cada 0.5 segundos
-                except Exception as e:
-                    logger.error(f"Error en polling de eventos del mapa: {e}", exc_info=True)
-                    time.sleep(1)
+            if failed:
+                self._show_message(
+                    f"Vuelo coordinado: {len(acks) - len(failed)}/{len(acks)} drones confirmaron "
+                    f"({', '.join(ack.drone_id for ack in failed[:5])} sin acuse)",
+                    AMBER
+                )
+            else:
+                self._show_message(f"Vuelo coordinado iniciado: {len(acks)} drones en formación de cuadrícula", GREEN)
         
-        polling_thread = threading.Thread(target=poll_events, daemon=True)
-        polling_thread.start()
+        future.add_done_callback(on_acks)
     
     def _create_side_panel(self) -> ft.Container:
         """Crea el panel lateral con telemetría, gestión de POIs y zonas."""
@@ -786,18 +752,12 @@ class MainApp:
                 self._on_create_poi(lat, lon, poi_type, description)
                 logger.info("_on_create_poi completado, cerrando diálogo...")
                 self.page.close_dialog()
-                self.page.update()
+                self._request_update()
                 logger.info("Diálogo cerrado y página actualizada")
             except Exception as err:
                 logger.error(f"Error al crear POI: {err}", exc_info=True)
                 # Mostrar error al usuario
-                if self.page:
-                    self.page.snack_bar = ft.SnackBar(
-                        content=ft.Text(f"Error al crear POI: {err}"),
-                        bgcolor=RED
-                    )
-                    self.page.snack_bar.open = True
-                    self.page.update()
+                self._show_message(f"Error al crear POI: {err}", RED)
         
         dialog = ft.AlertDialog(
             title=ft.Text("Crear Punto de Interés"),
@@ -819,7 +779,7 @@ class MainApp:
         try:
             self.page.dialog = dialog
             dialog.open = True
-            self.page.update()
+            self._request_update()
             logger.info("Diálogo de POI mostrado correctamente")
         except Exception as e:
             logger.error(f"Error al mostrar diálogo de POI: {e}", exc_info=True)
@@ -869,7 +829,7 @@ class MainApp:
                 # No crítico, solo log de depuración
                 logger.debug(f"Error en pub/sub (puede ignorarse): {e}")
         
-        self._update_map_pois()
+        self._add_map_poi_row(poi)
         logger.info("Mapa actualizado con POIs")
         
         # Actualizar mapa (CRÍTICO: esto es lo que hace que aparezcan en el mapa)
@@ -910,20 +870,19 @@ class MainApp:
                 except Exception as e:
                     logger.debug(f"Error en pub/sub (puede ignorarse): {e}")
             
-            self._update_map_pois()
+            self._remove_map_poi_row(poi_id)
             
             # Actualizar mapa
             if self.map_view:
                 self.map_view.remove_poi(poi_id)
     
     def _load_pois(self):
-        """Carga POIs existentes del almacenamiento."""
+        """Carga POIs existentes del almacenamiento (cada lista se construye una sola vez)."""
         pois = self.storage.get_all_pois()
-        for poi in pois:
-            self.poi_manager.add_poi(poi)
-            # Agregar al mapa
-            if self.map_view:
-                self.map_view.add_poi(poi)
+        self.poi_manager.load_pois(pois)
+        # Agregar al mapa
+        if self.map_view:
+            self.map_view.add_pois(pois)
         self._update_map_pois()
     
     def _on_add_poi_button_click(self, e):
@@ -952,7 +911,7 @@ class MainApp:
                 description = description_field.value or ""
                 self._on_create_poi(lat, lon, poi_type, description)
                 self.page.close_dialog()
-                self.page.update()
+                self._request_update()
             except ValueError:
                 pass
         
@@ -971,154 +930,226 @@ class MainApp:
         
         self.page.dialog = dialog
         dialog.open = True
-        self.page.update()
+        self._request_update()
     
     def _update_map_pois(self):
-        """Actualiza los marcadores POI en el mapa."""
-        if not self.page or not self.poi_markers_container:
-            return
-        
-        # Verificar que el contenedor esté en la página antes de actualizar
-        try:
-            # Intentar acceder a la página del contenedor
-            if not hasattr(self.poi_markers_container, '_Control__page') or self.poi_markers_container._Control__page is None:
-                return
-        except:
+        """Sincroniza el resumen de POIs del mapa con el almacenamiento (solo crea o quita lo que difiere)."""
+        if not self._poi_summary_mounted():
             return
         
         pois = self.storage.get_all_pois()
-        self.poi_markers_container.content.controls.clear()
-        
-        # Traducciones de tipos de POI
-        poi_type_names = {
-            "hazard": "PELIGRO",
-            "target": "OBJETIVO",
-            "checkpoint": "PUNTO DE CONTROL",
-            "landing_zone": "ZONA DE ATERRIZAJE",
-            "other": "OTRO"
-        }
-        
-        text_color = get_text_color(self.page) if self.page else None
+        rows = self._poi_rows
+        controls = self.poi_markers_container.content.controls
+        current = {poi.get("id") for poi in pois}
+        changed = False
+        for poi_id in [poi_id for poi_id in rows if poi_id not in current]:
+            controls.remove(rows.pop(poi_id))
+            changed = True
+        text_color = get_text_color(self.page)
         for poi in pois:
-            poi_type = poi.get("type", "other")
-            colors = {
-                "hazard": RED,
-                "target": BLUE,
-                "checkpoint": AMBER,
-                "landing_zone": GREEN,
-                "other": GREY,
-            }
-            color = colors.get(poi_type, GREY)
-            type_display = poi_type_names.get(poi_type, poi_type.upper())
-            
-            self.poi_markers_container.content.controls.append(
-                ft.Container(
-                    content=ft.Row(
-                        controls=[
-                            ft.Container(
-                                width=12,
-                                height=12,
-                                bgcolor=color,
-                                border_radius=6,
-                            ),
-                            ft.Text(
-                                f"{type_display}: {poi.get('description', 'Sin descripción')}",
-                                size=11,
-                                color=text_color,
-                            ),
-                        ],
-                        spacing=5,
+            poi_id = poi.get("id")
+            if poi_id and poi_id not in rows:
+                rows[poi_id] = self._create_map_poi_row(poi, text_color)
+                controls.append(rows[poi_id])
+                changed = True
+        
+        if changed:
+            commit(self.dispatcher, self.poi_markers_container)
+    
+    def _add_map_poi_row(self, poi: Dict[str, Any]):
+        """Agrega (o reemplaza) la fila de un POI en el resumen del mapa."""
+        poi_id = poi.get("id")
+        if not poi_id or not self._poi_summary_mounted():
+            return
+        controls = self.poi_markers_container.content.controls
+        row = self._create_map_poi_row(poi, get_text_color(self.page))
+        old = self._poi_rows.get(poi_id)
+        if old is not None:
+            controls[controls.index(old)] = row
+        else:
+            controls.append(row)
+        self._poi_rows[poi_id] = row
+        commit(self.dispatcher, self.poi_markers_container)
+    
+    def _remove_map_poi_row(self, poi_id: str):
+        """Quita la fila de un POI del resumen del mapa."""
+        row = self._poi_rows.pop(poi_id, None)
+        if row is None or not self.poi_markers_container:
+            return
+        self.poi_markers_container.content.controls.remove(row)
+        if self.poi_markers_container.page is not None:
+            commit(self.dispatcher, self.poi_markers_container)
+    
+    def _poi_summary_mounted(self) -> bool:
+        """Indica si el resumen de POIs del mapa está en la página."""
+        return bool(self.page and self.poi_markers_container and self.poi_markers_container.page is not None)
+    
+    def _create_map_poi_row(self, poi: Dict[str, Any], text_color: Optional[str]) -> ft.Container:
+        """Crea la fila de un POI para el resumen del mapa."""
+        poi_type = poi.get("type", "other")
+        type_display = POI_TYPE_NAMES.get(poi_type, poi_type.upper())
+        return ft.Container(
+            content=ft.Row(
+                controls=[
+                    ft.Container(
+                        width=12,
+                        height=12,
+                        bgcolor=POI_TYPE_COLORS.get(poi_type, GREY),
+                        border_radius=6,
                     ),
-                    padding=5,
-                )
-            )
-        
-        self.poi_markers_container.update()
+                    ft.Text(
+                        f"{type_display}: {poi.get('description', 'Sin descripción')}",
+                        size=11,
+                        color=text_color,
+                    ),
+                ],
+                spacing=5,
+            ),
+            padding=5,
+        )
     
-    def update_telemetry(self, telemetry: Dict[str, Any]):
+    def update_telemetry(self, telemetry: TelemetrySchema):
         """
         Actualiza la visualización de telemetría.
         
+        El almacén de flota se escribe en el acto (lo lee el servidor HTTP); los
+        controles se refrescan una vez por frame en el despachador, con todos
+        los drones que cambiaron desde el frame anterior.
+        
         Args:
-            telemetry: Diccionario de telemetría
+            telemetry: Registro de telemetría
         """
         try:
-            self.telemetry_panel.update_telemetry(telemetry)
-            self._update_map_drones()
-            
-            # Actualizar mapa si está disponible
-            if self.map_view:
-                self.map_view.update_drone(telemetry)
-            
-            # Asegurar que la página se actualice
-            if self.page:
-                self.page.update()
+            # Única escritura: panel, mapa y servidor HTTP leen del almacén de flota
+            self.fleet_state.update(telemetry)
+            with self._pending_lock:
+                self._pending_telemetry[telemetry.drone_id] = telemetry
+            if self.dispatcher:
+                self.dispatcher.submit_latest("telemetry", self._apply_pending_telemetry)
+            else:
+                self._dispatch(self._apply_pending_telemetry)
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Error en update_telemetry: {e}", exc_info=True)
     
-    def _update_map_drones(self):
-        """Actualiza los marcadores de drones en el mapa."""
+    def _apply_pending_telemetry(self):
+        """Refresca panel y mapa con los registros pendientes (en el despachador)."""
+        with self._pending_lock:
+            pending = self._pending_telemetry
+            self._pending_telemetry = {}
+        if not pending:
+            return
+        
+        records = list(pending.values())
+        self.telemetry_panel.update_batch(records)
+        self._update_map_drones(records)
+        if self.map_view:
+            self.map_view.update_drones(records)
+    
+    def remove_drone(self, drone_id: str):
+        """
+        Retira un dron de la flota y de la UI (desde cualquier hilo).
+        
+        Args:
+            drone_id: ID del dron retirado
+        """
+        with self._pending_lock:
+            self._pending_telemetry.pop(drone_id, None)
+        if self.fleet_state.remove(drone_id):
+            self._dispatch(self._apply_drone_removal, drone_id)
+    
+    def set_drone_stale(self, drone_id: str, stale: bool):
+        """
+        Marca un dron como obsoleto o activo en el panel y el mapa (desde cualquier hilo).
+        
+        Args:
+            drone_id: ID del dron
+            stale: True si dejó de informar
+        """
+        if self.map_view:
+            self.map_view.set_drone_stale(drone_id, stale)
+        self._dispatch(self.telemetry_panel.set_drone_stale, drone_id, stale)
+    
+    def _apply_drone_removal(self, drone_id: str):
+        """Quita el dron del panel y del mapa (en el despachador)."""
+        self.telemetry_panel.remove_drone(drone_id)
+        self._remove_map_drone_row(drone_id)
+        if self.map_view:
+            self.map_view.remove_drone(drone_id)
+    
+    def _update_map_drones(self, records: Optional[List[TelemetrySchema]] = None):
+        """
+        Actualiza el resumen de posiciones de drones del mapa.
+        
+        Cada dron tiene una fila que se crea una vez; solo se publican las
+        filas cuyos valores mostrados (ya redondeados) cambian.
+        
+        Args:
+            records: Registros que cambiaron (None = sincronizar con el almacén de flota)
+        """
         if not self.page or not self.drone_positions_container:
             return
         
         # Verificar que el contenedor esté en la página antes de actualizar
-        try:
-            # Intentar acceder a la página del contenedor
-            if not hasattr(self.drone_positions_container, '_Control__page') or self.drone_positions_container._Control__page is None:
-                return
-        except:
+        if self.drone_positions_container.page is None:
             return
         
-        drones = self.telemetry_panel.drones
-        self.drone_positions_container.content.controls.clear()
-        
-        # Asegurar que siempre tengamos colores válidos
-        if self.page:
-            text_color = get_text_color(self.page)
-            text_secondary = get_text_secondary_color(self.page)
-        else:
-            # Fallback para cuando no hay página (modo claro por defecto)
-            text_color = "#000000"  # Negro para modo claro
-            text_secondary = GREY_600  # Gris oscuro para modo claro
-        for drone_id, telemetry in drones.items():
-            battery = telemetry.get("battery", 0.0)
-            battery_color = (
-                GREEN if battery > 50
-                else AMBER if battery > 20
-                else RED
-            )
+        rows = self._drone_rows
+        controls = self.drone_positions_container.content.controls
+        structure_changed = False
+        if records is None:
+            records = list(self.fleet_state.records().values())
+            current = {telemetry.drone_id for telemetry in records}
+            for drone_id in [drone_id for drone_id in rows if drone_id not in current]:
+                controls.remove(rows.pop(drone_id).control)
+                structure_changed = True
+        
+        if self._refresh_summary_colors() and rows:
+            # Cambió el tema: reestilar todas las filas
+            for row in rows.values():
+                row.apply_colors(*self._summary_colors)
+            structure_changed = True
+        text_color, text_secondary = self._summary_colors
             
-            self.drone_positions_container.content.controls.append(
-                ft.Container(
-                    content=ft.Row(
-                        controls=[
-                            ft.Icon(ft.Icons.FLIGHT_TAKEOFF, size=16, color=GREEN),
-                            ft.Text(drone_id, size=11, weight=ft.FontWeight.BOLD, color=text_color),
-                            ft.Text(
-                                f"Batería: {battery:.1f}%",
-                                size=10,
-                                color=battery_color,
-                            ),
-                            ft.Text(
-                                f"Alt: {telemetry.get('altitude', 0):.1f}m",
-                                size=10,
-                                color=text_color,
-                            ),
-                            ft.Text(
-                                f"Pos: {telemetry.get('latitude', 0):.4f}, {telemetry.get('longitude', 0):.4f}",
-                                size=9,
-                                color=text_secondary,
-                            ),
-                        ],
-                        spacing=5,
-                    ),
-                    padding=5,
-                )
-            )
-        
-        self.drone_positions_container.update()
+        changed: List[ft.Control] = []
+        for telemetry in records:
+            drone_id = telemetry.drone_id
+            if not drone_id:
+                continue
+            row = rows.get(drone_id)
+            if row is None:
+                row = rows[drone_id] = _DroneSummaryRow(drone_id, text_color, text_secondary)
+                controls.append(row.control)
+                structure_changed = True
+            if row.update(telemetry):
+                changed.append(row.control)
+        
+        if structure_changed:
+            commit(self.dispatcher, self.drone_positions_container)
+        elif changed:
+            commit(self.dispatcher, *changed)
+    
+    def _remove_map_drone_row(self, drone_id: str):
+        """Quita la fila de un dron del resumen de posiciones."""
+        row = self._drone_rows.pop(drone_id, None)
+        if row is None or not self.drone_positions_container:
+            return
+        self.drone_positions_container.content.controls.remove(row.control)
+        if self.drone_positions_container.page is not None:
+            commit(self.dispatcher, self.drone_positions_container)
+    
+    def _refresh_summary_colors(self) -> bool:
+        """Recalcula los colores del resumen si cambió el tema; devuelve True si cambiaron."""
+        theme = self.page.theme_mode
+        if self._summary_colors is not None and theme == self._summary_theme:
+            return False
+        self._summary_theme = theme
+        colors = (get_text_color(self.page), get_text_secondary_color(self.page))
+        if colors == self._summary_colors:
+            return False
+        self._summary_colors = colors
+        return True
     
     def _setup_pubsub(self):
         """Configura suscripciones pub/sub para actualizaciones en tiempo real."""
@@ -1128,17 +1159,82 @@ class MainApp:
         # Suscribirse a actualizaciones de telemetría
         def on_telemetry(message):
             if message.get("action") == "telemetry_update":
-                self.update_telemetry(message.get("telemetry", {}))
+                self.update_telemetry(TelemetrySchema.from_dict(message.get("telemetry", {})))
         
         # Suscribirse a actualizaciones de POI
         def on_poi(message):
             action = message.get("action")
             if action == "poi_created":
-                self.poi_manager.add_poi(message.get("poi", {}))
-                self._update_map_pois()
+                self._dispatch(self.poi_manager.add_poi, message.get("poi", {}))
+                self._dispatch(self._add_map_poi_row, message.get("poi", {}))
             elif action == "poi_deleted":
-                self.poi_manager.remove_poi(message.get("poi_id", ""))
-                self._update_map_pois()
+                self._dispatch(self.poi_manager.remove_poi, message.get("poi_id", ""))
+                self._dispatch(self._remove_map_poi_row, message.get("poi_id", ""))
         
         # Nota: El pub/sub de Flet funciona de manera diferente - lo manejaremos en el loop principal
         # Por ahora, las actualizaciones vienen directamente del gestor de drones
+
+
+class _DroneSummaryRow:
+    """
+    Fila del resumen de posiciones de un dron.
+    
+    Guarda los textos ya formateados; update() solo modifica los controles
+    si algún valor cambia tras el redondeo de la pantalla.
+    """
+    
+    __slots__ = ("control", "id_text", "battery_text", "altitude_text", "position_text", "values")
+    
+    def __init__(self, drone_id: str, text_color: str, text_secondary: str):
+        """
+        Construye la fila (sin valores).
+        
+        Args:
+            drone_id: ID del dron
+            text_color: Color del texto principal
+            text_secondary: Color del texto secundario
+        """
+        self.id_text = ft.Text(drone_id, size=11, weight=ft.FontWeight.BOLD, color=text_color)
+        self.battery_text = ft.Text("", size=10)
+        self.altitude_text = ft.Text("", size=10, color=text_color)
+        self.position_text = ft.Text("", size=9, color=text_secondary)
+        self.values: tuple = ()
+        self.control = ft.Container(
+            content=ft.Row(
+                controls=[
+                    ft.Icon(ft.Icons.FLIGHT_TAKEOFF, size=16, color=GREEN),
+                    self.id_text,
+                    self.battery_text,
+                    self.altitude_text,
+                    self.position_text,
+                ],
+                spacing=5,
+            ),
+            padding=5,
+        )
+    
+    def update(self, telemetry: TelemetrySchema) -> bool:
+        """
+        Aplica un registro de telemetría.
+        
+        Returns:
+            True si cambió algún valor mostrado
+        """
+        battery = telemetry.battery
+        values = (
+            f"Batería: {battery:.1f}%",
+            GREEN if battery > 50 else AMBER if battery > 20 else RED,
+            f"Alt: {telemetry.altitude:.1f}m",
+            f"Pos: {telemetry.latitude:.4f}, {telemetry.longitude:.4f}",
+        )
+        if values == self.values:
+            return False
+        self.values = values
+        self.battery_text.value, self.battery_text.color, self.altitude_text.value, self.position_text.value = values
+        return True
+    
+    def apply_colors(self, text_color: str, text_secondary: str):
+        """Aplica los colores del tema actual."""
+        self.id_text.color = text_color
+        self.altitude_text.color = text_color
+        self.position_text.color = text_secondary
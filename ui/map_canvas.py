@@ -0,0 +1,481 @@
+"""
+Mapa dibujado en un canvas de Flet.
+Alternativa al mapa HTML cuando WebView no está disponible: drones, POIs y
+zonas sobre una proyección Web Mercator, con desplazamiento y zoom.
+"""
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+import flet as ft
+import flet.canvas as cv
+from backend.schemas import TelemetrySchema
+from backend.fleet_state import FleetStateStore
+from common.colors import RED, GREEN, BLUE, AMBER, GREY, GREY_200, GREY_600, get_text_secondary_color
+from ui.dispatcher import UIDispatcher, commit
+from ui.poi_manager import POI_TYPE_COLORS
+
+
+# Tamaño de tesela de Web Mercator (píxeles del mundo a zoom 0)
+TILE_SIZE = 256
+MIN_ZOOM = 2.0
+MAX_ZOOM = 19.0
+# Zoom a partir del cual se dibujan las etiquetas de los drones
+LABEL_MIN_ZOOM = 14.0
+# Margen (píxeles) fuera de la vista en el que las figuras siguen visibles
+CULL_MARGIN = 20.0
+
+DRONE_RADIUS = 5
+POI_SIZE = 10
+
+
+def mercator(lat: float, lon: float) -> Tuple[float, float]:
+    """
+    Proyecta una coordenada a Web Mercator normalizado.
+    
+    Args:
+        lat: Latitud en grados
+        lon: Longitud en grados
+    
+    Returns:
+        Tupla (u, v) en [0, 1] (v crece hacia el sur)
+    """
+    siny = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    return (lon + 180.0) / 360.0, 0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)
+
+
+def inverse_mercator(u: float, v: float) -> Tuple[float, float]:
+    """Convierte Web Mercator normalizado a (latitud, longitud) en grados."""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * v)))), u * 360.0 - 180.0
+
+
+class _DroneShape:
+    """Figuras de un dron y los últimos valores dibujados."""
+    
+    __slots__ = ("circle", "label", "drawn")
+    
+    def __init__(self, drone_id: str, label_color: str):
+        self.circle = cv.Circle(0, 0, DRONE_RADIUS, ft.Paint(color=GREEN), visible=False)
+        self.label = cv.Text(0, 0, drone_id, ft.TextStyle(size=10, color=label_color), visible=False)
+        self.drawn: tuple = ()
+
+
+class MapCanvas:
+    """
+    Vista de mapa en un canvas.
+    
+    Cada dron, POI y zona tiene sus propias figuras, creadas una vez. Los
+    cambios solo marcan entidades como sucias; el redibujado se hace en el
+    despachador de UI (como máximo una vez por frame) y solo publica las
+    figuras cuyos píxeles, color o visibilidad cambian. Desplazar o hacer
+    zoom marca todo como sucio; las figuras fuera de la vista se ocultan.
+    """
+    
+    def __init__(
+        self,
+        center_lat: float,
+        center_lon: float,
+        zoom: float = 13,
+        fleet_state: Optional[FleetStateStore] = None,
+        page: Optional[ft.Page] = None,
+        dispatcher: Optional[UIDispatcher] = None,
+        on_click: Optional[Callable[[float, float], None]] = None,
+        width: float = 800,
+        height: float = 600
+    ):
+        """
+        Inicializa el canvas.
+        
+        Args:
+            center_lat: Latitud del centro inicial
+            center_lon: Longitud del centro inicial
+            zoom: Nivel de zoom inicial
+            fleet_state: Almacén de flota del que se leen las posiciones
+            page: Instancia de página Flet para acceso al tema
+            dispatcher: Despachador de UI que publica los cambios (None = actualizar directamente)
+            on_click: Callback al hacer clic en el mapa (lat, lon)
+            width: Ancho estimado hasta el primer evento de tamaño
+            height: Alto estimado hasta el primer evento de tamaño
+        """
+        self.fleet_state = fleet_state if fleet_state is not None else FleetStateStore()
+        self.page = page
+        self.dispatcher = dispatcher
+        self.on_click = on_click
+        
+        # Vista: centro en Mercator normalizado, zoom y tamaño del canvas
+        self._center = mercator(center_lat, center_lon)
+        self._zoom = min(max(float(zoom), MIN_ZOOM), MAX_ZOOM)
+        self._size = (float(width), float(height))
+        self._lock = threading.Lock()
+        
+        # Figuras por entidad
+        self._drones: Dict[str, _DroneShape] = {}
+        self._pois: Dict[str, Tuple[cv.Rect, tuple]] = {}
+        self._zones: Dict[str, Tuple[cv.Rect, cv.Rect, tuple]] = {}
+        self._poi_data: Dict[str, Dict[str, Any]] = {}
+        self._zone_data: Dict[str, Dict[str, Any]] = {}
+        self.stale_ids: Set[str] = set()
+        
+        # Entidades pendientes de redibujar
+        self._dirty_drones: Set[str] = set()
+        self._dirty_pois: Set[str] = set()
+        self._dirty_zones: Set[str] = set()
+        self._view_dirty = True
+        self._structure_dirty = False
+        
+        self._label_color = GREY_600
+        self._paints: Dict[Tuple[str, bool], ft.Paint] = {}
+        
+        self.canvas = cv.Canvas(
+            shapes=[],
+            expand=True,
+            resize_interval=100,
+            on_resize=self._on_resize,
+        )
+        self.control = self._create_control()
+        
+        # Contadores de estadísticas
+        self.frame_count = 0
+        self.shape_updates = 0
+        self.last_frame_ms = 0.0
+    
+    def _create_control(self) -> ft.Control:
+        """Crea el canvas con sus gestos y los botones de zoom."""
+        return ft.Stack(
+            controls=[
+                ft.Container(bgcolor=GREY_200, expand=True),
+                ft.GestureDetector(
+                    content=self.canvas,
+                    drag_interval=30,
+                    on_pan_update=self._on_pan,
+                    on_scroll=self._on_scroll,
+                    on_tap_up=self._on_tap,
+                    expand=True,
+                ),
+                ft.Container(
+                    content=ft.Column(
+                        controls=[
+                            ft.IconButton(ft.Icons.ADD, tooltip="Acercar", on_click=lambda e: self.zoom_by(1)),
+                            ft.IconButton(ft.Icons.REMOVE, tooltip="Alejar", on_click=lambda e: self.zoom_by(-1)),
+                            ft.IconButton(ft.Icons.CENTER_FOCUS_STRONG, tooltip="Centrar en la flota", on_click=lambda e: self.fit_fleet()),
+                        ],
+                        spacing=0,
+                        tight=True,
+                    ),
+                    right=5,
+                    top=5,
+                ),
+            ],
+            expand=True,
+        )
+    
+    # --- Datos -------------------------------------------------------------
+    
+    def update_drones(self, records: List[TelemetrySchema]):
+        """Marca drones para redibujar (sus posiciones se leen del almacén de flota)."""
+        with self._lock:
+            self._dirty_drones.update(t.drone_id for t in records if t.drone_id)
+        self._schedule()
+    
+    def remove_drone(self, drone_id: str):
+        """Quita un dron del mapa."""
+        with self._lock:
+            self.stale_ids.discard(drone_id)
+            self._dirty_drones.add(drone_id)
+        self._schedule()
+    
+    def set_drone_stale(self, drone_id: str, stale: bool):
+        """Atenúa (o restaura) un dron sin telemetría reciente."""
+        with self._lock:
+            if stale:
+                self.stale_ids.add(drone_id)
+            else:
+                self.stale_ids.discard(drone_id)
+            self._dirty_drones.add(drone_id)
+        self._schedule()
+    
+    def set_pois(self, pois: List[Dict[str, Any]]):
+        """Agrega o actualiza varios POIs."""
+        with self._lock:
+            for poi in pois:
+                poi_id = poi.get("id")
+                if poi_id:
+                    self._poi_data[poi_id] = poi
+                    self._dirty_pois.add(poi_id)
+        self._schedule()
+    
+    def remove_poi(self, poi_id: str):
+        """Quita un POI del mapa."""
+        with self._lock:
+            self._poi_data.pop(poi_id, None)
+            self._dirty_pois.add(poi_id)
+        self._schedule()
+    
+    def set_zone(self, zone: Dict[str, Any]):
+        """Agrega o actualiza una zona."""
+        zone_id = zone.get("id")
+        if not zone_id:
+            return
+        with self._lock:
+            self._zone_data[zone_id] = zone
+            self._dirty_zones.add(zone_id)
+        self._schedule()
+    
+    def remove_zone(self, zone_id: str):
+        """Quita una zona del mapa."""
+        with self._lock:
+            self._zone_data.pop(zone_id, None)
+            self._dirty_zones.add(zone_id)
+        self._schedule()
+    
+    # --- Vista -------------------------------------------------------------
+    
+    def pan(self, dx: float, dy: float):
+        """Desplaza la vista (píxeles de pantalla)."""
+        with self._lock:
+            scale = self._scale()
+            u, v = self._center
+            self._center = (u - dx / scale, min(max(v - dy / scale, 0.0), 1.0))
+            self._view_dirty = True
+        self._schedule()
+    
+    def zoom_by(self, delta: float, x: Optional[float] = None, y: Optional[float] = None):
+        """
+        Cambia el zoom manteniendo fijo un punto de la pantalla.
+        
+        Args:
+            delta: Niveles de zoom (positivo = acercar)
+            x: Coordenada x del punto fijo (None = centro)
+            y: Coordenada y del punto fijo (None = centro)
+        """
+        with self._lock:
+            width, height = self._size
+            x = width / 2 if x is None else x
+            y = height / 2 if y is None else y
+            u, v = self._screen_to_mercator(x, y)
+            self._zoom = min(max(self._zoom + delta, MIN_ZOOM), MAX_ZOOM)
+            scale = self._scale()
+            self._center = (u - (x - width / 2) / scale, v - (y - height / 2) / scale)
+            self._view_dirty = True
+        self._schedule()
+    
+    def fit_fleet(self):
+        """Centra la vista en la flota con el zoom que la abarca."""
+        box = self.fleet_state.bounding_box()
+        if box is None:
+            return
+        west, north = mercator(box["north"], box["west"])
+        east, south = mercator(box["south"], box["east"])
+        with self._lock:
+            width, height = self._size
+            span = max(east - west, south - north, 1e-9)
+            zoom = math.log2(min(width, height) * 0.8 / (span * TILE_SIZE))
+            self._zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+            self._center = ((west + east) / 2, (north + south) / 2)
+            self._view_dirty = True
+        self._schedule()
+    
+    def screen_to_latlon(self, x: float, y: float) -> Tuple[float, float]:
+        """Convierte un punto del canvas a (latitud, longitud)."""
+        with self._lock:
+            return inverse_mercator(*self._screen_to_mercator(x, y))
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Obtiene las figuras dibujadas y los contadores de redibujado."""
+        return {
+            "drones": len(self._drones),
+            "pois": len(self._pois),
+            "zones": len(self._zones),
+            "zoom": round(self._zoom, 2),
+            "frames": self.frame_count,
+            "shape_updates": self.shape_updates,
+            "last_frame_ms": round(self.last_frame_ms, 2),
+        }
+    
+    def _scale(self) -> float:
+        """Píxeles de pantalla por unidad de Mercator normalizado (con el lock tomado)."""
+        return TILE_SIZE * 2.0 ** self._zoom
+    
+    def _screen_to_mercator(self, x: float, y: float) -> Tuple[float, float]:
+        """Convierte un punto del canvas a Mercator normalizado (con el lock tomado)."""
+        scale = self._scale()
+        width, height = self._size
+        u, v = self._center
+        return u + (x - width / 2) / scale, v + (y - height / 2) / scale
+    
+    # --- Eventos (hilo de eventos de Flet) ---------------------------------
+    
+    def _on_resize(self, e: cv.CanvasResizeEvent):
+        with self._lock:
+            self._size = (float(e.width or 1), float(e.height or 1))
+            self._view_dirty = True
+        self._schedule()
+    
+    def _on_pan(self, e: ft.DragUpdateEvent):
+        if e.delta_x or e.delta_y:
+            self.pan(e.delta_x or 0.0, e.delta_y or 0.0)
+    
+    def _on_scroll(self, e: ft.ScrollEvent):
+        if e.scroll_delta_y:
+            self.zoom_by(-0.5 if e.scroll_delta_y > 0 else 0.5, e.local_x, e.local_y)
+    
+    def _on_tap(self, e: ft.TapEvent):
+        if self.on_click and e.local_x is not None:
+            lat, lon = self.screen_to_latlon(e.local_x, e.local_y)
+            self.on_click(lat, lon)
+    
+    # --- Redibujado --------------------------------------------------------
+    
+    def _schedule(self):
+        """Pide un redibujado (uno por frame del despachador)."""
+        if self.dispatcher:
+            self.dispatcher.submit_latest(("map-canvas", id(self)), self._flush)
+        else:
+            self._flush()
+    
+    def _paint(self, color: str, faded: bool = False) -> ft.Paint:
+        """Pinturas compartidas por color."""
+        paint = self._paints.get((color, faded))
+        if paint is None:
+            paint = self._paints[(color, faded)] = ft.Paint(
+                color=ft.Colors.with_opacity(0.4, color) if faded else color
+            )
+        return paint
+    
+    def _flush(self):
+        """Redibuja las entidades sucias y publica solo las figuras que cambiaron."""
+        start = time.perf_counter()
+        with self._lock:
+            view_dirty = self._view_dirty
+            dirty_drones = self._dirty_drones
+            dirty_pois = self._dirty_pois
+            dirty_zones = self._dirty_zones
+            self._dirty_drones, self._dirty_pois, self._dirty_zones = set(), set(), set()
+            self._view_dirty = False
+            scale = self._scale()
+            width, height = self._size
+            cu, cvv = self._center
+            zoom = self._zoom
+            stale_ids = set(self.stale_ids)
+            pois = dict(self._poi_data)
+            zones = dict(self._zone_data)
+        if not (view_dirty or dirty_drones or dirty_pois or dirty_zones):
+            return
+        if self.page:
+            self._label_color = get_text_secondary_color(self.page)
+        
+        def to_screen(u: float, v: float) -> Tuple[float, float]:
+            return round((u - cu) * scale + width / 2, 1), round((v - cvv) * scale + height / 2, 1)
+        
+        def on_screen(x: float, y: float) -> bool:
+            return -CULL_MARGIN <= x <= width + CULL_MARGIN and -CULL_MARGIN <= y <= height + CULL_MARGIN
+        
+        changed: List[ft.Control] = []
+        
+        # Drones: proyección vectorizada sobre las columnas del almacén
+        ids, columns = self.fleet_state.snapshot(("latitude", "longitude", "battery"))
+        rows = {drone_id: i for i, drone_id in enumerate(ids)}
+        lat = np.clip(np.sin(np.radians(columns["latitude"])), -0.9999, 0.9999)
+        xs = np.round(((columns["longitude"] + 180.0) / 360.0 - cu) * scale + width / 2, 1)
+        ys = np.round((0.5 - np.log((1 + lat) / (1 - lat)) / (4 * np.pi) - cvv) * scale + height / 2, 1)
+        battery = columns["battery"]
+        
+        targets = set(rows) | set(self._drones) if view_dirty else dirty_drones
+        show_labels = zoom >= LABEL_MIN_ZOOM
+        for drone_id in targets:
+            row = rows.get(drone_id)
+            shape = self._drones.get(drone_id)
+            if row is None:
+                if shape is not None:
+                    del self._drones[drone_id]
+                    self._structure_dirty = True
+                continue
+            if shape is None:
+                shape = self._drones[drone_id] = _DroneShape(drone_id, self._label_color)
+                self._structure_dirty = True
+            x, y = float(xs[row]), float(ys[row])
+            level = battery[row]
+            color = GREEN if level > 50 else AMBER if level > 20 else RED
+            visible = on_screen(x, y)
+            drawn = (x, y, color, drone_id in stale_ids, visible, visible and show_labels)
+            if drawn == shape.drawn:
+                continue
+            shape.drawn = drawn
+            shape.circle.x, shape.circle.y = x, y
+            shape.circle.paint = self._paint(color, drone_id in stale_ids)
+            shape.circle.visible = visible
+            shape.label.x, shape.label.y = x + DRONE_RADIUS + 2, y - 6
+            shape.label.visible = visible and show_labels
+            changed.extend((shape.circle, shape.label))
+        
+        # POIs
+        for poi_id in (set(pois) | set(self._pois) if view_dirty else dirty_pois):
+            poi = pois.get(poi_id)
+            entry = self._pois.get(poi_id)
+            if poi is None:
+                if entry is not None:
+                    del self._pois[poi_id]
+                    self._structure_dirty = True
+                continue
+            if entry is None:
+                entry = (cv.Rect(0, 0, POI_SIZE, POI_SIZE, paint=self._paint(GREY), visible=False), ())
+                self._structure_dirty = True
+            rect = entry[0]
+            x, y = to_screen(*mercator(poi.get("latitude", 0), poi.get("longitude", 0)))
+            color = POI_TYPE_COLORS.get(poi.get("type", "other"), GREY)
+            drawn = (x, y, color, on_screen(x, y))
+            self._pois[poi_id] = (rect, drawn)
+            if drawn != entry[1]:
+                rect.x, rect.y = x - POI_SIZE / 2, y - POI_SIZE / 2
+                rect.paint = self._paint(color)
+                rect.visible = drawn[3]
+                changed.append(rect)
+        
+        # Zonas (relleno translúcido y borde)
+        for zone_id in (set(zones) | set(self._zones) if view_dirty else dirty_zones):
+            zone = zones.get(zone_id)
+            entry = self._zones.get(zone_id)
+            if zone is None:
+                if entry is not None:
+                    del self._zones[zone_id]
+                    self._structure_dirty = True
+                continue
+            if entry is None:
+                entry = (
+                    cv.Rect(0, 0, 0, 0, paint=ft.Paint(color=ft.Colors.with_opacity(0.15, BLUE))),
+                    cv.Rect(0, 0, 0, 0, paint=ft.Paint(color=BLUE, stroke_width=2, style=ft.PaintingStyle.STROKE)),
+                    (),
+                )
+                self._structure_dirty = True
+            fill, border = entry[0], entry[1]
+            bounds = zone.get("bounds", {})
+            x1, y1 = to_screen(*mercator(bounds.get("north", 0), bounds.get("west", 0)))
+            x2, y2 = to_screen(*mercator(bounds.get("south", 0), bounds.get("east", 0)))
+            visible = x2 >= -CULL_MARGIN and x1 <= width + CULL_MARGIN and y2 >= -CULL_MARGIN and y1 <= height + CULL_MARGIN
+            drawn = (x1, y1, x2, y2, visible)
+            self._zones[zone_id] = (fill, border, drawn)
+            if drawn != entry[2]:
+                for rect in (fill, border):
+                    rect.x, rect.y = x1, y1
+                    rect.width, rect.height = max(x2 - x1, 1.0), max(y2 - y1, 1.0)
+                    rect.visible = visible
+                changed.extend((fill, border))
+        
+        # Orden de capas: zonas, POIs y drones encima
+        if self._structure_dirty:
+            self._structure_dirty = False
+            shapes: List[cv.Shape] = []
+            for fill, border, _ in self._zones.values():
+                shapes.extend((fill, border))
+            shapes.extend(rect for rect, _ in self._pois.values())
+            for shape in self._drones.values():
+                shapes.extend((shape.circle, shape.label))
+            self.canvas.shapes = shapes
+            changed = [self.canvas]
+        
+        self.frame_count += 1
+        self.shape_updates += len(changed)
+        self.last_frame_ms = (time.perf_counter() - start) * 1000.0
+        if changed and self.canvas.page is not None:
+            commit(self.dispatcher, *changed)
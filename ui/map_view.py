@@ -10,10 +10,102 @@ import json
 from typing import Dict, List, Any, Optional, Callable
 from common.constants import POIType
 from common.colors import (
-    GREY_200, GREY_600, RED, GREEN, BLUE, AMBER, GREY,
+    GREY_200, GREY_600,
     get_background_color, get_text_color, get_text_secondary_color
 )
 from backend.data_server import TelemetryServer
+from backend.schemas import TelemetrySchema
+from backend.fleet_state import FleetStateStore
+from common.dead_reckoning import DeadReckoningTracker
+from common.runtime import AsyncRuntime
+from ui.dispatcher import UIDispatcher, commit
+from ui.map_canvas import MapCanvas
+
+
+# Dead reckoning en el navegador (misma lógica que common/dead_reckoning.py):
+# los marcadores se extrapolan entre muestras y se corrigen sin saltos.
+DEAD_RECKONING_JS = """
+        window.deadReckoning = window.deadReckoning || {
+            horizon: __HORIZON__,
+            correctionMs: __CORRECTION_MS__,
+            tracks: {},
+            getMarker: null,
+            running: false
+        };
+        
+        function drExtrapolate(track, now) {
+            var dr = window.deadReckoning;
+            var dt = Math.min(Math.max((now - track.sampleTime) / 1000, 0), dr.horizon);
+            var rad = track.heading * Math.PI / 180;
+            var distance = track.velocity * dt;
+            var lat = track.lat + distance * Math.cos(rad) / 111320;
+            var lon = track.lon + distance * Math.sin(rad) / (111320 * Math.cos(track.lat * Math.PI / 180));
+            return [lat, lon];
+        }
+        
+        function drPosition(track, now) {
+            var dr = window.deadReckoning;
+            var p = drExtrapolate(track, now);
+            var w = dr.correctionMs > 0 ? Math.max(0, 1 - (now - track.correctedAt) / dr.correctionMs) : 0;
+            return [p[0] + track.offLat * w, p[1] + track.offLon * w];
+        }
+        
+        // Registra una muestra real y devuelve la posición a mostrar ahora
+        window.drSample = function(droneId, lat, lon, heading, velocity, timestamp) {
+            var dr = window.deadReckoning;
+            if (dr.horizon <= 0) {
+                return [lat, lon];
+            }
+            var now = Date.now();
+            var sampleTime = timestamp ? Math.min(timestamp * 1000, now) : now;
+            var track = dr.tracks[droneId];
+            if (track && track.sampleTime === sampleTime) {
+                return drPosition(track, now);  // Misma muestra (polling repetido)
+            }
+            var next = {
+                lat: lat, lon: lon, heading: heading || 0, velocity: velocity || 0,
+                sampleTime: sampleTime, offLat: 0, offLon: 0, correctedAt: now
+            };
+            if (track) {
+                // Partir desde la posición mostrada y absorber la diferencia gradualmente
+                var shown = drPosition(track, now);
+                var predicted = drExtrapolate(next, now);
+                next.offLat = shown[0] - predicted[0];
+                next.offLon = shown[1] - predicted[1];
+            }
+            dr.tracks[droneId] = next;
+            return drPosition(next, now);
+        };
+        
+        window.drForget = function(droneId) {
+            delete window.deadReckoning.tracks[droneId];
+        };
+        
+        // Mueve los marcadores a ~20 fps independientemente de la tasa de telemetría
+        window.drStart = function(getMarker) {
+            var dr = window.deadReckoning;
+            dr.getMarker = getMarker;
+            if (dr.running || dr.horizon <= 0) {
+                return;
+            }
+            dr.running = true;
+            var lastFrame = 0;
+            function frame(ts) {
+                if (ts - lastFrame >= 50) {
+                    lastFrame = ts;
+                    var now = Date.now();
+                    for (var id in dr.tracks) {
+                        var marker = dr.getMarker(id);
+                        if (marker) {
+                            marker.setLatLng(drPosition(dr.tracks[id], now));
+                        }
+                    }
+                }
+                requestAnimationFrame(frame);
+            }
+            requestAnimationFrame(frame);
+        };
+"""
 
 
 class MapView:
@@ -30,7 +122,12 @@ class MapView:
         on_poi_click: Optional[Callable[[str], None]] = None,
         on_map_click: Optional[Callable[[float, float], None]] = None,
         on_zone_created: Optional[Callable[[Dict[str, Any]], None]] = None,
-        page: Optional[ft.Page] = None
+        page: Optional[ft.Page] = None,
+        fleet_state: Optional[FleetStateStore] = None,
+        dead_reckoning_horizon: float = 2.0,
+        dead_reckoning_correction: float = 0.5,
+        dispatcher: Optional[UIDispatcher] = None,
+        runtime: Optional[AsyncRuntime] = None
     ):
         """
         Inicializa la vista de mapa.
@@ -43,6 +140,11 @@ class MapView:
             on_map_click: Callback cuando se hace clic en el mapa (para crear POIs)
             on_zone_created: Callback cuando se crea una zona de interés
             page: Instancia de página Flet para acceso al tema
+            fleet_state: Almacén compartido con el estado actual de la flota
+            dead_reckoning_horizon: Segundos máximos de extrapolación de posiciones (0 = desactivado)
+            dead_reckoning_correction: Segundos para absorber la corrección de una muestra nueva
+            dispatcher: Despachador de UI que publica los cambios (None = actualizar directamente)
+            runtime: Runtime asíncrono donde se ejecuta el servidor de datos (None = uno propio)
         """
         self.initial_lat = initial_lat
         self.initial_lon = initial_lon
@@ -51,20 +153,28 @@ class MapView:
         self.on_map_click = on_map_click
         self.on_zone_created = on_zone_created
         self.page = page
+        self.dead_reckoning_horizon = dead_reckoning_horizon
+        self.dead_reckoning_correction = dead_reckoning_correction
+        self.dispatcher = dispatcher
         
-        self.drones: Dict[str, Dict[str, Any]] = {}
+        self.fleet_state = fleet_state if fleet_state is not None else FleetStateStore()
         self.pois: Dict[str, Dict[str, Any]] = {}
         self.zones: Dict[str, Dict[str, Any]] = {}
-        
-        # Polling para leer eventos del mapa desde localStorage
-        self.last_event_timestamp = 0
+        # Mapa en canvas (solo con la vista alternativa)
+        self.map_canvas: Optional[MapCanvas] = None
         
         # Archivo temporal para el mapa HTML
         self.temp_file = None
         self.map_html_path = None
         
         # Servidor HTTP para servir datos de telemetría
-        self.telemetry_server = TelemetryServer(port=8765)
+        self.telemetry_server = TelemetryServer(
+            port=8765,
+            fleet_state=self.fleet_state,
+            dead_reckoning=DeadReckoningTracker(dead_reckoning_horizon, dead_reckoning_correction),
+            runtime=runtime,
+            on_map_event=self._on_map_event
+        )
         self.telemetry_server.start()
         
         # Crear mapa inicial
@@ -81,6 +191,31 @@ class MapView:
             self.map_view = self._create_webview()
             self.fallback_view = None
     
+    def _on_map_event(self, event: Dict[str, Any]):
+        """
+        Recibe un evento del mapa enviado por JavaScript al servidor de datos.
+        Se ejecuta en el loop del servidor: los callbacks no deben bloquear.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        event_type = event.get('type')
+        if event_type == 'map_click':
+            # Clic en mapa para crear POI
+            lat = event.get('lat')
+            lon = event.get('lon')
+            logger.info(f"Evento map_click recibido: lat={lat}, lon={lon}")
+            if lat and lon and self.on_map_click:
+                self.on_map_click(lat, lon)
+        elif event_type == 'zone_created':
+            # Zona creada
+            zone = event.get('zone')
+            logger.info(f"Evento zone_created recibido: {zone.get('id', 'unknown') if zone else 'None'}")
+            if zone and self.on_zone_created:
+                self.on_zone_created(zone)
+        else:
+            logger.debug(f"Evento del mapa ignorado: {event_type}")
+    
     def _create_map(self):
         """Crea el mapa HTML usando Folium o HTML/JavaScript puro."""
         try:
@@ -135,15 +270,15 @@ class MapView:
         """Genera HTML para OpenStreetMap con Leaflet."""
         # Serializar drones y POIs para JavaScript
         drones_js = []
-        for drone_id, telemetry in self.drones.items():
+        for drone_id, telemetry in self.fleet_state.records().items():
             drones_js.append({
                 'id': drone_id,
-                'lat': telemetry.get('latitude', 0),
-                'lon': telemetry.get('longitude', 0),
-                'heading': telemetry.get('heading', 0),
-                'battery': telemetry.get('battery', 100),
-                'altitude': telemetry.get('altitude', 0),
-                'velocity': telemetry.get('velocity', 0)
+                'lat': telemetry.latitude,
+                'lon': telemetry.longitude,
+                'heading': telemetry.heading,
+                'battery': telemetry.battery,
+                'altitude': telemetry.altitude,
+                'velocity': telemetry.velocity
             })
         
         pois_js = []
@@ -158,6 +293,7 @@ class MapView:
         
         drones_json = json.dumps(drones_js)
         pois_json = json.dumps(pois_js)
+        dead_reckoning_js = self._dead_reckoning_script()
         
         return f"""
 <!DOCTYPE html>
@@ -436,8 +572,10 @@ class MapView:
             }});
         }}
         
+{dead_reckoning_js}
+
         // Función para actualizar/agregar dron (versión mejorada)
-        window.updateDrone = function(droneId, lat, lon, heading, battery, altitude, velocity) {{
+        window.updateDrone = function(droneId, lat, lon, heading, battery, altitude, velocity, timestamp) {{
             // Validaciones iniciales
             if (!droneId || !lat || !lon || isNaN(lat) || isNaN(lon) || lat === 0 || lon === 0) {{
                 console.warn('updateDrone: Parámetros inválidos', {{droneId: droneId, lat: lat, lon: lon}});
@@ -472,11 +610,12 @@ class MapView:
             heading = heading || 0;
             battery = battery || 100;
             var batteryColor = battery > 50 ? '#4CAF50' : (battery > 20 ? '#FFC107' : '#F44336');
+            var position = window.drSample(droneId, lat, lon, heading, velocity, timestamp);
             
             try {{
                 if (droneMarkers[droneId]) {{
                     // Actualizar marcador existente
-                    droneMarkers[droneId].setLatLng([lat, lon]);
+                    droneMarkers[droneId].setLatLng(position);
                     var icon = createDroneIcon(batteryColor, heading);
                     droneMarkers[droneId].setIcon(icon);
                     droneMarkers[droneId].setPopupContent(
@@ -491,7 +630,7 @@ class MapView:
                     // Crear nuevo marcador
                     console.log('Creando nuevo marcador para', droneId, 'en', lat, lon);
                     var icon = createDroneIcon(batteryColor, heading);
-                    var marker = L.marker([lat, lon], {{icon: icon}}).addTo(map);
+                    var marker = L.marker(position, {{icon: icon}}).addTo(map);
                     marker.bindPopup(
                         '<b>Dron: ' + droneId + '</b><br>' +
                         'Batería: ' + battery.toFixed(1) + '%<br>' +
@@ -550,6 +689,7 @@ class MapView:
             if (droneMarkers[droneId]) {{
                 map.removeLayer(droneMarkers[droneId]);
                 delete droneMarkers[droneId];
+                window.drForget(droneId);
             }}
         }};
         
@@ -699,9 +839,14 @@ class MapView:
                                             drone.heading || 0,
                                             drone.battery || 100,
                                             drone.altitude || 0,
-                                            drone.velocity || 0
+                                            drone.velocity || 0,
+                                            drone.timestamp
                                         );
                                         droneCount++;
+                                        // Drones sin telemetría reciente: marcador atenuado
+                                        if (droneMarkers[droneId]) {{
+                                            droneMarkers[droneId].setOpacity(drone.stale ? 0.4 : 1.0);
+                                        }}
                                     }} else {{
                                         if (updateCount % 20 === 0) {{
                                             console.warn('Dron', droneId, 'tiene coordenadas inválidas:', lat, lon);
@@ -713,6 +858,12 @@ class MapView:
                         if (updateCount % 20 === 0) {{
                             console.log('Drones actualizados en mapa:', droneCount, 'de', droneIds.length);
                         }}
+                        // Quitar los drones que el servidor ya no reporta (eliminados u obsoletos)
+                        for (var knownId in droneMarkers) {{
+                            if (droneMarkers.hasOwnProperty(knownId) && !data.drones.hasOwnProperty(knownId)) {{
+                                window.removeDrone(knownId);
+                            }}
+                        }}
                     }}
                     
                     // Actualizar POIs
@@ -747,6 +898,9 @@ class MapView:
             window.mapObject = map;
             console.log('Mapa listo, iniciando polling del servidor');
             
+            // Animar marcadores entre muestras (dead reckoning)
+            window.drStart(function(id) {{ return droneMarkers[id]; }});
+            
             // Iniciar polling después de un pequeño delay
             setTimeout(function() {{
                 console.log('Iniciando polling del servidor en', apiUrl);
@@ -763,19 +917,27 @@ class MapView:
 </html>
         """
     
+    def _dead_reckoning_script(self) -> str:
+        """Obtiene el JavaScript de dead reckoning con los parámetros de esta vista."""
+        return (
+            DEAD_RECKONING_JS
+            .replace("__HORIZON__", str(float(self.dead_reckoning_horizon)))
+            .replace("__CORRECTION_MS__", str(int(self.dead_reckoning_correction * 1000)))
+        )
+    
     def _add_drones_to_folium_map(self, m):
         """Agrega marcadores de drones al mapa Folium."""
         import folium
         import logging
         logger = logging.getLogger(__name__)
         
-        for drone_id, telemetry in self.drones.items():
-            lat = telemetry.get('latitude', self.initial_lat)
-            lon = telemetry.get('longitude', self.initial_lon)
-            battery = telemetry.get('battery', 100)
-            altitude = telemetry.get('altitude', 0)
-            velocity = telemetry.get('velocity', 0)
-            heading = telemetry.get('heading', 0)
+        for drone_id, telemetry in self.fleet_state.records().items():
+            lat = telemetry.latitude
+            lon = telemetry.longitude
+            battery = telemetry.battery
+            altitude = telemetry.altitude
+            velocity = telemetry.velocity
+            heading = telemetry.heading
             
             # Validar coordenadas
             if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
@@ -858,6 +1020,8 @@ class MapView:
             with open(self.map_html_path, 'r', encoding='utf-8') as f:
                 html_content = f.read()
             
+            dead_reckoning_js = self._dead_reckoning_script()
+            
             # Buscar el cierre de </body> o </html>
             auto_refresh_script = f"""
         <script>
@@ -1302,7 +1466,9 @@ class MapView:
                 }});
             }}
             
-            window.updateDrone = function(droneId, lat, lon, heading, battery, altitude, velocity) {{
+{dead_reckoning_js}
+
+            window.updateDrone = function(droneId, lat, lon, heading, battery, altitude, velocity, timestamp) {{
                 // Validaciones iniciales
                 if (!droneId || !lat || !lon || isNaN(lat) || isNaN(lon) || lat === 0 || lon === 0) {{
                     console.warn('updateDrone: Parámetros inválidos', {{droneId: droneId, lat: lat, lon: lon}});
@@ -1337,11 +1503,12 @@ class MapView:
                 heading = heading || 0;
                 battery = battery || 100;
                 var batteryColor = battery > 50 ? '#4CAF50' : (battery > 20 ? '#FFC107' : '#F44336');
+                var position = window.drSample(droneId, lat, lon, heading, velocity, timestamp);
                 
                 try {{
                     if (window.droneMarkers[droneId]) {{
                         // Actualizar marcador existente
-                        window.droneMarkers[droneId].setLatLng([lat, lon]);
+                        window.droneMarkers[droneId].setLatLng(position);
                         var icon = createDroneIconFolium(batteryColor, heading);
                         window.droneMarkers[droneId].setIcon(icon);
                         window.droneMarkers[droneId].setPopupContent(
@@ -1356,7 +1523,7 @@ class MapView:
                         // Crear nuevo marcador
                         console.log('Creando nuevo marcador para', droneId, 'en', lat, lon);
                         var icon = createDroneIconFolium(batteryColor, heading);
-                        var marker = L.marker([lat, lon], {{icon: icon}}).addTo(mapObj);
+                        var marker = L.marker(position, {{icon: icon}}).addTo(mapObj);
                         marker.bindPopup(
                             '<b>Dron: ' + droneId + '</b><br>' +
                             'Batería: ' + battery.toFixed(1) + '%<br>' +
@@ -1470,9 +1637,14 @@ class MapView:
                                             drone.heading || 0,
                                             drone.battery || 100,
                                             drone.altitude || 0,
-                                            drone.velocity || 0
+                                            drone.velocity || 0,
+                                            drone.timestamp
                                         );
                                         droneCount++;
+                                        // Drones sin telemetría reciente: marcador atenuado
+                                        if (window.droneMarkers[droneId]) {{
+                                            window.droneMarkers[droneId].setOpacity(drone.stale ? 0.4 : 1.0);
+                                        }}
                                     }} else {{
                                         if (updateCount % 20 === 0) {{
                                             console.warn('Dron', droneId, 'tiene coordenadas inválidas:', lat, lon);
@@ -1484,6 +1656,14 @@ class MapView:
                         if (updateCount % 20 === 0) {{
                             console.log('Drones actualizados en mapa:', droneCount, 'de', droneIds.length);
                         }}
+                        // Quitar los drones que el servidor ya no reporta (eliminados u obsoletos)
+                        for (var knownId in window.droneMarkers) {{
+                            if (window.droneMarkers.hasOwnProperty(knownId) && !data.drones.hasOwnProperty(knownId)) {{
+                                window.droneMarkers[knownId].remove();
+                                delete window.droneMarkers[knownId];
+                                window.drForget(knownId);
+                            }}
+                        }}
                     }}
                     
                     // Actualizar POIs
@@ -1622,6 +1802,8 @@ class MapView:
                 // Iniciar polling después de un pequeño delay
                 setTimeout(function() {{
                     console.log('=== INICIANDO POLLING DEL SERVIDOR ===');
+                    // Animar marcadores entre muestras (dead reckoning)
+                    window.drStart(function(id) {{ return window.droneMarkers[id]; }});
                     console.log('URL del servidor:', apiUrl);
                     updateFromServer();
                     // Actualizar cada 1 segundo
@@ -1718,30 +1900,65 @@ class MapView:
         """Llamado cuando el mapa está listo."""
         pass
     
-    def update_drone(self, telemetry: Dict[str, Any]):
+    def update_drone(self, telemetry: TelemetrySchema):
         """
         Actualiza la posición del dron en el mapa.
-        Ahora solo actualiza el servidor HTTP, el JavaScript hace el polling.
+        El registro ya está en el almacén de flota compartido con el servidor HTTP;
+        el JavaScript hace el polling y actualiza los marcadores.
         
         Args:
-            telemetry: Diccionario de telemetría con datos del dron
+            telemetry: Registro de telemetría del dron
         """
         import logging
         logger = logging.getLogger(__name__)
         
-        drone_id = telemetry.get("drone_id")
+        drone_id = telemetry.drone_id
         if not drone_id:
             return
         
-        self.drones[drone_id] = telemetry
-        logger.debug(f"Actualizando dron {drone_id} en mapa: {len(self.drones)} drones totales")
+        logger.debug(f"Actualizando dron {drone_id} en mapa: {len(self.fleet_state)} drones totales")
         
-        # Actualizar servidor HTTP (el JavaScript hará polling y actualizará los marcadores)
-        self.telemetry_server.update_telemetry(telemetry)
+        # Si estamos usando fallback, redibujar el dron en el canvas
+        if self.map_canvas:
+            self.map_canvas.update_drones([telemetry])
+    
+    def update_drones(self, records: List[TelemetrySchema]):
+        """
+        Actualiza el mapa tras un lote de registros (un solo refresco).
         
-        # Si estamos usando fallback, actualizar vista alternativa siempre
-        if hasattr(self, 'drone_list'):
-            self._update_fallback_view()
+        Args:
+            records: Registros de telemetría del lote
+        """
+        if records and self.map_canvas:
+            self.map_canvas.update_drones(records)
+    
+    def remove_drone(self, drone_id: str):
+        """
+        Quita un dron retirado del mapa.
+        El almacén de flota ya no lo incluye, así que el JavaScript elimina su
+        marcador en el siguiente polling.
+        
+        Args:
+            drone_id: ID del dron retirado
+        """
+        if self.telemetry_server:
+            self.telemetry_server.set_drone_stale(drone_id, False)
+        if self.map_canvas:
+            self.map_canvas.remove_drone(drone_id)
+    
+    def set_drone_stale(self, drone_id: str, stale: bool):
+        """
+        Marca un dron como obsoleto (sin telemetría reciente) o activo.
+        El JavaScript atenúa su marcador en el siguiente polling.
+        
+        Args:
+            drone_id: ID del dron
+            stale: True si dejó de informar
+        """
+        if self.telemetry_server:
+            self.telemetry_server.set_drone_stale(drone_id, stale)
+        if self.map_canvas:
+            self.map_canvas.set_drone_stale(drone_id, stale)
     
     def add_poi(self, poi: Dict[str, Any]):
         """
@@ -1763,12 +1980,32 @@ class MapView:
             else:
                 logger.error("No hay servidor de telemetría disponible para actualizar POI")
             
-            # Si estamos usando fallback, actualizar vista alternativa
-            if hasattr(self, 'poi_list'):
-                self._update_fallback_view()
+            # Si estamos usando fallback, redibujar el POI en el canvas
+            if self.map_canvas:
+                self.map_canvas.set_pois([poi])
         else:
             logger.warning(f"MapView.add_poi: POI sin ID, ignorando: {poi}")
     
+    def add_pois(self, pois: List[Dict[str, Any]]):
+        """
+        Agrega o actualiza varios POIs en el mapa de una vez (ej., carga inicial).
+        
+        Args:
+            pois: Lista de diccionarios de POI
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        valid = [poi for poi in pois if poi.get("id")]
+        for poi in valid:
+            self.pois[poi["id"]] = poi
+        if self.telemetry_server:
+            self.telemetry_server.update_pois(valid)
+        logger.info(f"MapView.add_pois: {len(valid)} POIs cargados")
+        
+        # Si estamos usando fallback, redibujar los POIs en el canvas (un solo frame)
+        if self.map_canvas:
+            self.map_canvas.set_pois(valid)
+    
     def remove_poi(self, poi_id: str):
         """
         Elimina un POI del mapa.
@@ -1781,9 +2018,9 @@ class MapView:
             # Actualizar servidor HTTP
             self.telemetry_server.remove_poi(poi_id)
             
-            # Si estamos usando fallback, actualizar vista alternativa
-            if hasattr(self, 'poi_list'):
-                self._update_fallback_view()
+            # Si estamos usando fallback, quitar el POI del canvas
+            if self.map_canvas:
+                self.map_canvas.remove_poi(poi_id)
     
     def _update_map_html(self):
         """Actualiza el archivo HTML del mapa."""
@@ -1805,14 +2042,14 @@ class MapView:
                 m.save(self.map_html_path)
                 # Agregar auto-refresh al HTML generado por Folium
                 self._add_auto_refresh_to_folium_html()
-                logger.debug(f"Mapa HTML actualizado: {len(self.drones)} drones, {len(self.pois)} POIs")
+                logger.debug(f"Mapa HTML actualizado: {len(self.fleet_state)} drones, {len(self.pois)} POIs")
         except ImportError:
             # Si no hay Folium, regenerar HTML
             html_content = self._generate_map_html()
             if self.map_html_path:
                 with open(self.map_html_path, 'w', encoding='utf-8') as f:
                     f.write(html_content)
-                logger.debug(f"Mapa HTML (sin Folium) actualizado: {len(self.drones)} drones, {len(self.pois)} POIs")
+                logger.debug(f"Mapa HTML (sin Folium) actualizado: {len(self.fleet_state)} drones, {len(self.pois)} POIs")
     
     def _reload_map(self):
         """Recarga el mapa en el WebView."""
@@ -1822,28 +2059,42 @@ class MapView:
             # Forzar recarga cambiando la URL ligeramente
             self.map_view.url = file_url + "?t=" + str(os.path.getmtime(self.map_html_path))
             if self.map_view.page:
-                self.map_view.update()
+                commit(self.dispatcher, self.map_view)
     
     def _create_fallback_view(self) -> ft.Container:
-        """Crea una vista alternativa cuando WebView no está disponible."""
-        # Crear una representación visual del mapa usando componentes Flet
-        if not hasattr(self, 'drone_list'):
-            self.drone_list = ft.Column(controls=[], spacing=5, scroll=ft.ScrollMode.AUTO, expand=True)
-        if not hasattr(self, 'poi_list'):
-            self.poi_list = ft.Column(controls=[], spacing=5, scroll=ft.ScrollMode.AUTO, expand=True)
-        
-        # Calcular altura para las listas scrolleables (aproximadamente mitad de la ventana cada una)
-        # Usar altura fija razonable para habilitar scroll
-        list_height = 250  # Altura fija para cada lista
+        """Crea una vista alternativa cuando WebView no está disponible: el mapa dibujado en un canvas."""
+        if self.map_canvas is None:
+            self.map_canvas = MapCanvas(
+                self.initial_lat,
+                self.initial_lon,
+                zoom=self.zoom,
+                fleet_state=self.fleet_state,
+                page=self.page,
+                dispatcher=self.dispatcher,
+                on_click=self.on_map_click,
+            )
+            self.map_canvas.set_pois(list(self.pois.values()))
+            for zone in self.zones.values():
+                self.map_canvas.set_zone(zone)
         
         return ft.Container(
             content=ft.Column(
                 controls=[
-                    ft.Text(
-                        "Vista de Mapa",
-                        size=18,
-                        weight=ft.FontWeight.BOLD,
-                        color=get_text_color(self.page) if self.page else "#000000"
+                    ft.Row(
+                        controls=[
+                            ft.Text(
+                                "Vista de Mapa",
+                                size=18,
+                                weight=ft.FontWeight.BOLD,
+                                color=get_text_color(self.page) if self.page else "#000000"
+                            ),
+                            ft.ElevatedButton(
+                                "Abrir Mapa en Navegador",
+                                icon=ft.Icons.OPEN_IN_BROWSER,
+                                on_click=self._open_map_in_browser,
+                            ),
+                        ],
+                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                     ),
                     ft.Text(
                         "Nota: WebView no está soportado en esta plataforma.\n"
@@ -1851,35 +2102,7 @@ class MapView:
                         size=11,
                         color=get_text_secondary_color(self.page) if self.page else GREY_600,
                     ),
-                    ft.ElevatedButton(
-                        "Abrir Mapa en Navegador",
-                        icon=ft.Icons.OPEN_IN_BROWSER,
-                        on_click=self._open_map_in_browser,
-                    ),
-                    ft.Divider(),
-                    ft.Text(
-                        "Drones en el Mapa:", 
-                        weight=ft.FontWeight.BOLD, 
-                        size=14,
-                        color=get_text_color(self.page) if self.page else "#000000"
-                    ),
-                    ft.Container(
-                        content=self.drone_list,
-                        height=list_height,
-                        expand=False,
-                    ),
-                    ft.Divider(),
-                    ft.Text(
-                        "POIs en el Mapa:", 
-                        weight=ft.FontWeight.BOLD, 
-                        size=14,
-                        color=get_text_color(self.page) if self.page else "#000000"
-                    ),
-                    ft.Container(
-                        content=self.poi_list,
-                        height=list_height,
-                        expand=False,
-                    ),
+                    self.map_canvas.control,
                 ],
                 spacing=10,
                 expand=True,
@@ -1897,110 +2120,34 @@ class MapView:
             file_url = f"file:///{file_path.replace(os.sep, '/')}"
             webbrowser.open(file_url)
     
-    def _update_fallback_view(self):
-        """Actualiza la vista alternativa con información de drones y POIs."""
-        if not hasattr(self, 'drone_list') or not hasattr(self, 'poi_list'):
-            return
-        
-        # Colores adaptativos del tema
-        # Asegurar que siempre tengamos un color válido
-        if self.page:
-            text_color = get_text_color(self.page)
-            text_secondary = get_text_secondary_color(self.page)
-        else:
-            # Fallback para cuando no hay página (modo claro por defecto)
-            text_color = "#000000"  # Negro para modo claro
-            text_secondary = GREY_600  # Gris oscuro para modo claro
-        
-        # Actualizar lista de drones
-        self.drone_list.controls.clear()
-        for drone_id, telemetry in self.drones.items():
-            lat = telemetry.get('latitude', 0)
-            lon = telemetry.get('longitude', 0)
-            battery = telemetry.get('battery', 100)
-            altitude = telemetry.get('altitude', 0)
-            
-            battery_color = GREEN if battery > 50 else (AMBER if battery > 20 else RED)
-            
-            self.drone_list.controls.append(
-                ft.Card(
-                    content=ft.Container(
-                        content=ft.Column(
-                            controls=[
-                                ft.Row(
-                                    controls=[
-                                        ft.Icon(ft.Icons.FLIGHT_TAKEOFF, color=GREEN),
-                                        ft.Text(drone_id, weight=ft.FontWeight.BOLD, color=text_color),
-                                    ]
-                                ),
-                                ft.Text(f"Posición: {lat:.6f}, {lon:.6f}", color=text_secondary),
-                                ft.Text(f"Batería: {battery:.1f}%", color=battery_color),
-                                ft.Text(f"Altitud: {altitude:.1f}m", color=text_secondary),
-                            ],
-                            spacing=5,
-                        ),
-                        padding=10,
-                    )
-                )
-            )
-        
-        # Actualizar lista de POIs
-        self.poi_list.controls.clear()
-        poi_colors = {
-            'hazard': RED,
-            'target': BLUE,
-            'checkpoint': AMBER,
-            'landing_zone': GREEN,
-            'other': GREY
-        }
-        poi_names = {
-            'hazard': 'PELIGRO',
-            'target': 'OBJETIVO',
-            'checkpoint': 'PUNTO DE CONTROL',
-            'landing_zone': 'ZONA DE ATERRIZAJE',
-            'other': 'OTRO'
-        }
+    def add_zone(self, zone: Dict[str, Any]):
+        """
+        Agrega o actualiza una zona de interés en el mapa.
         
-        for poi_id, poi in self.pois.items():
-            lat = poi.get('latitude', 0)
-            lon = poi.get('longitude', 0)
-            poi_type = poi.get('type', 'other')
-            description = poi.get('description', '')
-            
-            color = poi_colors.get(poi_type, GREY)
-            type_name = poi_names.get(poi_type, 'OTRO')
+        Args:
+            zone: Diccionario de zona (con id y bounds)
+        """
+        zone_id = zone.get("id")
+        if not zone_id:
+            return
+        self.zones[zone_id] = zone
+        if self.telemetry_server:
+            self.telemetry_server.update_zone(zone)
+        if self.map_canvas:
+            self.map_canvas.set_zone(zone)
             
-            self.poi_list.controls.append(
-                ft.Card(
-                    content=ft.Container(
-                        content=ft.Column(
-                            controls=[
-                                ft.Row(
-                                    controls=[
-                                        ft.Container(
-                                            width=16,
-                                            height=16,
-                                            bgcolor=color,
-                                            border_radius=8,
-                                        ),
-                                        ft.Text(type_name, weight=ft.FontWeight.BOLD, color=text_color),
-                                    ]
-                                ),
-                                ft.Text(f"Posición: {lat:.6f}, {lon:.6f}", color=text_color),
-                                ft.Text(description, color=text_color),
-                            ],
-                            spacing=5,
-                        ),
-                        padding=10,
-                    )
-                )
-            )
+    def remove_zone(self, zone_id: str):
+        """
+        Elimina una zona de interés del mapa.
         
-        # Actualizar UI
-        if hasattr(self, 'drone_list'):
-            self.drone_list.update()
-        if hasattr(self, 'poi_list'):
-            self.poi_list.update()
+        Args:
+            zone_id: ID de la zona a eliminar
+        """
+        self.zones.pop(zone_id, None)
+        if self.telemetry_server:
+            self.telemetry_server.remove_zone(zone_id)
+        if self.map_canvas:
+            self.map_canvas.remove_zone(zone_id)
     
     def get_view(self) -> ft.Control:
         """Obtiene el control Flet para la vista de mapa."""
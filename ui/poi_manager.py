@@ -3,18 +3,44 @@ Componente UI de gestión de POIs.
 Maneja la creación, edición y visualización de Puntos de Interés.
 """
 import flet as ft
-from typing import Dict, List, Any, Optional, Callable
+from typing import Collection, Dict, List, Any, Optional, Callable
 from common.constants import POIType
 from common.colors import (
     RED, GREEN, BLUE, AMBER, GREY, GREY_600, SURFACE_VARIANT,
     get_surface_variant_color, get_text_color, get_text_secondary_color
 )
 from common.utils import format_timestamp
+from ui.dispatcher import UIDispatcher
+from ui.virtual_list import VirtualizedList
+
+
+# Altura fija de cada tarjeta en la lista virtualizada (píxeles)
+POI_CARD_HEIGHT = 140
+
+# Color e identificador visible de cada tipo de POI
+POI_TYPE_COLORS = {
+    "hazard": RED,
+    "target": BLUE,
+    "checkpoint": AMBER,
+    "landing_zone": GREEN,
+    "other": GREY,
+}
+POI_TYPE_NAMES = {
+    "hazard": "PELIGRO",
+    "target": "OBJETIVO",
+    "checkpoint": "PUNTO DE CONTROL",
+    "landing_zone": "ZONA DE ATERRIZAJE",
+    "other": "OTRO"
+}
 
 
 class POIManager:
     """
     Componente UI para gestionar Puntos de Interés.
+    
+    La lista está virtualizada y indexada por ID de POI: agregar o eliminar
+    un POI solo cambia la lista de claves, y solo existen las tarjetas
+    visibles (las demás se construyen al hacer scroll).
     """
     
     def __init__(
@@ -22,7 +48,8 @@ class POIManager:
         page: Optional[ft.Page] = None,
         on_create_poi: Optional[Callable[[float, float, str, str], None]] = None,
         on_delete_poi: Optional[Callable[[str], None]] = None,
-        page_height: int = 900
+        page_height: int = 900,
+        dispatcher: Optional[UIDispatcher] = None
     ):
         """
         Inicializa el gestor de POIs.
@@ -32,19 +59,23 @@ class POIManager:
             on_create_poi: Callback cuando se crea un POI (lat, lon, type, description)
             on_delete_poi: Callback cuando se elimina un POI (poi_id)
             page_height: Altura de la página para calcular altura del scroll
+            dispatcher: Despachador de UI que publica los cambios (None = actualizar directamente)
         """
         self.page = page
+        self.dispatcher = dispatcher
         self.on_create_poi = on_create_poi
         self.on_delete_poi = on_delete_poi
         self.page_height = page_height
         self.pois: Dict[str, Dict[str, Any]] = {}
-        # Crear Column con scroll para contenido scrolleable
-        self.poi_list_view = ft.Column(
-            controls=[],
-            spacing=5,
-            scroll=ft.ScrollMode.AUTO,
-            expand=True,
+        # Lista virtualizada (en orden de creación)
+        self.poi_list = VirtualizedList(
+            row_height=POI_CARD_HEIGHT,
+            create_row=self._create_poi_card,
+            bind_row=self._bind_poi_card,
+            viewport_height=max(250, (page_height - 250) // 2),
+            dispatcher=dispatcher,
         )
+        self.poi_list_view = self.poi_list.control
         self.poi_panel = self._create_panel()
     
     def _create_panel(self) -> ft.Container:
@@ -79,32 +110,8 @@ class POIManager:
             expand=True,
         )
     
-    def _create_poi_card(self, poi: Dict[str, Any]) -> ft.Card:
-        """Crea un widget de tarjeta para un POI."""
-        poi_type = poi.get("type", "other")
-        description = poi.get("description", "")
-        timestamp = format_timestamp(poi.get("timestamp", 0))
-        
-        # Color basado en tipo
-        colors = {
-            "hazard": RED,
-            "target": BLUE,
-            "checkpoint": AMBER,
-            "landing_zone": GREEN,
-            "other": GREY,
-        }
-        color = colors.get(poi_type, GREY)
-        
-        # Nombres traducidos de tipos
-        poi_type_names = {
-            "hazard": "PELIGRO",
-            "target": "OBJETIVO",
-            "checkpoint": "PUNTO DE CONTROL",
-            "landing_zone": "ZONA DE ATERRIZAJE",
-            "other": "OTRO"
-        }
-        type_display = poi_type_names.get(poi_type, poi_type.upper())
-        
+    def _create_poi_card(self) -> "_POICard":
+        """Crea una tarjeta de POI reciclable, sin valores."""
         # Colores adaptativos del tema
         # Asegurar que siempre tengamos un color válido
         if self.page:
@@ -114,62 +121,29 @@ class POIManager:
             # Fallback para cuando no hay página (modo claro por defecto)
             text_color = "#000000"  # Negro para modo claro
             text_secondary = GREY_600  # Gris oscuro para modo claro
+        return _POICard(text_color, text_secondary, self._on_delete)
         
-        return ft.Card(
-            content=ft.Container(
-                content=ft.Column(
-                    controls=[
-                        ft.Row(
-                            controls=[
-                                ft.Container(
-                                    width=10,
-                                    height=10,
-                                    bgcolor=color,
-                                    border_radius=5,
-                                ),
-                                ft.Text(
-                                    type_display,
-                                    weight=ft.FontWeight.BOLD,
-                                    size=12,
-                                    color=text_color,
-                                ),
-                                ft.IconButton(
-                                    icon=ft.Icons.DELETE,
-                                    icon_size=16,
-                                    tooltip="Eliminar POI",
-                                    on_click=lambda e, pid=poi["id"]: self._on_delete(pid),
-                                ),
-                            ],
-                            spacing=5,
-                        ),
-                        ft.Text(description or "Sin descripción", size=11, color=text_color),
-                        ft.Text(
-                            f"Creado: {timestamp}", 
-                            size=9, 
-                            color=text_secondary
-                        ),
-                        ft.Text(
-                            f"Lat: {poi['latitude']:.6f}, Lon: {poi['longitude']:.6f}",
-                            size=9,
-                            color=text_secondary,
-                        ),
-                    ],
-                    spacing=5,
-                    tight=True,
-                ),
-                padding=10,
-            ),
-        )
+    def _bind_poi_card(self, card: "_POICard", poi_id: str) -> bool:
+        """Muestra un POI en una tarjeta."""
+        poi = self.pois.get(poi_id)
+        if poi is None:
+            return False
+        return card.bind(poi)
     
     def add_poi(self, poi: Dict[str, Any]):
         """
-        Agrega un POI a la lista.
+        Agrega un POI a la lista (o actualiza su tarjeta si ya existe).
         
         Args:
             poi: Diccionario de POI
         """
-        self.pois[poi["id"]] = poi
-        self._refresh_list()
+        poi_id = poi["id"]
+        existed = poi_id in self.pois
+        self.pois[poi_id] = poi
+        if existed:
+            self.poi_list.refresh({poi_id})
+        else:
+            self._refresh_list()
     
     def remove_poi(self, poi_id: str):
         """
@@ -182,6 +156,16 @@ class POIManager:
             del self.pois[poi_id]
             self._refresh_list()
     
+    def load_pois(self, pois: List[Dict[str, Any]]):
+        """
+        Carga todos los POIs de una vez (ej., al abrir un proyecto).
+        
+        Args:
+            pois: Lista de diccionarios de POI
+        """
+        self.pois = {poi["id"]: poi for poi in pois}
+        self._refresh_list(changed=self.pois.keys())
+    
     def update_pois(self, pois: List[Dict[str, Any]]):
         """
         Actualiza todos los POIs.
@@ -189,15 +173,11 @@ class POIManager:
         Args:
             pois: Lista de diccionarios de POI
         """
-        self.pois = {poi["id"]: poi for poi in pois}
-        self._refresh_list()
+        self.load_pois(pois)
     
-    def _refresh_list(self):
-        """Actualiza la vista de lista de POIs."""
-        self.poi_list_view.controls.clear()
-        for poi in self.pois.values():
-            self.poi_list_view.controls.append(self._create_poi_card(poi))
-        self.poi_list_view.update()
+    def _refresh_list(self, changed: Optional[Collection[str]] = None):
+        """Actualiza las claves de la lista (solo se reasignan las tarjetas visibles afectadas)."""
+        self.poi_list.set_keys(list(self.pois), changed)
     
     def _on_delete(self, poi_id: str):
         """Maneja la eliminación de POI."""
@@ -213,3 +193,81 @@ class POIManager:
     def get_panel(self) -> ft.Container:
         """Obtiene el panel de gestión de POIs."""
         return self.poi_panel
+
+
+class _POICard:
+    """
+    Tarjeta de un POI reciclable por la lista virtualizada.
+    
+    bind() solo modifica los controles cuyo valor cambia.
+    """
+    
+    __slots__ = ("control", "poi_id", "dot", "type_text", "description_text", "created_text", "position_text")
+    
+    def __init__(self, text_color: str, text_secondary: str, on_delete: Callable[[str], None]):
+        """
+        Construye los controles de la tarjeta (sin valores).
+        
+        Args:
+            text_color: Color del texto principal
+            text_secondary: Color del texto secundario
+            on_delete: Callback de eliminación (recibe el ID del POI mostrado)
+        """
+        self.poi_id: Optional[str] = None
+        self.dot = ft.Container(width=10, height=10, bgcolor=GREY, border_radius=5)
+        self.type_text = ft.Text("", weight=ft.FontWeight.BOLD, size=12, color=text_color)
+        self.description_text = ft.Text(
+            "", size=11, color=text_color, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS
+        )
+        self.created_text = ft.Text("", size=9, color=text_secondary)
+        self.position_text = ft.Text("", size=9, color=text_secondary)
+        self.control = ft.Card(
+            content=ft.Container(
+                content=ft.Column(
+                    controls=[
+                        ft.Row(
+                            controls=[
+                                self.dot,
+                                self.type_text,
+                                ft.IconButton(
+                                    icon=ft.Icons.DELETE,
+                                    icon_size=16,
+                                    tooltip="Eliminar POI",
+                                    on_click=lambda e: self.poi_id and on_delete(self.poi_id),
+                                ),
+                            ],
+                            spacing=5,
+                        ),
+                        self.description_text,
+                        self.created_text,
+                        self.position_text,
+                    ],
+                    spacing=5,
+                    tight=True,
+                ),
+                padding=10,
+            ),
+        )
+    
+    def bind(self, poi: Dict[str, Any]) -> bool:
+        """
+        Muestra un POI.
+        
+        Returns:
+            True si cambió algún control
+        """
+        poi_type = poi.get("type", "other")
+        self.poi_id = poi["id"]
+        values = (
+            (self.dot, "bgcolor", POI_TYPE_COLORS.get(poi_type, GREY)),
+            (self.type_text, "value", POI_TYPE_NAMES.get(poi_type, poi_type.upper())),
+            (self.description_text, "value", poi.get("description", "") or "Sin descripción"),
+            (self.created_text, "value", f"Creado: {format_timestamp(poi.get('timestamp', 0))}"),
+            (self.position_text, "value", f"Lat: {poi['latitude']:.6f}, Lon: {poi['longitude']:.6f}"),
+        )
+        changed = False
+        for control, attr, value in values:
+            if getattr(control, attr) != value:
+                setattr(control, attr, value)
+                changed = True
+        return changed
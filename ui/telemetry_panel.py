@@ -3,8 +3,13 @@ Componente de panel de visualización de telemetría.
 Muestra telemetría en tiempo real para todos los drones.
 """
 import flet as ft
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
 from common.utils import format_timestamp
+from common.constants import DroneStatus
+from backend.schemas import TelemetrySchema
+from backend.fleet_state import FleetStateStore
+from ui.dispatcher import UIDispatcher, commit
+from ui.virtual_list import VirtualizedList
 from common.colors import (
     RED, GREEN, BLUE, AMBER, GREY, GREY_300, GREY_600, 
     BLUE_700, SURFACE_VARIANT,
@@ -12,29 +17,53 @@ from common.colors import (
 )
 
 
+# Altura fija de cada tarjeta en la lista virtualizada (píxeles)
+CARD_HEIGHT = 230
+
+
 class TelemetryPanel:
     """
     Componente UI para mostrar telemetría de drones.
+    
+    La lista de tarjetas está virtualizada: solo existen las tarjetas visibles
+    (más un margen) y se reciclan al hacer scroll, ordenar o filtrar.
     """
     
-    def __init__(self, page: Optional[ft.Page] = None, page_height: int = 900):
+    def __init__(
+        self,
+        page: Optional[ft.Page] = None,
+        page_height: int = 900,
+        fleet_state: Optional[FleetStateStore] = None,
+        dispatcher: Optional[UIDispatcher] = None
+    ):
         """
         Inicializa el panel de telemetría.
         
         Args:
             page: Instancia de página Flet para acceso al tema
             page_height: Altura de la página para calcular altura del scroll
+            fleet_state: Almacén compartido con el estado actual de la flota
+            dispatcher: Despachador de UI que publica los cambios (None = actualizar directamente)
         """
         self.page = page
-        self.drones: Dict[str, Dict[str, Any]] = {}
+        self.dispatcher = dispatcher
+        self.fleet_state = fleet_state if fleet_state is not None else FleetStateStore()
         self.page_height = page_height
-        # Crear Column con scroll para contenido scrolleable
-        self.drone_list_view = ft.Column(
-            controls=[],
-            spacing=5,
-            scroll=ft.ScrollMode.AUTO,
-            expand=True,
+        # Drones sin telemetría reciente (se muestran marcados hasta que informen o se retiren)
+        self.stale_ids: Set[str] = set()
+        # Orden y filtros de la lista
+        self.sort_by = "drone_id"
+        self.status_filter = "all"  # "all", "low_battery", "stale" o un DroneStatus
+        self.id_filter = ""
+        # Lista virtualizada: tarjetas recicladas, solo se cambian los valores que difieren
+        self.drone_list = VirtualizedList(
+            row_height=CARD_HEIGHT,
+            create_row=self._create_drone_card,
+            bind_row=self._bind_drone_card,
+            viewport_height=max(CARD_HEIGHT, page_height - 250),
+            dispatcher=dispatcher,
         )
+        self.drone_list_view = self.drone_list.control
         self.panel = self._create_panel()
     
     def _create_panel(self) -> ft.Container:
@@ -42,7 +71,7 @@ class TelemetryPanel:
         # Crear el texto de drones activos como atributo para poder actualizarlo
         text_color = get_text_color(self.page) if self.page else "#000000"
         text_secondary = get_text_secondary_color(self.page) if self.page else GREY_600
-        self.active_drones_text = ft.Text(f"Drones Activos: {len(self.drones)}", size=12, color=text_secondary)
+        self.active_drones_text = ft.Text(f"Drones Activos: {len(self.fleet_state)}", size=12, color=text_secondary)
         return ft.Container(
             content=ft.Column(
                 controls=[
@@ -52,6 +81,7 @@ class TelemetryPanel:
                                 ft.Text("Telemetría de Drones", size=18, weight=ft.FontWeight.BOLD, color=text_color),
                                 ft.Divider(),
                                 self.active_drones_text,
+                                self._create_list_controls(),
                             ],
                             spacing=5,
                             tight=True,
@@ -72,47 +102,58 @@ class TelemetryPanel:
             expand=True,
         )
     
-    def _create_drone_card(self, telemetry: Dict[str, Any]) -> ft.Card:
-        """Crea un widget de tarjeta para la telemetría de un dron (Matrice 300 RTK)."""
-        drone_id = telemetry.get("drone_id", "DESCONOCIDO")
-        battery = telemetry.get("battery", 0.0)
-        altitude = telemetry.get("altitude", 0.0)
-        velocity = telemetry.get("velocity", 0.0)
-        heading = telemetry.get("heading", 0.0)
-        status = telemetry.get("status", "desconocido")
-        lat = telemetry.get("latitude", 0.0)
-        lon = telemetry.get("longitude", 0.0)
-        vertical_speed = telemetry.get("vertical_speed", 0.0)
-        rtk_fix = telemetry.get("rtk_fix", False)
-        flight_time_remaining = telemetry.get("flight_time_remaining", 0.0)
-        
-        # Color de batería
-        if battery > 50:
-            battery_color = GREEN
-        elif battery > 20:
-            battery_color = AMBER
-        else:
-            battery_color = RED
-        
-        # Formatear tiempo de vuelo restante
-        if flight_time_remaining > 0:
-            minutes = int(flight_time_remaining / 60)
-            seconds = int(flight_time_remaining % 60)
-            time_str = f"{minutes}m {seconds}s"
-        else:
-            time_str = "N/A"
-        
-        # Traducir estado
-        status_translations = {
-            "idle": "inactivo",
-            "flying": "volando",
-            "landing": "aterrizando",
-            "takeoff": "despegando",
-            "armed": "armado",
-            "error": "error"
-        }
-        status_text = status_translations.get(status.lower(), status.upper())
+    def _create_list_controls(self) -> ft.Column:
+        """Crea los controles de orden y filtro de la lista."""
+        return ft.Column(
+            controls=[
+                ft.TextField(
+                    hint_text="Filtrar por ID",
+                    dense=True,
+                    text_size=12,
+                    prefix_icon=ft.Icons.SEARCH,
+                    on_change=self._on_id_filter_change,
+                ),
+                ft.Row(
+                    controls=[
+                        ft.Dropdown(
+                            label="Mostrar",
+                            value=self.status_filter,
+                            dense=True,
+                            text_size=12,
+                            expand=True,
+                            options=[
+                                ft.dropdown.Option(key="all", text="Todos"),
+                                ft.dropdown.Option(key="low_battery", text="Batería baja"),
+                                ft.dropdown.Option(key="stale", text="Sin telemetría"),
+                            ] + [
+                                ft.dropdown.Option(key=status.value, text=STATUS_TRANSLATIONS[status.value].capitalize())
+                                for status in DroneStatus
+                            ],
+                            on_change=self._on_status_filter_change,
+                        ),
+                        ft.Dropdown(
+                            label="Ordenar",
+                            value=self.sort_by,
+                            dense=True,
+                            text_size=12,
+                            expand=True,
+                            options=[
+                                ft.dropdown.Option(key="drone_id", text="ID"),
+                                ft.dropdown.Option(key="battery", text="Batería"),
+                                ft.dropdown.Option(key="status", text="Estado"),
+                            ],
+                            on_change=self._on_sort_change,
+                        ),
+                    ],
+                    spacing=5,
+                ),
+            ],
+            spacing=5,
+            tight=True,
+        )
         
+    def _create_drone_card(self) -> "_DroneCard":
+        """Crea una tarjeta de dron (Matrice 300 RTK) reciclable, sin valores."""
         # Colores adaptativos del tema
         # Asegurar que siempre tengamos un color válido
         if self.page:
@@ -122,146 +163,312 @@ class TelemetryPanel:
             # Fallback para cuando no hay página (modo claro por defecto)
             text_color = "#000000"  # Negro para modo claro
             text_secondary = GREY_600  # Gris oscuro para modo claro
+        progress_bgcolor = ft.Colors.SURFACE if self.page and self.page.theme_mode == ft.ThemeMode.DARK else GREY_300
+        return _DroneCard(text_color, text_secondary, progress_bgcolor)
         
-        controls = [
-            ft.Row(
-                controls=[
-                    ft.Icon(ft.Icons.FLIGHT_TAKEOFF, size=20, color=text_color),
-                    ft.Text(drone_id, weight=ft.FontWeight.BOLD, size=14, color=text_color),
-                    ft.Container(
-                        content=ft.Row(
-                            controls=[
-                                ft.Icon(ft.Icons.SATELLITE_ALT, size=14, color=GREEN if rtk_fix else GREY),
-                                ft.Text("RTK" if rtk_fix else "GPS", size=9, color=text_secondary),
-                            ],
-                            spacing=2,
-                        ),
-                    ) if rtk_fix is not None else ft.Container(),
-                ],
-                spacing=5,
-            ),
-            ft.Divider(height=1),
-            ft.Row(
-                controls=[
-                    ft.Text("Batería:", size=11, color=text_color),
-                    ft.Container(
-                        content=ft.ProgressBar(
-                            value=battery / 100,
-                            color=battery_color,
-                            bgcolor=ft.Colors.SURFACE if self.page and self.page.theme_mode == ft.ThemeMode.DARK else GREY_300,
-                        ),
-                        width=100,
-                        height=10,
-                    ),
-                    ft.Text(f"{battery:.1f}%", size=11, color=battery_color),
-                ],
-                spacing=5,
-            ),
-            ft.Text(f"Estado: {status_text.upper()}", size=11, color=text_color),
-            ft.Text(f"Altitud: {altitude:.1f} m AGL", size=11, color=text_color),
-            ft.Text(f"Velocidad: {velocity:.1f} m/s ({velocity * 3.6:.1f} km/h)", size=11, color=text_color),
-            ft.Text(f"Rumbo: {heading:.1f}°", size=11, color=text_color),
-        ]
-        
-        # Agregar velocidad vertical si está disponible
-        if vertical_speed is not None and abs(vertical_speed) > 0.1:
-            vertical_icon = ft.Icons.ARROW_UPWARD if vertical_speed > 0 else ft.Icons.ARROW_DOWNWARD
-            controls.append(
-                ft.Row(
-                    controls=[
-                        ft.Icon(vertical_icon, size=12, color=BLUE),
-                        ft.Text(f"Vertical: {vertical_speed:.1f} m/s", size=10, color=text_color),
-                    ],
-                    spacing=3,
-                )
-            )
-        
-        # Agregar tiempo de vuelo restante
-        if flight_time_remaining > 0:
-            controls.append(
-                ft.Text(f"Tiempo de vuelo: {time_str}", size=10, color=BLUE)
-            )
-        
-        controls.append(
-            ft.Text(f"Posición: {lat:.6f}, {lon:.6f}", size=9, color=text_secondary)
-        )
-        
-        return ft.Card(
-            content=ft.Container(
-                content=ft.Column(
-                    controls=controls,
-                    spacing=5,
-                    tight=True,
-                ),
-                padding=10,
-            ),
-        )
+    def _bind_drone_card(self, card: "_DroneCard", drone_id: str) -> bool:
+        """Muestra en una tarjeta la telemetría actual de un dron."""
+        telemetry = self.fleet_state.get(drone_id)
+        if telemetry is None:
+            return False
+        return card.update(telemetry, drone_id in self.stale_ids)
     
-    def update_telemetry(self, telemetry: Dict[str, Any]):
+    def update_telemetry(self, telemetry: TelemetrySchema):
         """
         Actualiza la telemetría de un dron.
+        El registro ya debe estar escrito en el almacén de flota.
         
         Args:
-            telemetry: Diccionario de telemetría
+            telemetry: Registro de telemetría
         """
         import logging
         logger = logging.getLogger(__name__)
         
-        drone_id = telemetry.get("drone_id")
+        drone_id = telemetry.drone_id
         if drone_id:
-            is_new = drone_id not in self.drones
-            self.drones[drone_id] = telemetry
-            
-            if is_new:
-                logger.info(f"Nuevo dron agregado al panel: {drone_id}, total: {len(self.drones)}")
-            
-            self._refresh_list()
+            self._refresh_list({drone_id})
         else:
             logger.warning(f"Telemetría recibida sin drone_id: {telemetry}")
     
+    def update_batch(self, records: List[TelemetrySchema]):
+        """
+        Actualiza el panel tras un lote de registros (solo las tarjetas visibles que cambian).
+        Los registros ya deben estar escritos en el almacén de flota.
+        
+        Args:
+            records: Registros de telemetría del lote
+        """
+        if records:
+            self._refresh_list({telemetry.drone_id for telemetry in records if telemetry.drone_id})
+    
     def remove_drone(self, drone_id: str):
         """
-        Elimina un dron del panel.
+        Elimina un dron del panel (y del almacén de flota si sigue en él).
         
         Args:
             drone_id: ID del dron a eliminar
         """
-        if drone_id in self.drones:
-            del self.drones[drone_id]
-            self._refresh_list()
+        self.fleet_state.remove(drone_id)
+        self.stale_ids.discard(drone_id)
+        self._refresh_list()
     
-    def _refresh_list(self):
-        """Actualiza la vista de lista de drones."""
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        logger.debug(f"Refrescando lista de drones: {len(self.drones)} drones")
+    def set_drone_stale(self, drone_id: str, stale: bool):
+        """
+        Marca la tarjeta de un dron como sin telemetría reciente (o la restaura).
         
-        # Limpiar y actualizar el ListView
-        self.drone_list_view.controls.clear()
-        for telemetry in self.drones.values():
-            drone_id = telemetry.get("drone_id", "UNKNOWN")
-            self.drone_list_view.controls.append(self._create_drone_card(telemetry))
-            logger.debug(f"Agregada tarjeta para {drone_id}")
+        Args:
+            drone_id: ID del dron
+            stale: True si dejó de informar
+        """
+        if stale:
+            self.stale_ids.add(drone_id)
+        else:
+            self.stale_ids.discard(drone_id)
+        self._refresh_list({drone_id})
+    
+    def _on_id_filter_change(self, e):
+        """Cambio del filtro por ID (hilo de eventos de Flet)."""
+        self.id_filter = (e.control.value or "").strip()
+        self._schedule_refresh()
+    
+    def _on_status_filter_change(self, e):
+        """Cambio del filtro por estado o batería (hilo de eventos de Flet)."""
+        self.status_filter = e.control.value or "all"
+        self._schedule_refresh()
+    
+    def _on_sort_change(self, e):
+        """Cambio del orden de la lista (hilo de eventos de Flet)."""
+        self.sort_by = e.control.value or "drone_id"
+        self._schedule_refresh()
+    
+    def _schedule_refresh(self):
+        """Reordena la lista desde el principio en el despachador (o en el acto, sin despachador)."""
+        if self.dispatcher:
+            self.dispatcher.submit_latest(("telemetry-panel", "order"), self._reorder)
+        else:
+            self._reorder()
+    
+    def _reorder(self):
+        """Aplica un cambio de orden o filtro y vuelve al principio de la lista."""
+        self.drone_list.scroll_to_top()
+        self._refresh_list()
+    
+    def _ordered_ids(self) -> List[str]:
+        """IDs de drones que pasan los filtros, en el orden elegido."""
+        status_filter = self.status_filter
+        ids = self.fleet_state.ordered_ids(
+            sort_by=self.sort_by,
+            max_battery=LOW_BATTERY_THRESHOLD if status_filter == "low_battery" else None,
+            statuses=None if status_filter in ("all", "low_battery", "stale") else [status_filter],
+            id_contains=self.id_filter or None,
+        )
+        if status_filter == "stale":
+            ids = [drone_id for drone_id in ids if drone_id in self.stale_ids]
+        return ids
+    
+    def _refresh_list(self, changed: Optional[Set[str]] = None):
+        """
+        Recalcula el orden de la lista y actualiza las tarjetas visibles.
         
-        # Actualizar contador de drones activos (usar el atributo en lugar de buscar en controls)
-        if hasattr(self, 'active_drones_text'):
-            self.active_drones_text.value = f"Drones Activos: {len(self.drones)}"
-            # Actualizar color si la página está disponible
-            if self.page:
-                self.active_drones_text.color = get_text_secondary_color(self.page)
-                # También actualizar el color del título si existe
-                # (esto se hace automáticamente con los nuevos cards que se crean)
+        Args:
+            changed: Drones cuyos datos cambiaron (sus tarjetas visibles se reasignan)
+        """
+        import logging
+        logger = logging.getLogger(__name__)
         
         try:
-            self.drone_list_view.update()
-            if hasattr(self, 'active_drones_text'):
-                self.active_drones_text.update()
-            self.panel.update()
-            logger.debug(f"UI actualizada, drones en lista: {[d.get('drone_id') for d in self.drones.values()]}")
+            ids = self._ordered_ids()
+            self.drone_list.set_keys(ids, changed)
+            if self._update_counter(len(ids)):
+                commit(self.dispatcher, self.active_drones_text)
         except Exception as e:
             logger.error(f"Error al actualizar UI: {e}", exc_info=True)
     
+    def _update_counter(self, shown: int) -> bool:
+        """Actualiza el contador de drones activos; devuelve True si cambió."""
+        total = len(self.fleet_state)
+        stale_count = len(self.stale_ids)
+        value = (
+            f"Drones Activos: {total - stale_count} (sin telemetría: {stale_count})"
+            if stale_count else f"Drones Activos: {total}"
+        )
+        if shown != total:
+            value += f" · mostrando {shown}"
+        if self.active_drones_text.value == value:
+            return False
+        self.active_drones_text.value = value
+        return True
+    
     def get_panel(self) -> ft.Container:
         """Obtiene el panel de telemetría."""
         return self.panel
+
+
+# Batería por debajo de la cual un dron aparece en el filtro "Batería baja" (%)
+LOW_BATTERY_THRESHOLD = 20.0
+
+# Traducción de estados para la tarjeta
+STATUS_TRANSLATIONS = {
+    "idle": "inactivo",
+    "flying": "volando",
+    "landing": "aterrizando",
+    "takeoff": "despegando",
+    "armed": "armado",
+    "error": "error"
+}
+
+
+def _set(control: ft.Control, attr: str, value: Any) -> bool:
+    """Asigna un atributo de un control solo si cambia; devuelve True si cambió."""
+    if getattr(control, attr) == value:
+        return False
+    setattr(control, attr, value)
+    return True
+
+
+class _DroneCard:
+    """
+    Tarjeta de telemetría de un dron.
+    
+    Se construye una vez y guarda referencias a sus controles variables;
+    update() solo toca los que cambian, de modo que Flet envía al cliente
+    únicamente esas propiedades. La lista virtualizada la recicla para
+    mostrar otros drones.
+    """
+    
+    __slots__ = (
+        "control", "id_text", "rtk_icon", "rtk_text", "stale_badge", "battery_bar", "battery_text",
+        "status_text", "altitude_text", "velocity_text", "heading_text",
+        "vertical_row", "vertical_icon", "vertical_text", "flight_time_text", "position_text",
+    )
+    
+    def __init__(self, text_color: str, text_secondary: str, progress_bgcolor: str):
+        """
+        Construye los controles de la tarjeta (sin valores).
+        
+        Args:
+            text_color: Color del texto principal
+            text_secondary: Color del texto secundario
+            progress_bgcolor: Color de fondo de la barra de batería
+        """
+        self.id_text = ft.Text("", weight=ft.FontWeight.BOLD, size=14, color=text_color)
+        self.rtk_icon = ft.Icon(ft.Icons.SATELLITE_ALT, size=14, color=GREY)
+        self.rtk_text = ft.Text("GPS", size=9, color=text_secondary)
+        self.stale_badge = ft.Text("SIN TELEMETRÍA", size=9, weight=ft.FontWeight.BOLD, color=RED, visible=False)
+        self.battery_bar = ft.ProgressBar(value=0, color=GREEN, bgcolor=progress_bgcolor)
+        self.battery_text = ft.Text("", size=11, color=GREEN)
+        self.status_text = ft.Text("", size=11, color=text_color)
+        self.altitude_text = ft.Text("", size=11, color=text_color)
+        self.velocity_text = ft.Text("", size=11, color=text_color)
+        self.heading_text = ft.Text("", size=11, color=text_color)
+        self.vertical_icon = ft.Icon(ft.Icons.ARROW_UPWARD, size=12, color=BLUE)
+        self.vertical_text = ft.Text("", size=10, color=text_color)
+        self.vertical_row = ft.Row(
+            controls=[self.vertical_icon, self.vertical_text],
+            spacing=3,
+            visible=False,
+        )
+        self.flight_time_text = ft.Text("", size=10, color=BLUE, visible=False)
+        self.position_text = ft.Text("", size=9, color=text_secondary)
+        
+        self.control = ft.Card(
+            content=ft.Container(
+                content=ft.Column(
+                    controls=[
+                        ft.Row(
+                            controls=[
+                                ft.Icon(ft.Icons.FLIGHT_TAKEOFF, size=20, color=text_color),
+                                self.id_text,
+                                ft.Row(controls=[self.rtk_icon, self.rtk_text], spacing=2),
+                                self.stale_badge,
+                            ],
+                            spacing=5,
+                        ),
+                        ft.Divider(height=1),
+                        ft.Row(
+                            controls=[
+                                ft.Text("Batería:", size=11, color=text_color),
+                                ft.Container(content=self.battery_bar, width=100, height=10),
+                                self.battery_text,
+                            ],
+                            spacing=5,
+                        ),
+                        self.status_text,
+                        self.altitude_text,
+                        self.velocity_text,
+                        self.heading_text,
+                        self.vertical_row,
+                        self.flight_time_text,
+                        self.position_text,
+                    ],
+                    spacing=5,
+                    tight=True,
+                ),
+                padding=10,
+            ),
+        )
+    
+    def update(self, telemetry: TelemetrySchema, stale: bool) -> bool:
+        """
+        Aplica un registro de telemetría.
+        
+        Args:
+            telemetry: Registro de telemetría
+            stale: True si el dron está marcado sin telemetría
+        
+        Returns:
+            True si cambió algún control
+        """
+        battery = telemetry.battery
+        velocity = telemetry.velocity
+        vertical_speed = telemetry.vertical_speed or 0.0
+        rtk_fix = bool(telemetry.rtk_fix)
+        flight_time_remaining = telemetry.flight_time_remaining or 0.0
+        status = telemetry.status or "desconocido"
+        status_text = STATUS_TRANSLATIONS.get(status.lower(), status.upper())
+        
+        # Color de batería
+        if battery > 50:
+            battery_color = GREEN
+        elif battery > 20:
+            battery_color = AMBER
+        else:
+            battery_color = RED
+        
+        changed = _set(self.id_text, "value", telemetry.drone_id)
+        changed |= self.set_stale(stale)
+        changed |= _set(self.rtk_icon, "color", GREEN if rtk_fix else GREY)
+        changed |= _set(self.rtk_text, "value", "RTK" if rtk_fix else "GPS")
+        changed |= _set(self.battery_bar, "value", round(battery) / 100)
+        changed |= _set(self.battery_bar, "color", battery_color)
+        changed |= _set(self.battery_text, "value", f"{battery:.1f}%")
+        changed |= _set(self.battery_text, "color", battery_color)
+        changed |= _set(self.status_text, "value", f"Estado: {status_text.upper()}")
+        changed |= _set(self.altitude_text, "value", f"Altitud: {telemetry.altitude:.1f} m AGL")
+        changed |= _set(self.velocity_text, "value", f"Velocidad: {velocity:.1f} m/s ({velocity * 3.6:.1f} km/h)")
+        changed |= _set(self.heading_text, "value", f"Rumbo: {telemetry.heading:.1f}°")
+        
+        # Velocidad vertical solo si es significativa
+        show_vertical = abs(vertical_speed) > 0.1
+        changed |= _set(self.vertical_row, "visible", show_vertical)
+        if show_vertical:
+            changed |= _set(
+                self.vertical_icon, "name",
+                ft.Icons.ARROW_UPWARD if vertical_speed > 0 else ft.Icons.ARROW_DOWNWARD
+            )
+            changed |= _set(self.vertical_text, "value", f"Vertical: {vertical_speed:.1f} m/s")
+        
+        # Tiempo de vuelo restante
+        show_flight_time = flight_time_remaining > 0
+        changed |= _set(self.flight_time_text, "visible", show_flight_time)
+        if show_flight_time:
+            minutes = int(flight_time_remaining / 60)
+            seconds = int(flight_time_remaining % 60)
+            changed |= _set(self.flight_time_text, "value", f"Tiempo de vuelo: {minutes}m {seconds}s")
+        
+        changed |= _set(self.position_text, "value", f"Posición: {telemetry.latitude:.6f}, {telemetry.longitude:.6f}")
+        return changed
+    
+    def set_stale(self, stale: bool) -> bool:
+        """Muestra u oculta la marca "SIN TELEMETRÍA"; devuelve True si cambió."""
+        return _set(self.stale_badge, "visible", stale)
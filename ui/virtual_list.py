@@ -0,0 +1,218 @@
+"""
+Lista virtualizada para Flet.
+Solo construye las filas visibles (más un margen) y las recicla al hacer
+scroll, de modo que el coste de la lista no crece con el número de elementos.
+"""
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence
+import flet as ft
+from ui.dispatcher import UIDispatcher, commit
+
+
+@dataclass(slots=True)
+class _Slot:
+    """Fila del pool: objeto de la fila, su contenedor y la clave que muestra."""
+    row: Any
+    container: ft.Container
+    key: Optional[str] = None
+
+
+class VirtualizedList:
+    """
+    Lista con scroll que recicla un pool fijo de filas.
+    
+    Todas las filas tienen la misma altura (row_height). La columna contiene
+    un espaciador superior, el pool de filas y un espaciador inferior cuyas
+    alturas suman la de la lista completa, así que la barra de scroll se
+    comporta como si existieran todas las filas. Al hacer scroll solo se
+    reasignan (bind_row) las filas del pool a otras claves.
+    
+    Las filas las crea create_row(): cualquier objeto con un atributo
+    control (el control Flet de la fila). bind_row(row, key) muestra en la
+    fila el elemento con esa clave y devuelve True si cambió algún control.
+    """
+    
+    def __init__(
+        self,
+        row_height: float,
+        create_row: Callable[[], Any],
+        bind_row: Callable[[Any, str], bool],
+        viewport_height: float = 600.0,
+        buffer_rows: int = 3,
+        dispatcher: Optional[UIDispatcher] = None,
+        scroll_interval: int = 50
+    ):
+        """
+        Inicializa la lista vacía.
+        
+        Args:
+            row_height: Altura fija de cada fila (píxeles)
+            create_row: Crea una fila reciclable
+            bind_row: Muestra una clave en una fila; devuelve True si cambió
+            viewport_height: Altura visible estimada hasta el primer evento de scroll
+            buffer_rows: Filas extra construidas por encima y por debajo de las visibles
+            dispatcher: Despachador de UI que publica los cambios (None = actualizar directamente)
+            scroll_interval: Milisegundos mínimos entre eventos de scroll
+        """
+        self.row_height = row_height
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.buffer_rows = buffer_rows
+        self.dispatcher = dispatcher
+        
+        self._keys: List[str] = []
+        self._slots: List[_Slot] = []
+        self._first = 0
+        self._scroll_offset = 0.0
+        self._viewport_height = viewport_height
+        
+        self._top = ft.Container(height=0)
+        self._bottom = ft.Container(height=0)
+        self.control = ft.Column(
+            controls=[self._top, self._bottom],
+            spacing=0,
+            scroll=ft.ScrollMode.AUTO,
+            expand=True,
+            on_scroll=self._on_scroll,
+            on_scroll_interval=scroll_interval,
+        )
+        
+        # Contadores de estadísticas
+        self.bind_count = 0
+        self.scroll_count = 0
+    
+    def set_keys(self, keys: Sequence[str], changed: Optional[Collection[str]] = None):
+        """
+        Establece los elementos de la lista (en orden de visualización).
+        
+        Las filas visibles que pasan a mostrar otra clave se reasignan; las
+        que mantienen la suya solo se vuelven a asignar si está en changed.
+        
+        Args:
+            keys: Claves en orden
+            changed: Claves cuyos datos cambiaron (None = ninguna)
+        """
+        self._keys = list(keys)
+        self._render(changed or ())
+    
+    def refresh(self, keys: Optional[Collection[str]] = None):
+        """
+        Vuelve a asignar las filas visibles de ciertas claves.
+        
+        Args:
+            keys: Claves cuyos datos cambiaron (None = todas las visibles)
+        """
+        if keys is None:
+            keys = {slot.key for slot in self._slots if slot.key is not None}
+        self._render(keys)
+    
+    def scroll_to_top(self):
+        """Vuelve al principio de la lista (ej., tras cambiar el orden o un filtro)."""
+        self._scroll_offset = 0.0
+        if self.control.page is not None:
+            self.control.scroll_to(offset=0, duration=0)
+    
+    @property
+    def keys(self) -> List[str]:
+        """Claves de la lista en orden de visualización."""
+        return self._keys
+    
+    def visible_keys(self) -> List[str]:
+        """Claves asignadas a filas del pool (visibles o en el margen)."""
+        return [slot.key for slot in self._slots if slot.key is not None]
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Obtiene el tamaño de la lista, del pool y los contadores."""
+        return {
+            "items": len(self._keys),
+            "rows": len(self._slots),
+            "first": self._first,
+            "binds": self.bind_count,
+            "scrolls": self.scroll_count,
+        }
+    
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        """Evento de scroll (hilo de eventos de Flet): se aplica en el despachador."""
+        if e.pixels is None:
+            return
+        viewport = e.viewport_dimension or self._viewport_height
+        if self.dispatcher:
+            self.dispatcher.submit_latest(("virtual-list", id(self)), self._apply_scroll, e.pixels, viewport)
+        else:
+            self._apply_scroll(e.pixels, viewport)
+    
+    def _apply_scroll(self, offset: float, viewport: float):
+        """Recoloca el pool tras un scroll."""
+        self.scroll_count += 1
+        self._scroll_offset = offset
+        self._viewport_height = viewport
+        if self._window()[0] != self._first or len(self._slots) < min(self._pool_size(), len(self._keys)):
+            self._render(())
+    
+    def _pool_size(self) -> int:
+        """Filas necesarias para cubrir la altura visible más los márgenes."""
+        return math.ceil(self._viewport_height / self.row_height) + 2 * self.buffer_rows + 1
+    
+    def _window(self):
+        """Primera fila del pool y tamaño del pool para el scroll actual."""
+        first = max(0, int(self._scroll_offset // self.row_height) - self.buffer_rows)
+        size = max(len(self._slots), self._pool_size())
+        # No dejar el pool más allá del final de la lista
+        first = max(0, min(first, len(self._keys) - size))
+        return first, size
+    
+    def _render(self, changed: Collection[str]):
+        """Asigna las claves de la ventana actual al pool y publica lo que cambió."""
+        keys = self._keys
+        first, size = self._window()
+        dirty: List[ft.Control] = []
+        
+        # Crecer el pool solo si hay elementos que mostrar en las filas nuevas
+        needed = min(size, len(keys))
+        if needed > len(self._slots):
+            controls = self.control.controls
+            for _ in range(needed - len(self._slots)):
+                row = self.create_row()
+                container = ft.Container(
+                    content=row.control,
+                    height=self.row_height,
+                    clip_behavior=ft.ClipBehavior.HARD_EDGE,
+                    visible=False,
+                )
+                self._slots.append(_Slot(row, container))
+                controls.insert(len(controls) - 1, container)
+            dirty.append(self.control)
+        
+        shown = 0
+        for i, slot in enumerate(self._slots):
+            index = first + i
+            if index < len(keys):
+                key = keys[index]
+                if slot.key != key or key in changed:
+                    rebound = slot.key != key
+                    slot.key = key
+                    self.bind_count += 1
+                    if self.bind_row(slot.row, key) or rebound:
+                        dirty.append(slot.container)
+                if not slot.container.visible:
+                    slot.container.visible = True
+                    dirty.append(slot.container)
+                shown += 1
+            elif slot.key is not None or slot.container.visible:
+                slot.key = None
+                slot.container.visible = False
+                dirty.append(slot.container)
+        
+        self._first = first
+        top = first * self.row_height
+        bottom = max(0, len(keys) - first - shown) * self.row_height
+        if self._top.height != top:
+            self._top.height = top
+            dirty.append(self._top)
+        if self._bottom.height != bottom:
+            self._bottom.height = bottom
+            dirty.append(self._bottom)
+        
+        if dirty and self.control.page is not None:
+            commit(self.dispatcher, *dirty)
@@ -2,17 +2,35 @@
 Componente para gestionar zonas de interés y formaciones de vuelo.
 """
 import flet as ft
+from dataclasses import dataclass
+from math import cos, radians
 from typing import Dict, Any, Optional, Callable, List
 from common.constants import FlightFormation
 from common.colors import (
     RED, GREEN, BLUE, AMBER, GREY,
     get_text_color, get_text_secondary_color, get_surface_variant_color
 )
+from ui.dispatcher import UIDispatcher, commit
+
+
+# Radio de la Tierra (km) para las métricas aproximadas de las zonas
+EARTH_RADIUS_KM = 6371
+
+
+@dataclass(slots=True)
+class ZoneMetrics:
+    """Métricas derivadas de los límites de una zona (se calculan una vez por zona)."""
+    area_km2: float
+    center_lat: float
+    center_lon: float
 
 
 class ZoneManager:
     """
     Gestiona zonas de interés y formaciones de vuelo para cobertura de áreas.
+    
+    Cada zona tiene una tarjeta propia que se crea al agregarla; cambiar la
+    zona activa solo reestiliza la tarjeta anterior y la nueva.
     """
     
     def __init__(
@@ -21,7 +39,8 @@ class ZoneManager:
         on_zone_created: Optional[Callable[[Dict[str, Any]], None]] = None,
         on_zone_deleted: Optional[Callable[[str], None]] = None,
         on_formation_selected: Optional[Callable[[str, FlightFormation], None]] = None,
-        page_height: int = 900
+        page_height: int = 900,
+        dispatcher: Optional[UIDispatcher] = None
     ):
         """
         Inicializa el gestor de zonas.
@@ -31,8 +50,10 @@ class ZoneManager:
             on_zone_created: Callback cuando se crea una zona
             on_formation_selected: Callback cuando se selecciona una formación
             page_height: Altura de la página para calcular scroll
+            dispatcher: Despachador de UI que publica los cambios (None = actualizar directamente)
         """
         self.page = page
+        self.dispatcher = dispatcher
         self.on_zone_created = on_zone_created
         self.on_zone_deleted = on_zone_deleted
         self.on_formation_selected = on_formation_selected
@@ -40,6 +61,9 @@ class ZoneManager:
         
         self.zones: Dict[str, Dict[str, Any]] = {}
         self.active_zone_id: Optional[str] = None
+        # Tarjetas y métricas por zona
+        self._cards: Dict[str, _ZoneCard] = {}
+        self._metrics: Dict[str, ZoneMetrics] = {}
         
         self.zone_list_view = ft.ListView(expand=True, spacing=5)
         self.formation_buttons_container = ft.Container(visible=False)
@@ -105,7 +129,10 @@ class ZoneManager:
                 return
             
             self.zones[zone_id] = zone
-            self._update_zone_list()
+            self._metrics[zone_id] = self._calculate_metrics(zone.get("bounds", {}))
+            card = self._cards[zone_id] = self._create_zone_card(zone_id, zone)
+            self.zone_list_view.controls.append(card.control)
+            self._commit(self.zone_list_view)
             
             # Activar la zona recién creada
             self.set_active_zone(zone_id)
@@ -116,118 +143,116 @@ class ZoneManager:
     
     def set_active_zone(self, zone_id: str):
         """Establece una zona como activa y muestra botones de formaciones."""
-        if zone_id in self.zones:
-            self.active_zone_id = zone_id
-            self._update_formation_buttons()
-            self._update_zone_list()
+        if zone_id not in self.zones or zone_id == self.active_zone_id:
+            return
+        previous = self._cards.get(self.active_zone_id) if self.active_zone_id else None
+        self.active_zone_id = zone_id
+        
+        # Solo cambian la tarjeta que deja de estar activa y la nueva
+        changed = []
+        if previous is not None:
+            previous.set_active(False)
+            changed.append(previous.control)
+        card = self._cards[zone_id]
+        card.set_active(True)
+        changed.append(card.control)
+        if self._update_formation_buttons():
+            changed.append(self.formation_buttons_container)
+        self._commit(*changed)
     
     def remove_zone(self, zone_id: str):
         """Elimina una zona."""
         if zone_id in self.zones:
             del self.zones[zone_id]
+            self._metrics.pop(zone_id, None)
+            card = self._cards.pop(zone_id, None)
+            if card is not None:
+                self.zone_list_view.controls.remove(card.control)
+            changed = [self.zone_list_view]
             if self.active_zone_id == zone_id:
                 self.active_zone_id = None
-                self._update_formation_buttons()
-            self._update_zone_list()
+                if self._update_formation_buttons():
+                    changed.append(self.formation_buttons_container)
+            self._commit(*changed)
     
-    def _update_zone_list(self):
-        """Actualiza la lista de zonas."""
-        self.zone_list_view.controls.clear()
+    def get_zone_metrics(self, zone_id: str) -> Optional[ZoneMetrics]:
+        """
+        Obtiene las métricas cacheadas de una zona.
         
-        for zone_id, zone in self.zones.items():
-            card = self._create_zone_card(zone_id, zone)
-            self.zone_list_view.controls.append(card)
+        Args:
+            zone_id: ID de la zona
         
+        Returns:
+            Métricas de la zona o None si no existe
+        """
+        return self._metrics.get(zone_id)
+    
+    def _commit(self, *controls: ft.Control):
+        """Publica cambios en controles del panel (si ya está en la página)."""
         if self.page:
-            self.page.update()
+            commit(self.dispatcher, *controls)
+    
+    def _dispatch(self, func: Callable, *args):
+        """Ejecuta un manejador de eventos de la UI en el despachador (o en el acto, sin él)."""
+        if self.dispatcher:
+            self.dispatcher.submit(func, *args)
+        else:
+            func(*args)
     
-    def _create_zone_card(self, zone_id: str, zone: Dict[str, Any]) -> ft.Card:
-        """Crea una tarjeta para una zona."""
+    def _create_zone_card(self, zone_id: str, zone: Dict[str, Any]) -> "_ZoneCard":
+        """Crea la tarjeta de una zona (inactiva)."""
         bounds = zone.get("bounds", {})
-        is_active = zone_id == self.active_zone_id
-        
         text_color = get_text_color(self.page) if self.page else "#000000"
-        bg_color = BLUE if is_active else None
-        
-        card_content = ft.Container(
-            content=ft.Column(
-                controls=[
-                    ft.Row(
-                        controls=[
-                            ft.Text(
-                                f"Zona {zone_id[-4:]}",
-                                size=14,
-                                weight=ft.FontWeight.BOLD,
-                                color=text_color if not is_active else ft.Colors.WHITE
-                            ),
-                            ft.IconButton(
-                                icon=ft.Icons.DELETE,
-                                icon_color=RED,
-                                icon_size=20,
-                                tooltip="Eliminar zona",
-                                on_click=lambda e, zid=zone_id: self._on_delete_zone(zid),
-                            ),
-                        ],
-                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-                    ),
-                    ft.Text(
-                        f"Área: {self._calculate_area(bounds):.2f} km²",
-                        size=12,
-                        color=text_color if not is_active else ft.Colors.WHITE
-                    ),
-                    ft.Text(
-                        f"Bounds: [{bounds.get('south', 0):.4f}, {bounds.get('west', 0):.4f}] - [{bounds.get('north', 0):.4f}, {bounds.get('east', 0):.4f}]",
-                        size=10,
-                        color=get_text_secondary_color(self.page) if self.page else GREY
-                    ),
-                ],
-                spacing=5,
-                tight=True,
-            ),
-            padding=10,
-            bgcolor=bg_color,
-        )
-        
-        # Hacer el Card clickeable usando Container con Ink
-        return ft.Container(
-            content=ft.Card(content=card_content),
-            on_click=lambda e, zid=zone_id: self.set_active_zone(zid),
-            ink=True,
+        text_secondary = get_text_secondary_color(self.page) if self.page else GREY
+        return _ZoneCard(
+            title=f"Zona {zone_id[-4:]}",
+            area=f"Área: {self._metrics[zone_id].area_km2:.2f} km²",
+            bounds=f"Bounds: [{bounds.get('south', 0):.4f}, {bounds.get('west', 0):.4f}] - [{bounds.get('north', 0):.4f}, {bounds.get('east', 0):.4f}]",
+            text_color=text_color,
+            text_secondary=text_secondary,
+            on_click=lambda e, zid=zone_id: self._dispatch(self.set_active_zone, zid),
+            on_delete=lambda e, zid=zone_id: self._dispatch(self._on_delete_zone, zid),
         )
     
-    def _calculate_area(self, bounds: Dict[str, float]) -> float:
-        """Calcula el área aproximada de la zona en km²."""
-        from math import radians, cos
-        
+    def _calculate_metrics(self, bounds: Dict[str, float]) -> ZoneMetrics:
+        """Calcula las métricas aproximadas de una zona a partir de sus límites."""
         lat1 = bounds.get("south", 0)
         lat2 = bounds.get("north", 0)
         lon1 = bounds.get("west", 0)
         lon2 = bounds.get("east", 0)
         
-        # Cálculo aproximado del área usando fórmula de Haversine
-        R = 6371  # Radio de la Tierra en km
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        
-        a = (dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * (dlon / 2) ** 2
-        c = 2 * (a ** 0.5)
-        
         # Aproximación rectangular
-        width = R * dlon * cos(radians((lat1 + lat2) / 2))
-        height = R * dlat
-        
-        return abs(width * height)
+        width = EARTH_RADIUS_KM * radians(lon2 - lon1) * cos(radians((lat1 + lat2) / 2))
+        height = EARTH_RADIUS_KM * radians(lat2 - lat1)
+        return ZoneMetrics(
+            area_km2=abs(width * height),
+            center_lat=(lat1 + lat2) / 2,
+            center_lon=(lon1 + lon2) / 2,
+        )
     
-    def _update_formation_buttons(self):
-        """Actualiza los botones de formaciones según la zona activa."""
-        if not self.active_zone_id:
-            self.formation_buttons_container.visible = False
-            self.formation_buttons_container.content = None
-            return
+    def _update_formation_buttons(self) -> bool:
+        """
+        Muestra u oculta los botones de formaciones según la zona activa.
         
+        Los botones se construyen la primera vez y después solo cambia su
+        visibilidad.
+        
+        Returns:
+            True si cambió la visibilidad
+        """
+        visible = self.active_zone_id is not None
+        if self.formation_buttons_container.visible == visible:
+            return False
+        self.formation_buttons_container.visible = visible
+        if visible and self.formation_buttons_container.content is None:
+            self.formation_buttons_container.content = self._create_formation_buttons()
+        return True
+    
+    def _create_formation_buttons(self) -> ft.Column:
+        """Crea los botones de formaciones de vuelo."""
         text_color = get_text_color(self.page) if self.page else "#000000"
         
-        formation_buttons = ft.Column(
+        return ft.Column(
             controls=[
                 ft.Text("Formaciones de Vuelo", size=14, weight=ft.FontWeight.BOLD, color=text_color),
                 ft.Divider(),
@@ -264,12 +289,6 @@ class ZoneManager:
             ],
             spacing=5,
         )
-        
-        self.formation_buttons_container.content = formation_buttons
-        self.formation_buttons_container.visible = True
-        
-        if self.page:
-            self.page.update()
     
     def _on_formation_selected(self, formation: FlightFormation):
         """Maneja la selección de una formación."""
@@ -285,8 +304,85 @@ class ZoneManager:
     
     def _on_clear_all(self, e):
         """Limpia todas las zonas."""
+        self._dispatch(self._clear_zones)
+    
+    def _clear_zones(self):
+        """Quita todas las zonas de la lista."""
         self.zones.clear()
+        self._cards.clear()
+        self._metrics.clear()
+        self.zone_list_view.controls.clear()
         self.active_zone_id = None
-        self._update_formation_buttons()
-        self._update_zone_list()
+        changed = [self.zone_list_view]
+        if self._update_formation_buttons():
+            changed.append(self.formation_buttons_container)
+        self._commit(*changed)
+
 
+class _ZoneCard:
+    """Tarjeta de una zona; set_active() solo cambia sus colores."""
+    
+    __slots__ = ("control", "content", "title_text", "area_text", "text_color")
+    
+    def __init__(
+        self,
+        title: str,
+        area: str,
+        bounds: str,
+        text_color: str,
+        text_secondary: str,
+        on_click: Callable,
+        on_delete: Callable
+    ):
+        """
+        Construye la tarjeta (inactiva).
+        
+        Args:
+            title: Título de la zona
+            area: Texto del área
+            bounds: Texto de los límites
+            text_color: Color del texto principal
+            text_secondary: Color del texto secundario
+            on_click: Manejador del clic en la tarjeta (activar zona)
+            on_delete: Manejador del botón eliminar
+        """
+        self.text_color = text_color
+        self.title_text = ft.Text(title, size=14, weight=ft.FontWeight.BOLD, color=text_color)
+        self.area_text = ft.Text(area, size=12, color=text_color)
+        self.content = ft.Container(
+            content=ft.Column(
+                controls=[
+                    ft.Row(
+                        controls=[
+                            self.title_text,
+                            ft.IconButton(
+                                icon=ft.Icons.DELETE,
+                                icon_color=RED,
+                                icon_size=20,
+                                tooltip="Eliminar zona",
+                                on_click=on_delete,
+                            ),
+                        ],
+                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                    ),
+                    self.area_text,
+                    ft.Text(bounds, size=10, color=text_secondary),
+                ],
+                spacing=5,
+                tight=True,
+            ),
+            padding=10,
+        )
+        # Hacer el Card clickeable usando Container con Ink
+        self.control = ft.Container(
+            content=ft.Card(content=self.content),
+            on_click=on_click,
+            ink=True,
+        )
+    
+    def set_active(self, active: bool):
+        """Aplica el estilo de zona activa (o lo quita)."""
+        color = ft.Colors.WHITE if active else self.text_color
+        self.content.bgcolor = BLUE if active else None
+        self.title_text.color = color
+        self.area_text.color = color